@@ -0,0 +1,212 @@
+"""
+Background delivery of recorded notifications.
+
+Request handlers record notifications and hand their channel layer events to
+the dispatcher once the transaction commits. submit() only appends to a
+bounded in-memory queue; a background event loop drains it in batches of
+NOTIFICATION_DISPATCH_BATCH_SIZE, sending to different groups concurrently
+and to each group in order. A failed send is retried after a backoff that
+doubles per attempt, and later events of that group are held behind it. Events
+that are dropped or give up are still stored and reach the client through
+replay on its next connect.
+"""
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from collections import deque
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+class NotificationDispatcher:
+    """Delivers (group, event) pairs from a background loop with retries"""
+    
+    def __init__(self):
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._draining = None
+        # Events of groups waiting on a retry, the failed one first; touched
+        # only from the loop thread
+        self._held = {}
+        self.counters = {
+            'submitted': 0,
+            'sent': 0,
+            'retried': 0,
+            'failed': 0,
+            'dropped': 0,
+            'batches': 0,
+        }
+    
+    def _count(self, counter, amount=1):
+        with self._lock:
+            self.counters[counter] += amount
+    
+    def submit(self, events):
+        """Queue (group, event) pairs for delivery without waiting on the channel layer"""
+        events = list(events)
+        if not events:
+            return
+        # The in-memory layer only wakes consumers on the server's own event
+        # loop, so without a shared broker events are sent inline instead
+        if isinstance(get_channel_layer(), InMemoryChannelLayer):
+            self._count('submitted', len(events))
+            self._send_inline(events)
+            return
+        
+        with self._lock:
+            room = max(0, settings.NOTIFICATION_DISPATCH_MAX_PENDING - len(self._pending))
+            accepted = events[:room]
+            self._pending.extend((group, event, 0) for group, event in accepted)
+            self.counters['submitted'] += len(events)
+            self.counters['dropped'] += len(events) - len(accepted)
+            if accepted:
+                self._start()
+            loop = self._loop
+        
+        if len(accepted) < len(events):
+            logger.warning(f"Notification dispatch queue full, dropped {len(events) - len(accepted)} events")
+        if accepted:
+            loop.call_soon_threadsafe(self._wake)
+    
+    def _send_inline(self, events):
+        channel_layer = get_channel_layer()
+        
+        async def send():
+            for group, event in events:
+                try:
+                    await channel_layer.group_send(group, event)
+                    self._count('sent')
+                except Exception as e:
+                    self._count('failed')
+                    logger.error(f"Error pushing notification to {group}: {str(e)}")
+        
+        async_to_sync(send)()
+    
+    def _start(self):
+        """Start the dispatch loop thread on first use (called with the lock held)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever,
+            name='notification-dispatcher',
+            daemon=True
+        )
+        self._thread.start()
+    
+    def _wake(self):
+        if self._draining is None or self._draining.done():
+            self._draining = asyncio.get_running_loop().create_task(self._drain())
+    
+    async def _drain(self):
+        while True:
+            with self._lock:
+                size = min(settings.NOTIFICATION_DISPATCH_BATCH_SIZE, len(self._pending))
+                batch = [self._pending.popleft() for _ in range(size)]
+            if not batch:
+                return
+            
+            groups = {}
+            for item in batch:
+                if item[0] in self._held:
+                    self._held[item[0]].append(item)
+                else:
+                    groups.setdefault(item[0], []).append(item)
+            await asyncio.gather(*(self._send_group(items) for items in groups.values()))
+            self._count('batches')
+    
+    async def _send_group(self, items):
+        """Send one group's events in order; on failure the rest wait for the retry"""
+        channel_layer = get_channel_layer()
+        for index, (group, event, attempt) in enumerate(items):
+            try:
+                await channel_layer.group_send(group, event)
+            except Exception as e:
+                self._retry(items[index:], e)
+                return
+            self._count('sent')
+    
+    def _retry(self, items, error):
+        (group, event, attempt), rest = items[0], items[1:]
+        if attempt >= settings.NOTIFICATION_DISPATCH_RETRIES:
+            self._count('failed')
+            logger.error(f"Giving up pushing notification to {group} after {attempt + 1} attempts: {str(error)}")
+            retry = list(rest)
+            delay = 0
+        else:
+            self._count('retried')
+            retry = [(group, event, attempt + 1)] + list(rest)
+            delay = min(
+                settings.NOTIFICATION_DISPATCH_BACKOFF * 2 ** attempt,
+                settings.NOTIFICATION_DISPATCH_MAX_BACKOFF
+            )
+            logger.warning(f"Error pushing notification to {group}, retrying in {delay:.2f}s: {str(error)}")
+        if retry:
+            self._held[group] = retry
+            asyncio.get_running_loop().call_later(delay, self._requeue, group)
+    
+    def _requeue(self, group):
+        items = self._held.pop(group, [])
+        with self._lock:
+            self._pending.extendleft(reversed(items))
+        self._wake()
+    
+    async def _flush(self):
+        """Wait until everything queued, retries included, is sent or given up"""
+        while True:
+            with self._lock:
+                pending = bool(self._pending)
+            if pending:
+                self._wake()
+            if self._draining is not None and not self._draining.done():
+                await self._draining
+            elif not pending and not self._held:
+                return
+            else:
+                await asyncio.sleep(0.01)
+    
+    def close(self, timeout=5):
+        """Send whatever is queued, waiting up to timeout seconds, and stop the loop thread"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        flush = asyncio.run_coroutine_threadsafe(self._flush(), loop)
+        try:
+            flush.result(timeout)
+        except concurrent.futures.TimeoutError:
+            flush.cancel()
+            held = sum(len(items) for items in self._held.values())
+            logger.warning(
+                f"Notification dispatcher stopped with {len(self._pending) + held} events unsent"
+            )
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        loop.close()
+        self._draining = None
+        self._held = {}
+    
+    def metrics(self):
+        with self._lock:
+            return {
+                **self.counters,
+                'pending': len(self._pending),
+                'retrying': len(self._held),
+            }
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_notification_dispatcher():
+    """The process-wide dispatcher"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = NotificationDispatcher()
+        return _dispatcher
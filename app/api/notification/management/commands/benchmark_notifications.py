@@ -0,0 +1,90 @@
+import random
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from app.api.notification.models import Notification
+from app.api.notification.pipeline import NotificationPipeline
+from app.utils.seeding import DatasetGenerator
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Benchmarks recording a notification for a large number of recipients'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--recipients', type=int, default=100_000)
+        parser.add_argument('--buffer-size', type=int, help='Default: NOTIFICATION_BUFFER_SIZE')
+        parser.add_argument(
+            '--unbuffered-sample',
+            type=int,
+            default=2000,
+            help='Recipients written one row at a time, for comparison'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Commit the seeded users and notifications instead of rolling them back'
+        )
+    
+    def measure(self, label, rows, func):
+        """Run func once and print its wall time, query count and row rate."""
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{label}: {elapsed * 1000:.1f} ms, {len(queries)} queries, '
+            f'{rows / elapsed:.0f} rows/s'
+        )
+        return elapsed
+    
+    def handle(self, *args, **options):
+        recipients = options['recipients']
+        message = 'Scheduled maintenance tonight from 22:00 to 23:00'
+        data = {'starts_at': '22:00', 'ends_at': '23:00'}
+        
+        with transaction.atomic():
+            tag = f'notify{random.Random(options["seed"]).randrange(10 ** 6)}.'
+            user_ids = DatasetGenerator(
+                users=recipients,
+                lots=0,
+                days=1,
+                reservations=0,
+                seed=options['seed'],
+                prefix=tag
+            ).create_users()
+            self.stdout.write(self.style.SUCCESS(f'Seeded {len(user_ids)} recipients'))
+            
+            sample = user_ids[:options['unbuffered_sample']]
+            if sample:
+                unbuffered = self.measure(
+                    f'Notification.objects.create ({len(sample)} recipients)',
+                    len(sample),
+                    lambda: [
+                        Notification.objects.create(user_id=user_id, message=message, data=data)
+                        for user_id in sample
+                    ]
+                )
+                self.stdout.write(f'  extrapolated to {recipients} recipients: {unbuffered * recipients / len(sample):.1f} s')
+            
+            # Pushes are left out: only the inserts are measured
+            def fan_out_rows():
+                with NotificationPipeline(buffer_size=options['buffer_size'], push=False) as pipeline:
+                    pipeline.notify_users(user_ids, message, data)
+            
+            def fan_out_record():
+                with NotificationPipeline(push=False) as pipeline:
+                    pipeline.broadcast(message, data)
+            
+            rows = self.measure(f'NotificationPipeline.notify_users ({recipients} rows)', recipients, fan_out_rows)
+            record = self.measure('NotificationPipeline.broadcast (1 fan-out row)', 1, fan_out_record)
+            self.stdout.write(self.style.SUCCESS(
+                f'Broadcast to {recipients} recipients: {rows:.2f} s as rows per user, '
+                f'{record * 1000:.1f} ms as one fan-out record'
+            ))
+            
+            if not options['keep']:
+                transaction.set_rollback(True)
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.2 on 2026-10-19 01:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notification", "0002_broadcast_receipts"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "id"], name="notificatio_user_id_ced90b_idx"
+            ),
+        ),
+    ]
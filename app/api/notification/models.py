@@ -1,5 +1,8 @@
 from django.db import models
+from django.db.models import Case, Exists, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 User = get_user_model()
@@ -11,14 +14,18 @@ class Notification(models.Model):
         RESERVATION_EXPIRED = "reservation_expired", _("Reservation Expired")
         RESERVATION_CANCELLED = "reservation_cancelled", _("Reservation Cancelled")
         UPCOMING_RESERVATION = "upcoming_reservation", _("Upcoming Reservation")
+        NEW_PARKING_LOT = "new_parking_lot", _("New Parking Lot")
+        REPORT_JOB = "report_job", _("Report Job")
         CUSTOM = "custom", _("Custom Notification")
 
     class NotificationStatus(models.TextChoices):
         UNREAD = "unread", _("Unread")
         READ = "read", _("Read")
 
+    # A notification without a user is a broadcast: one row read by every
+    # user, whose per-user state lives in NotificationReceipt
     user = models.ForeignKey(
-        User, on_delete=models.CASCADE, related_name="notifications"
+        User, on_delete=models.CASCADE, related_name="notifications", null=True, blank=True
     )
     type = models.CharField(
         max_length=50, choices=NotificationType.choices, default=NotificationType.CUSTOM
@@ -37,13 +44,105 @@ class Notification(models.Model):
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=["user", "status"]),
+            # Replay of missed notifications reads id ranges per user
+            models.Index(fields=["user", "id"]),
             models.Index(fields=["type"]),
             models.Index(fields=["created_at"]),
         ]
 
     def __str__(self):
-        return f"{self.type} - {self.user.email} - {self.created_at}"
+        recipient = self.user.email if self.user_id else "everyone"
+        return f"{self.type} - {recipient} - {self.created_at}"
 
-    def mark_as_read(self):
+    @property
+    def is_broadcast(self):
+        return self.user_id is None
+
+    @classmethod
+    def for_user(cls, user):
+        """
+        The user's own notifications and the broadcasts sent since they joined,
+        minus broadcasts they deleted, annotated with their user_status.
+        """
+        receipts = NotificationReceipt.objects.filter(notification=OuterRef("pk"), user=user)
+        return cls.objects.filter(
+            Q(user=user) | Q(user__isnull=True, created_at__gte=user.date_joined)
+        ).exclude(
+            Q(user__isnull=True) & Exists(receipts.filter(is_deleted=True))
+        ).annotate(
+            user_status=Case(
+                When(user__isnull=False, then=F("status")),
+                default=Coalesce(
+                    Subquery(receipts.values("status")[:1]),
+                    Value(cls.NotificationStatus.UNREAD)
+                ),
+                output_field=models.CharField()
+            )
+        )
+
+    @classmethod
+    def mark_all_as_read(cls, notifications, user):
+        """Mark the user's own rows read and record read receipts for the broadcasts"""
+        ids = list(notifications.values_list("pk", "user_id"))
+        cls.objects.filter(pk__in=[pk for pk, owner in ids if owner is not None]).update(
+            status=cls.NotificationStatus.READ
+        )
+        NotificationReceipt.record(
+            [pk for pk, owner in ids if owner is None], user, status=cls.NotificationStatus.READ
+        )
+
+    @classmethod
+    def delete_all_for(cls, notifications, user):
+        """Delete the user's own rows and hide the broadcasts from them"""
+        ids = list(notifications.values_list("pk", "user_id"))
+        cls.objects.filter(pk__in=[pk for pk, owner in ids if owner is not None]).delete()
+        NotificationReceipt.record([pk for pk, owner in ids if owner is None], user, is_deleted=True)
+
+    def mark_as_read(self, user=None):
+        if self.is_broadcast:
+            NotificationReceipt.record([self.pk], user, status=self.NotificationStatus.READ)
+            return
         self.status = self.NotificationStatus.READ
         self.save(update_fields=["status", "updated_at"])
+
+    def delete_for(self, user):
+        """Delete the notification, or only hide it from user if it is a broadcast"""
+        if self.is_broadcast:
+            NotificationReceipt.record([self.pk], user, is_deleted=True)
+        else:
+            self.delete()
+
+
+class NotificationReceipt(models.Model):
+    """A user's read and deleted state of one broadcast notification"""
+    notification = models.ForeignKey(
+        Notification, on_delete=models.CASCADE, related_name="receipts"
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="notification_receipts"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=Notification.NotificationStatus.choices,
+        default=Notification.NotificationStatus.UNREAD,
+    )
+    is_deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("notification", "user")
+
+    def __str__(self):
+        return f"{self.user.email} - {self.notification_id} - {self.status}"
+
+    @classmethod
+    def record(cls, notification_ids, user, **values):
+        """Create or update the user's receipts of notification_ids with values"""
+        if not notification_ids:
+            return
+        cls.objects.bulk_create(
+            [cls(notification_id=pk, user=user, **values) for pk in notification_ids],
+            ignore_conflicts=True
+        )
+        cls.objects.filter(notification_id__in=notification_ids, user=user).update(updated_at=timezone.now(), **values)
@@ -0,0 +1,127 @@
+"""
+Persist-then-push delivery of notifications.
+
+Notifications are recorded in the Notification table first, in bulk inserts
+of up to NOTIFICATION_BUFFER_SIZE rows, and pushed over the channel layer only
+once the inserting transaction commits, so every pushed message carries the
+id the REST endpoints know it by; the background NotificationDispatcher
+delivers them. A broadcast is one fan-out row without a user instead of a
+row per user.
+"""
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from app.api.realtime.utils import BROADCAST_GROUP, user_notification_group
+from .dispatcher import get_notification_dispatcher
+from .models import Notification
+
+class NotificationEncoder(DjangoJSONEncoder):
+    """Stores anything else callers pass as data by its string form"""
+    def default(self, o):
+        try:
+            return super().default(o)
+        except TypeError:
+            return str(o)
+
+def notification_type(value):
+    """value if it is a known notification type, else custom"""
+    if value in Notification.NotificationType.values:
+        return value
+    return Notification.NotificationType.CUSTOM
+
+# Message keys set from the notification itself. Data keys sit beside them
+# at the top level of the message, so data cannot use them.
+RESERVED_DATA_KEYS = ('id', 'type', 'message', 'created_at')
+
+def encode_data(data):
+    """data as the JSON-compatible value that will be stored"""
+    clashes = [key for key in RESERVED_DATA_KEYS if key in (data or {})]
+    if clashes:
+        raise ValueError(f"Notification data cannot use the reserved keys: {', '.join(clashes)}")
+    return json.loads(json.dumps(data or {}, cls=NotificationEncoder))
+
+def notification_content(notification):
+    """
+    The WebSocket message of a recorded notification: its data keys at the
+    top level, as clients have always read them, plus the stored fields.
+    encode_data keeps the two apart.
+    """
+    return {
+        **notification.data,
+        'id': notification.pk,
+        'type': notification.type,
+        'message': notification.message,
+        'created_at': notification.created_at.isoformat(),
+    }
+
+def notification_event(notification):
+    """The channel layer group and event of a recorded notification"""
+    group = BROADCAST_GROUP if notification.is_broadcast else user_notification_group(notification.user_id)
+    return group, {
+        'type': 'send_notification',
+        'content': notification_content(notification)
+    }
+
+class NotificationPipeline:
+    """
+    Buffers notifications and records them with bulk inserts, pushing each
+    batch after commit. Use it as a context manager, or call flush(), so the
+    last partial batch is written.
+    """
+    
+    def __init__(self, buffer_size=None, push=True):
+        self.buffer_size = buffer_size or settings.NOTIFICATION_BUFFER_SIZE
+        self.push = push
+        self.buffer = []
+        self.recorded = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+    
+    def notify_user(self, user_id, message, data=None, type=None):
+        """Queue a notification for one user; returns it (saved once flushed)"""
+        return self.add(user_id, message, encode_data(data), type)
+    
+    def notify_users(self, user_ids, message, data=None, type=None):
+        """Queue one row per user, for notifications each user reads and deletes on their own"""
+        data = encode_data(data)
+        for user_id in user_ids:
+            self.add(user_id, message, data, type)
+    
+    def broadcast(self, message, data=None, type=None):
+        """Queue a single fan-out notification read by every user"""
+        return self.add(None, message, encode_data(data), type)
+    
+    def add(self, user_id, message, data, type):
+        notification = Notification(
+            user_id=user_id,
+            type=notification_type(type),
+            message=message,
+            data=data
+        )
+        self.buffer.append(notification)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+        return notification
+    
+    def flush(self):
+        """Insert the buffered notifications and schedule their push; returns them"""
+        if not self.buffer:
+            return []
+        batch, self.buffer = self.buffer, []
+        # Primary keys are set on the objects by databases that return them
+        # from bulk inserts (PostgreSQL, SQLite 3.35+)
+        Notification.objects.bulk_create(batch)
+        self.recorded += len(batch)
+        if self.push:
+            # Delivery runs in the background, so a slow or unavailable
+            # channel layer never holds up the request that recorded them
+            transaction.on_commit(
+                lambda: get_notification_dispatcher().submit(notification_event(n) for n in batch)
+            )
+        return batch
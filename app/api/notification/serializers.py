@@ -3,6 +3,10 @@ from .models import Notification
 
 
 class NotificationSerializer(serializers.ModelSerializer):
+    # Broadcasts are shared rows, so their status is the requesting user's
+    status = serializers.SerializerMethodField()
+    is_broadcast = serializers.BooleanField(read_only=True)
+
     class Meta:
         model = Notification
         fields = [
@@ -11,7 +15,11 @@ class NotificationSerializer(serializers.ModelSerializer):
             "message",
             "data",
             "status",
+            "is_broadcast",
             "created_at",
             "updated_at",
         ]
         read_only_fields = ["id", "type", "message", "data", "created_at", "updated_at"]
+
+    def get_status(self, obj):
+        return getattr(obj, "user_status", obj.status)
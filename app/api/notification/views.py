@@ -23,13 +23,13 @@ class NotificationViewSet(viewsets.ModelViewSet):
     http_method_names = ['get', 'delete']  # Only allow GET and DELETE methods
 
     def get_queryset(self):
-        """Filter notifications to only show the current user's notifications."""
-        queryset = Notification.objects.filter(user=self.request.user)
+        """Filter notifications to the current user's own ones and broadcasts."""
+        queryset = Notification.for_user(self.request.user)
         
-        # Filter by status if provided
+        # Filter by status if provided; broadcasts are read per user
         status = self.request.query_params.get('status')
         if status:
-            queryset = queryset.filter(status=status)
+            queryset = queryset.filter(user_status=status)
         
         # Filter by type if provided
         notification_type = self.request.query_params.get('type')
@@ -55,33 +55,37 @@ class NotificationViewSet(viewsets.ModelViewSet):
                 'type', '-type'
             }
             if sort_by in allowed_sort_fields:
-                queryset = queryset.order_by(sort_by)
+                queryset = queryset.order_by(sort_by.replace('status', 'user_status'))
         
         return queryset
 
+    def perform_destroy(self, instance):
+        """Delete a notification; a broadcast is only hidden from this user."""
+        instance.delete_for(self.request.user)
+
     @action(detail=True, methods=['post'])
     def mark_as_read(self, request, pk=None):
         """Mark a notification as read."""
         notification = self.get_object()
-        notification.mark_as_read()
+        notification.mark_as_read(request.user)
         return Response({'status': 'notification marked as read'})
 
     @action(detail=False, methods=['post'])
     def mark_all_as_read(self, request):
         """Mark all notifications as read."""
-        self.get_queryset().update(status=Notification.NotificationStatus.READ)
+        Notification.mark_all_as_read(self.get_queryset(), request.user)
         return Response({'status': 'all notifications marked as read'})
 
     @action(detail=False, methods=['delete'])
     def delete_all(self, request):
         """Delete all notifications."""
-        self.get_queryset().delete()
+        Notification.delete_all_for(self.get_queryset(), request.user)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         """Get count of unread notifications."""
         count = self.get_queryset().filter(
-            status=Notification.NotificationStatus.UNREAD
+            user_status=Notification.NotificationStatus.UNREAD
         ).count()
         return Response({'unread_count': count}) 
\ No newline at end of file
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking_lots", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="parkinglot",
+            name="availability_version",
+            field=models.PositiveBigIntegerField(
+                default=0, verbose_name="availability version"
+            ),
+        ),
+    ]
@@ -1,9 +1,13 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth import get_user_model
+from django.dispatch import Signal
 
 User = get_user_model()
 
+# Sent after a saved lot's available_spaces changed, with its new availability_version
+availability_changed = Signal()
+
 class ParkingLot(models.Model):
     """Model for parking lots."""
     
@@ -25,6 +29,8 @@ class ParkingLot(models.Model):
         default=Status.ACTIVE
     )
     hourly_rate = models.DecimalField(_('hourly rate'), max_digits=6, decimal_places=2)
+    # Bumped on every change to available_spaces so clients can order live updates
+    availability_version = models.PositiveBigIntegerField(_('availability version'), default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -35,6 +41,35 @@ class ParkingLot(models.Model):
     def __str__(self):
         return self.name
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_available_spaces = instance.__dict__.get('available_spaces')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        """Save, bumping availability_version when the available count changed."""
+        stored = getattr(self, '_stored_available_spaces', None)
+        update_fields = kwargs.get('update_fields')
+        changed = (
+            not self._state.adding
+            and stored is not None
+            and stored != self.available_spaces
+            and (update_fields is None or 'available_spaces' in update_fields)
+        )
+        if changed:
+            # Incremented in the UPDATE itself so concurrent writers never share a version
+            self.availability_version = models.F('availability_version') + 1
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'availability_version'}
+        
+        super().save(*args, **kwargs)
+        
+        self._stored_available_spaces = self.available_spaces
+        if changed:
+            self.refresh_from_db(fields=['availability_version'])
+            availability_changed.send(sender=self.__class__, instance=self)
+    
     @property
     def occupancy_rate(self):
         """Calculate the occupancy rate of the parking lot."""
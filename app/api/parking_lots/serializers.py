@@ -19,10 +19,10 @@ class ParkingLotSerializer(serializers.ModelSerializer):
     class Meta:
         model = ParkingLot
         fields = ('id', 'name', 'address', 'latitude', 'longitude',
-                 'total_spaces', 'available_spaces', 'status',
+                 'total_spaces', 'available_spaces', 'availability_version', 'status',
                  'hourly_rate', 'spaces', 'occupancy_rate',
                  'created_at', 'updated_at')
-        read_only_fields = ('id', 'created_at', 'updated_at')
+        read_only_fields = ('id', 'availability_version', 'created_at', 'updated_at')
     
     def validate(self, attrs):
         """Validate that available_spaces cannot exceed total_spaces."""
@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.dispatch import receiver
+from app.api.realtime.coalescing import get_availability_coalescer
+from .models import ParkingLot, availability_changed
+
+@receiver(availability_changed, sender=ParkingLot)
+def push_availability_change(sender, instance, **kwargs):
+    """
+    Push the lot's new available count to subscribers once the change is committed.
+    Bursts are merged per lot by the coalescer; a failed push never fails the write.
+    """
+    lot_id, available, version = instance.pk, instance.available_spaces, instance.availability_version
+    transaction.on_commit(lambda: get_availability_coalescer().submit(lot_id, available, version))
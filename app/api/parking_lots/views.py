@@ -136,7 +136,8 @@ class ParkingLotViewSet(viewsets.ModelViewSet):
             'occupancy_rate': parking_lot.occupancy_rate,
             'total_spaces': parking_lot.total_spaces,
             'available_spaces': parking_lot.available_spaces,
-            'occupied_spaces': parking_lot.total_spaces - parking_lot.available_spaces
+            'occupied_spaces': parking_lot.total_spaces - parking_lot.available_spaces,
+            'availability_version': parking_lot.availability_version
         })
         
     @action(detail=False, methods=['get'])
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class RealtimeConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "app.api.realtime"
+
+    def ready(self):
+        import app.api.realtime.signals  # noqa
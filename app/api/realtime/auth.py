@@ -0,0 +1,116 @@
+"""
+Cached user lookups for WebSocket authentication.
+
+A reconnect storm presents the same few tokens thousands of times, so the
+authenticated user is cached for WS_AUTH_CACHE_TTL seconds under its user id
+and the token's jti. Every entry also records the user's cache generation;
+saving or deleting a user moves the generation on, which orphans all of that
+user's entries at once without knowing their jtis. Queryset.update() bypasses
+the signals, so such changes apply once the TTL runs out. Cache calls block
+(a Redis round trip), so connects make them from a worker thread.
+"""
+import asyncio
+import logging
+import uuid
+import weakref
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from .backpressure import record
+
+logger = logging.getLogger(__name__)
+
+# Application close codes for rejected handshakes
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_FORBIDDEN = 4403
+CLOSE_INTERNAL_ERROR = 1011
+
+def generation_key(user_id):
+    return f'ws_auth:{user_id}:generation'
+
+def user_cache_key(user_id, jti):
+    return f'ws_auth:{user_id}:{jti}'
+
+def is_active_user(user):
+    return user.is_active and user.status == user.Status.ACTIVE
+
+def invalidate_user(user_id):
+    """Orphan every cached authentication of the user"""
+    try:
+        cache.set(generation_key(user_id), uuid.uuid4().hex, None)
+    except Exception as e:
+        logger.error(f"Error invalidating WebSocket auth cache for user {user_id}: {str(e)}")
+
+def cached_user(user_id, jti):
+    """
+    The cached user for this token, or None, together with the user's current
+    generation. Both come from one cache round trip, which blocks; call it
+    through asyncio.to_thread from the event loop.
+    """
+    keys = [generation_key(user_id), user_cache_key(user_id, jti)]
+    try:
+        values = cache.get_many(keys)
+    except Exception as e:
+        logger.error(f"Error reading WebSocket auth cache: {str(e)}")
+        return None, None
+    generation = values.get(keys[0])
+    entry = values.get(keys[1])
+    if entry is not None and entry['generation'] == generation:
+        return entry['user'], generation
+    return None, generation
+
+def cache_user(user, jti, generation):
+    try:
+        cache.set(
+            user_cache_key(user.pk, jti),
+            {'generation': generation, 'user': user},
+            settings.WS_AUTH_CACHE_TTL
+        )
+    except Exception as e:
+        logger.error(f"Error writing WebSocket auth cache: {str(e)}")
+
+_lookups = weakref.WeakKeyDictionary()
+
+def _pending_lookups():
+    """Database lookups in flight on the running event loop, by (user id, jti)"""
+    loop = asyncio.get_running_loop()
+    if loop not in _lookups:
+        _lookups[loop] = {}
+    return _lookups[loop]
+
+async def _load_user(user_id, jti, generation, use_cache):
+    User = get_user_model()
+    record('auth_database_lookups')
+    try:
+        user = await database_sync_to_async(User.objects.get)(id=user_id)
+    except User.DoesNotExist:
+        return None
+    if use_cache:
+        # The generation was read before the query, so an update landing in
+        # between leaves this entry already stale
+        await asyncio.to_thread(cache_user, user, jti, generation)
+    return user
+
+async def authenticated_user(user_id, jti):
+    """
+    The user a verified token belongs to, or None if it no longer exists.
+    Concurrent connects presenting the same token share one database lookup.
+    """
+    use_cache = settings.WS_AUTH_CACHE_TTL > 0 and bool(jti)
+    generation = None
+    if use_cache:
+        user, generation = await asyncio.to_thread(cached_user, user_id, jti)
+        if user is not None:
+            record('auth_cache_hits')
+            return user
+    record('auth_cache_misses')
+    
+    pending = _pending_lookups()
+    key = (user_id, jti)
+    lookup = pending.get(key)
+    if lookup is None:
+        lookup = pending[key] = asyncio.ensure_future(_load_user(user_id, jti, generation, use_cache))
+        lookup.add_done_callback(lambda _: pending.pop(key, None))
+    # A client that goes away must not cancel the lookup for the others
+    return await asyncio.shield(lookup)
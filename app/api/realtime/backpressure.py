@@ -0,0 +1,133 @@
+"""
+Slow-consumer protection for WebSocket connections.
+
+Channel layer handlers only enqueue serialized frames; a per-connection writer
+task drains them. Each queue holds at most WS_OUTBOUND_QUEUE_SIZE frames and
+applies WS_OUTBOUND_FULL_POLICY when a frame arrives at a full queue:
+
+- drop_oldest: discard the oldest queued frame
+- coalesce: a frame with a key (a lot's availability) replaces the queued
+  frame with the same key at any time; a full queue then drops its oldest
+- disconnect: close the socket with CLOSE_SLOW_CONSUMER
+
+One heartbeat task per event loop pings every connection each
+WS_HEARTBEAT_INTERVAL seconds and closes those silent for WS_IDLE_TIMEOUT.
+"""
+import asyncio
+import itertools
+import logging
+import threading
+import time
+import weakref
+from collections import Counter, OrderedDict
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ('drop_oldest', 'coalesce', 'disconnect')
+
+# Application close codes (4000-4999 are reserved for applications)
+CLOSE_IDLE_TIMEOUT = 4000
+CLOSE_SLOW_CONSUMER = 4008
+
+_metrics = Counter()
+_metrics_lock = threading.Lock()
+
+def record(action, count=1):
+    with _metrics_lock:
+        _metrics[action] += count
+
+def metrics():
+    """Policy actions and heartbeat counters of this process"""
+    with _metrics_lock:
+        counters = dict(_metrics)
+    return {
+        'open_connections': sum(len(heartbeat.connections) for heartbeat in list(_heartbeats.values())),
+        'queue_size': settings.WS_OUTBOUND_QUEUE_SIZE,
+        'full_policy': settings.WS_OUTBOUND_FULL_POLICY,
+        **counters,
+    }
+
+class OutboundQueue:
+    """Bounded FIFO of serialized frames for one connection"""
+    
+    def __init__(self, maxsize, policy):
+        if policy not in POLICIES:
+            raise ValueError(f'Unknown outbound queue policy: {policy}')
+        self.maxsize = maxsize
+        self.policy = policy
+        self._frames = OrderedDict()
+        self._sequence = itertools.count()
+    
+    def __len__(self):
+        return len(self._frames)
+    
+    def push(self, frame, key=None):
+        """
+        Queue a frame and return what happened to it: 'queued', 'coalesced',
+        'dropped_oldest' (queued after evicting the oldest) or 'overflow'
+        (the disconnect policy refused it).
+        """
+        if self.policy == 'coalesce' and key is not None and key in self._frames:
+            self._frames[key] = frame
+            return 'coalesced'
+        
+        action = 'queued'
+        if len(self._frames) >= self.maxsize:
+            if self.policy == 'disconnect':
+                return 'overflow'
+            self._frames.popitem(last=False)
+            action = 'dropped_oldest'
+        
+        if key is None or self.policy != 'coalesce':
+            key = next(self._sequence)
+        self._frames[key] = frame
+        return action
+    
+    def pop(self):
+        return self._frames.popitem(last=False)[1]
+    
+    def clear(self):
+        self._frames.clear()
+
+class Heartbeat:
+    """Pings the connections of one event loop and reaps idle ones"""
+    
+    def __init__(self):
+        self.connections = set()
+        self.task = None
+    
+    def register(self, consumer):
+        self.connections.add(consumer)
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+    
+    def unregister(self, consumer):
+        self.connections.discard(consumer)
+    
+    async def run(self):
+        while self.connections:
+            await asyncio.sleep(settings.WS_HEARTBEAT_INTERVAL)
+            now = time.monotonic()
+            for consumer in list(self.connections):
+                try:
+                    if now - consumer.last_seen > settings.WS_IDLE_TIMEOUT:
+                        self.unregister(consumer)
+                        record('reaped_idle')
+                        await consumer.close(code=CLOSE_IDLE_TIMEOUT)
+                    else:
+                        await consumer.enqueue({'type': 'ping', 'timestamp': time.time()})
+                        record('pings_sent')
+                except Exception as e:
+                    # One broken socket must not stop the heartbeat of the others
+                    self.unregister(consumer)
+                    logger.warning(f"Heartbeat failed for {consumer.channel_name}: {str(e)}")
+
+_heartbeats = weakref.WeakKeyDictionary()
+
+def heartbeat():
+    """The heartbeat of the running event loop"""
+    loop = asyncio.get_running_loop()
+    if loop not in _heartbeats:
+        _heartbeats[loop] = Heartbeat()
+    return _heartbeats[loop]
@@ -0,0 +1,148 @@
+"""
+Coalescing fan-out for lot availability updates.
+
+Write paths submit every change, but a busy lot can change dozens of times
+per second. Updates are merged per lot and flushed once per window, sending
+only the newest state, so group sends per lot are bounded by
+1 / AVAILABILITY_COALESCE_WINDOW instead of the write rate. Flushes run on a
+background event loop, which also keeps the channel layer's connection pool
+warm between sends.
+"""
+import asyncio
+import logging
+import threading
+from django.conf import settings
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from .utils import availability_message, lot_availability_group, send_availability_update
+
+logger = logging.getLogger(__name__)
+
+class AvailabilityCoalescer:
+    """Merges availability updates per lot and sends the latest one per window"""
+    
+    def __init__(self, window=None):
+        self._window = window
+        self._pending = {}
+        self._flush_scheduled = False
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self.counters = {
+            'updates_received': 0,
+            'updates_coalesced': 0,
+            'messages_sent': 0,
+            'send_errors': 0,
+            'flushes': 0,
+        }
+    
+    @property
+    def window(self):
+        """Seconds per window; follows AVAILABILITY_COALESCE_WINDOW unless fixed"""
+        if self._window is not None:
+            return self._window
+        return settings.AVAILABILITY_COALESCE_WINDOW
+    
+    def submit(self, lot_id, available, version):
+        """Record a lot's new state; it is sent at the end of the current window"""
+        # The in-memory layer only wakes consumers on the server's own event loop,
+        # so without a shared broker every update is sent inline instead
+        if self.window <= 0 or isinstance(get_channel_layer(), InMemoryChannelLayer):
+            with self._lock:
+                self.counters['updates_received'] += 1
+            self._send_now(lot_id, available, version)
+            return
+        
+        with self._lock:
+            self.counters['updates_received'] += 1
+            current = self._pending.get(lot_id)
+            if current is not None:
+                self.counters['updates_coalesced'] += 1
+                if current[1] > version:
+                    # An older write committed last; keep the newer state
+                    return
+            self._pending[lot_id] = (available, version)
+            schedule = not self._flush_scheduled
+            self._flush_scheduled = True
+            if schedule:
+                self._start()
+            loop = self._loop
+        
+        if schedule:
+            loop.call_soon_threadsafe(loop.call_later, self.window, self._start_flush, loop)
+    
+    def _send_now(self, lot_id, available, version):
+        try:
+            send_availability_update(lot_id, available, version)
+            sent = True
+        except Exception as e:
+            logger.error(f"Error pushing availability for lot {lot_id}: {str(e)}")
+            sent = False
+        with self._lock:
+            self.counters['messages_sent' if sent else 'send_errors'] += 1
+    
+    def _start(self):
+        """Start the flush loop thread on first use (called with the lock held)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever,
+            name='availability-coalescer',
+            daemon=True
+        )
+        self._thread.start()
+    
+    def _start_flush(self, loop):
+        loop.create_task(self.flush())
+    
+    async def flush(self):
+        """Send the newest pending state of every lot touched during the window"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flush_scheduled = False
+            self.counters['flushes'] += 1
+        
+        channel_layer = get_channel_layer()
+        for lot_id, (available, version) in pending.items():
+            try:
+                await channel_layer.group_send(
+                    lot_availability_group(lot_id),
+                    availability_message(lot_id, available, version)
+                )
+                sent = True
+            except Exception as e:
+                logger.error(f"Error pushing availability for lot {lot_id}: {str(e)}")
+                sent = False
+            with self._lock:
+                self.counters['messages_sent' if sent else 'send_errors'] += 1
+    
+    def close(self, timeout=5):
+        """Flush whatever is pending and stop the loop thread"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.flush(), loop).result(timeout)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        loop.close()
+    
+    def metrics(self):
+        with self._lock:
+            return {
+                **self.counters,
+                'pending_lots': len(self._pending),
+                'window_seconds': self.window,
+            }
+
+_coalescer = None
+_coalescer_lock = threading.Lock()
+
+def get_availability_coalescer():
+    """The process-wide coalescer"""
+    global _coalescer
+    with _coalescer_lock:
+        if _coalescer is None:
+            _coalescer = AvailabilityCoalescer()
+        return _coalescer
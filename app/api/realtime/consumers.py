@@ -1,36 +1,61 @@
+import asyncio
 import json
 import logging
+import time
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.middleware import BaseMiddleware
 from channels.db import database_sync_to_async
-from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from channels.auth import AuthMiddlewareStack
 from urllib.parse import parse_qs
 import jwt
 from django.conf import settings
+from app.api.notification.models import Notification
+from app.api.notification.pipeline import notification_content
+from app.api.parking_lots.models import ParkingLot
+from .utils import BROADCAST_GROUP, lot_availability_group, user_notification_group
+from .auth import (
+    CLOSE_FORBIDDEN, CLOSE_INTERNAL_ERROR, CLOSE_UNAUTHORIZED,
+    authenticated_user, is_active_user
+)
+from .backpressure import CLOSE_SLOW_CONSUMER, OutboundQueue, heartbeat, record
 
 logger = logging.getLogger(__name__)
 
 class TokenAuthMiddleware(BaseMiddleware):
     """
-    Custom middleware to authenticate WebSocket connections using JWT tokens
+    Custom middleware to authenticate WebSocket connections using JWT tokens.
+    Rejected handshakes are accepted and closed at once with an application
+    close code, so clients can tell a bad or expired token (4401) from a
+    deactivated account (4403) and stop retrying either.
     """
     async def __call__(self, scope, receive, send):
-        logger.debug(f"TokenAuthMiddleware called with scope: {scope}")
+        try:
+            user, close_code = await self.authenticate(scope)
+        except Exception as e:
+            logger.error(f"Error in token authentication: {str(e)}")
+            user, close_code = None, CLOSE_INTERNAL_ERROR
         
+        if user is None:
+            record('auth_rejected')
+            await self.reject(receive, send, close_code)
+            return
+        
+        logger.debug(f"User authenticated: {user.email}")
+        scope['user'] = user
+        return await super().__call__(scope, receive, send)
+    
+    async def authenticate(self, scope):
+        """Return (user, None) for a valid WebSocket token, else (None, close code)"""
         # Get the token from subprotocols
         subprotocols = scope.get('subprotocols', [])
-        logger.debug(f"Subprotocols: {subprotocols}")
-        
         if len(subprotocols) >= 2 and subprotocols[0] == 'Bearer':
             token = subprotocols[1]
-            logger.debug(f"Token from subprotocols: {token[:10]}...")
         else:
             logger.warning("No valid token found in subprotocols")
-            return None
-            
+            return None, CLOSE_UNAUTHORIZED
+        
         try:
             # Verify the token
             decoded_token = jwt.decode(
@@ -38,36 +63,36 @@ class TokenAuthMiddleware(BaseMiddleware):
                 settings.SIMPLE_JWT['SIGNING_KEY'],
                 algorithms=[settings.SIMPLE_JWT['ALGORITHM']]
             )
-            
-            # Verify this is a WebSocket token
-            if decoded_token.get('token_type') != 'websocket':
-                logger.warning("Token is not a WebSocket token")
-                return None
-                
-            user_id = decoded_token.get('user_id')
-            logger.debug(f"Token decoded successfully for user_id: {user_id}")
-            
-            if not user_id:
-                logger.warning("No user_id found in token")
-                return None
-                
-            # Get the user
-            User = get_user_model()
-            try:
-                user = await database_sync_to_async(User.objects.get)(id=user_id)
-                logger.debug(f"User authenticated: {user.email}")
-                scope['user'] = user
-                return await super().__call__(scope, receive, send)
-            except User.DoesNotExist:
-                logger.warning(f"User not found for id: {user_id}")
-                return None
-                
         except jwt.InvalidTokenError as e:
             logger.warning(f"Invalid token: {str(e)}")
-            return None
-        except Exception as e:
-            logger.error(f"Error in token authentication: {str(e)}")
-            return None
+            return None, CLOSE_UNAUTHORIZED
+        
+        # Verify this is a WebSocket token
+        if decoded_token.get('token_type') != 'websocket':
+            logger.warning("Token is not a WebSocket token")
+            return None, CLOSE_UNAUTHORIZED
+        
+        user_id = decoded_token.get('user_id')
+        if not user_id:
+            logger.warning("No user_id found in token")
+            return None, CLOSE_UNAUTHORIZED
+        
+        user = await authenticated_user(user_id, decoded_token.get(settings.SIMPLE_JWT['JTI_CLAIM']))
+        if user is None:
+            logger.warning(f"User not found for id: {user_id}")
+            return None, CLOSE_UNAUTHORIZED
+        if not is_active_user(user):
+            logger.warning(f"User {user_id} is deactivated")
+            return None, CLOSE_FORBIDDEN
+        return user, None
+    
+    @staticmethod
+    async def reject(receive, send, close_code):
+        """Complete the handshake only to close it with close_code"""
+        message = await receive()
+        if message['type'] == 'websocket.connect':
+            await send({'type': 'websocket.accept'})
+            await send({'type': 'websocket.close', 'code': close_code})
 
 class NotificationConsumer(AsyncWebsocketConsumer):
     """
@@ -76,8 +101,13 @@ class NotificationConsumer(AsyncWebsocketConsumer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.room_group_name = None
-        self.broadcast_group_name = "notifications"
-
+        self.broadcast_group_name = BROADCAST_GROUP
+        self.subscribed_lots = set()
+        self.outbox = OutboundQueue(settings.WS_OUTBOUND_QUEUE_SIZE, settings.WS_OUTBOUND_FULL_POLICY)
+        self.writer = None
+        self.closing = False
+        self.last_seen = time.monotonic()
+    
     async def connect(self):
         """Handle WebSocket connection"""
         logger.debug("Attempting WebSocket connection")
@@ -88,30 +118,42 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             logger.warning("No authenticated user found in scope")
             await self.close()
             return
-            
+        
         # Accept the connection
         await self.accept()
         logger.info(f"WebSocket connection accepted for user: {self.scope['user'].email}")
         
         # Add the user to their personal notification group
-        self.room_group_name = f"user_{self.scope['user'].id}_notifications"
+        self.room_group_name = user_notification_group(self.scope['user'].id)
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
         )
         logger.debug(f"Added to group: {self.room_group_name}")
-
+        
         # Add the user to the broadcast group
         await self.channel_layer.group_add(
             self.broadcast_group_name,
             self.channel_name
         )
         logger.debug(f"Added to broadcast group: {self.broadcast_group_name}")
-
+        
+        # Ping the client periodically and reap it once it goes silent
+        heartbeat().register(self)
+        
+        # A reconnecting client passes the last notification id it saw;
+        # the groups are joined first so nothing falls between the two
+        last_id = parse_qs(self.scope.get('query_string', b'').decode()).get('last_id')
+        if last_id:
+            await self.replay(last_id[0])
+    
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection"""
         logger.debug(f"WebSocket disconnecting with code: {close_code}")
-        if hasattr(self, 'room_group_name'):
+        heartbeat().unregister(self)
+        self.stop_writer()
+        
+        if self.room_group_name:
             await self.channel_layer.group_discard(
                 self.room_group_name,
                 self.channel_name
@@ -124,24 +166,203 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             self.channel_name
         )
         logger.debug(f"Removed from broadcast group: {self.broadcast_group_name}")
-
+        
+        # Remove from every lot availability group
+        await self.unsubscribe_lots(list(self.subscribed_lots))
+    
     async def receive(self, text_data=None, bytes_data=None):
         """Handle incoming WebSocket messages"""
+        self.last_seen = time.monotonic()
         if text_data:
             logger.debug(f"Received text message: {text_data}")
             try:
                 text_data_json = json.loads(text_data)
-                message = text_data_json.get('message', '')
-                logger.info(f"Received message from {self.scope['user'].email}: {message}")
             except json.JSONDecodeError:
                 logger.warning("Invalid JSON received")
                 return
+            if not isinstance(text_data_json, dict):
+                logger.warning("Invalid message received")
+                return
+            
+            action = text_data_json.get('action')
+            if action == 'pong':
+                return
+            if action == 'ping':
+                await self.enqueue({'type': 'pong', 'timestamp': time.time()})
+                return
+            if action == 'resume':
+                await self.replay(text_data_json.get('last_id'))
+                return
+            if action in ('subscribe', 'unsubscribe'):
+                await self.handle_subscription(action, text_data_json.get('lot_ids'))
+                return
+            message = text_data_json.get('message', '')
+            logger.info(f"Received message from {self.scope['user'].email}: {message}")
         elif bytes_data:
             logger.debug(f"Received binary message: {bytes_data}")
-
+    
     async def send_notification(self, event):
         """Handle notification messages from the channel layer"""
-        logger.debug(f"Received notification: {event}")
+        # Runs once per socket for every broadcast, so formatting stays lazy
+        logger.debug("Received notification: %s", event)
+        await self.enqueue(event.get('content', {}))
+    
+    async def enqueue(self, content, key=None):
+        """
+        Queue a frame for the writer task instead of awaiting the client, so a
+        slow socket never holds up the channel layer; the queue is bounded
+        """
+        if self.closing:
+            return
+        action = self.outbox.push(json.dumps(content), key)
+        if action != 'queued':
+            record(action)
+        if action == 'overflow':
+            logger.warning(f"Closing slow WebSocket consumer: {self.channel_name}")
+            record('disconnected_slow')
+            self.closing = True
+            self.stop_writer()
+            heartbeat().unregister(self)
+            await self.close(code=CLOSE_SLOW_CONSUMER)
+            return
+        if self.writer is None or self.writer.done():
+            self.writer = asyncio.ensure_future(self.drain())
+    
+    async def drain(self):
+        """Send queued frames in order until the queue is empty"""
+        while len(self.outbox):
+            await self.send(text_data=self.outbox.pop())
+            record('frames_sent')
+    
+    def stop_writer(self):
+        if self.writer is not None and not self.writer.done():
+            self.writer.cancel()
+        self.writer = None
+        self.outbox.clear()
+    
+    async def replay(self, last_id):
+        """
+        Stream the notifications stored after last_id, oldest first and at most
+        NOTIFICATION_REPLAY_LIMIT of them, then a replay_complete frame. With
+        has_more set the client resumes from the frame's last_id.
+        
+        A notification whose transaction committed after the client saw a
+        higher id would never be replayed by id alone, so the ones within
+        NOTIFICATION_REPLAY_OVERLAP ids below last_id are sent again first;
+        the client drops the ids it already has.
+        """
+        try:
+            last_id = int(last_id)
+        except (TypeError, ValueError):
+            last_id = -1
+        if last_id < 0:
+            await self.enqueue({
+                'type': 'error',
+                'action': 'resume',
+                'detail': 'last_id must be a non-negative integer'
+            })
+            return
+        
+        limit = settings.NOTIFICATION_REPLAY_LIMIT
+        overlap = settings.NOTIFICATION_REPLAY_OVERLAP
+        # At most overlap rows fall at or below last_id, so this slice still
+        # holds limit + 1 newer ones when there are that many
+        found = await self.missed_notifications(last_id - overlap, limit + 1 + overlap)
+        resent = [content for content in found if content['id'] < last_id]
+        missed = [content for content in found if content['id'] > last_id]
+        for content in resent + missed[:limit]:
+            await self.stream(content)
+            last_id = max(last_id, content['id'])
+        await self.stream({
+            'type': 'replay_complete',
+            'last_id': last_id,
+            'count': len(resent) + min(len(missed), limit),
+            'has_more': len(missed) > limit
+        })
+        record('notifications_replayed', len(resent) + min(len(missed), limit))
+
+    @database_sync_to_async
+    def missed_notifications(self, after_id, limit):
+        """One range query on the (user, id) index, broadcasts included"""
+        return [
+            notification_content(notification)
+            for notification in Notification.for_user(self.scope['user']).filter(
+                id__gt=after_id
+            ).order_by('id')[:limit]
+        ]
+
+    async def stream(self, content):
+        """
+        Queue a replayed frame, waiting for the writer to make room rather
+        than letting the full-queue policy drop or refuse part of the replay
+        """
+        while len(self.outbox) >= self.outbox.maxsize:
+            if self.closing or self.writer is None:
+                return
+            await asyncio.wait([self.writer])
+        await self.enqueue(content)
+
+    async def handle_subscription(self, action, lot_ids):
+        """
+        Join or leave lot availability groups.
+        {"action": "subscribe", "lot_ids": [1, 2]} answers with a snapshot of
+        the lots so clients can apply later deltas by version.
+        """
+        if not isinstance(lot_ids, list) or not all(
+            isinstance(lot_id, int) and not isinstance(lot_id, bool) for lot_id in lot_ids
+        ):
+            await self.enqueue({
+                'type': 'error',
+                'action': action,
+                'detail': 'lot_ids must be a list of integers'
+            })
+            return
+        
+        if action == 'unsubscribe':
+            await self.unsubscribe_lots(lot_ids)
+            await self.enqueue({
+                'type': 'unsubscribed',
+                'lot_ids': sorted(set(lot_ids))
+            })
+            return
+        
+        requested = set(lot_ids) - self.subscribed_lots
+        room = settings.WS_MAX_LOT_SUBSCRIPTIONS - len(self.subscribed_lots)
+        if len(requested) > room:
+            await self.enqueue({
+                'type': 'error',
+                'action': action,
+                'detail': f'At most {settings.WS_MAX_LOT_SUBSCRIPTIONS} lots can be subscribed at once'
+            })
+            return
+        
+        # Join before reading the snapshot so no change can fall between the two
+        for lot_id in requested:
+            await self.channel_layer.group_add(lot_availability_group(lot_id), self.channel_name)
+        lots = await self.lot_snapshot(lot_ids)
+        found = {lot['lot_id'] for lot in lots}
+        await self.unsubscribe_lots(requested - found)
+        self.subscribed_lots |= requested & found
+        await self.enqueue({
+            'type': 'subscribed',
+            'lots': lots
+        })
+    
+    async def unsubscribe_lots(self, lot_ids):
+        for lot_id in lot_ids:
+            await self.channel_layer.group_discard(lot_availability_group(lot_id), self.channel_name)
+            self.subscribed_lots.discard(lot_id)
+    
+    @database_sync_to_async
+    def lot_snapshot(self, lot_ids):
+        return [
+            {'lot_id': lot_id, 'available': available, 'version': version}
+            for lot_id, available, version in ParkingLot.objects.filter(
+                id__in=lot_ids
+            ).order_by('id').values_list('id', 'available_spaces', 'availability_version')
+        ]
+    
+    async def send_availability(self, event):
+        """Handle availability deltas for subscribed lots; a queued delta per lot may be replaced"""
         content = event.get('content', {})
-        await self.send(text_data=json.dumps(content))
-        logger.debug("Notification sent to client") 
\ No newline at end of file
+        await self.enqueue(content, key=('lot', content.get('lot_id')))
@@ -0,0 +1,364 @@
+"""
+Multi-process harness for the shared channel layer.
+
+Each subscriber process plays a replica holding WebSocket connections: it
+joins per-user groups (and the broadcast group) on its own RedisChannelLayer
+and records when messages arrive. The parent process plays the replica that
+calls send_notification_to_user, so every delivery crosses a process boundary
+through the broker, exactly as it does between deployed replicas.
+"""
+import asyncio
+import multiprocessing
+import queue
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+import numpy as np
+from channels_redis.core import RedisChannelLayer
+
+BROADCAST_GROUP = 'notifications'
+
+def user_group(user_id):
+    return f'user_{user_id}_notifications'
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+@contextmanager
+def local_broker(timeout=10):
+    """
+    Start a throwaway redis-server on a free port and yield its URL. Nothing
+    is persisted and the process is stopped on exit.
+    """
+    binary = shutil.which('redis-server')
+    if binary is None:
+        raise RuntimeError('redis-server is not installed')
+    
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as directory:
+        process = subprocess.Popen(
+            [binary, '--port', str(port), '--bind', '127.0.0.1', '--save', '',
+             '--appendonly', 'no', '--dir', directory],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    with socket.create_connection(('127.0.0.1', port), timeout=0.5) as sock:
+                        sock.sendall(b'PING\r\n')
+                        if sock.recv(16).startswith(b'+PONG'):
+                            break
+                except OSError:
+                    pass
+                if time.monotonic() > deadline or process.poll() is not None:
+                    raise RuntimeError('redis-server did not start')
+                time.sleep(0.05)
+            yield f'redis://127.0.0.1:{port}'
+        finally:
+            process.terminate()
+            process.wait(timeout)
+
+def layer_config(url, base_config=None):
+    """
+    Channel layer CONFIG for url, keeping the tuning of base_config (usually
+    settings) but under its own key prefix, so a run against a live broker
+    never touches real user groups.
+    """
+    config = dict(base_config or {})
+    config['prefix'] = 'asgi-harness'
+    host = dict((config.get('hosts') or [{}])[0])
+    if not isinstance(host, dict):
+        host = {}
+    host['address'] = url
+    config['hosts'] = [host]
+    return config
+
+def _subscriber(config, user_ids, expected, ready, results, timeout):
+    """Join the groups of user_ids, then record (sent_at, received_at) per message."""
+    async def run():
+        layer = RedisChannelLayer(**config)
+        channel = await layer.new_channel()
+        for user_id in user_ids:
+            await layer.group_add(user_group(user_id), channel)
+        await layer.group_add(BROADCAST_GROUP, channel)
+        ready.set()
+        
+        received = []
+        deadline = time.monotonic() + timeout
+        while len(received) < expected:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                message = await asyncio.wait_for(layer.receive(channel), remaining)
+            except asyncio.TimeoutError:
+                break
+            received.append((message['content']['sent_at'], time.time()))
+        
+        for user_id in user_ids:
+            await layer.group_discard(user_group(user_id), channel)
+        await layer.group_discard(BROADCAST_GROUP, channel)
+        await layer.close_pools()
+        return received
+    
+    results.put(asyncio.run(run()))
+
+def measure_delivery(url, processes=4, users_per_process=25, messages=1000,
+                     broadcast=False, rate=None, base_config=None, timeout=30):
+    """
+    Send messages from this process to subscribers in other processes and
+    return delivery rate, latency percentiles (ms) and send throughput.
+    
+    Targeted messages go round-robin to the users' groups, so each is expected
+    once; a broadcast is expected once per subscriber process.
+    """
+    config = layer_config(url, base_config)
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    user_ids = list(range(processes * users_per_process))
+    
+    workers = []
+    for index in range(processes):
+        owned = set(user_ids[index::processes])
+        expected = messages if broadcast else sum(
+            1 for number in range(messages) if user_ids[number % len(user_ids)] in owned
+        )
+        ready = context.Event()
+        worker = context.Process(
+            target=_subscriber,
+            args=(config, owned, expected, ready, results, timeout),
+            daemon=True
+        )
+        worker.start()
+        workers.append((worker, ready))
+    for worker, ready in workers:
+        if not ready.wait(timeout):
+            raise RuntimeError('subscriber process did not start')
+    
+    async def publish():
+        layer = RedisChannelLayer(**config)
+        interval = 1 / rate if rate else 0
+        started = time.perf_counter()
+        for number in range(messages):
+            group = BROADCAST_GROUP if broadcast else user_group(user_ids[number % len(user_ids)])
+            await layer.group_send(group, {
+                'type': 'send_notification',
+                'content': {'message': f'Harness message {number}', 'sent_at': time.time()}
+            })
+            if interval:
+                await asyncio.sleep(max(0, started + (number + 1) * interval - time.perf_counter()))
+        elapsed = time.perf_counter() - started
+        await layer.close_pools()
+        return elapsed
+    
+    send_seconds = asyncio.run(publish())
+    
+    received = []
+    for _ in workers:
+        try:
+            received.extend(results.get(timeout=timeout + 5))
+        except queue.Empty:
+            break
+    for worker, _ in workers:
+        worker.join(5)
+        if worker.is_alive():
+            worker.terminate()
+    
+    expected = messages * processes if broadcast else messages
+    latencies = np.array([(received_at - sent_at) * 1000 for sent_at, received_at in received])
+    p50, p95, p99 = (
+        np.percentile(latencies, [50, 95, 99]).round(2).tolist()
+        if len(latencies) else (None, None, None)
+    )
+    return {
+        'processes': processes,
+        'messages': messages,
+        'expected': expected,
+        'delivered': len(received),
+        'delivery_rate': round(len(received) / expected, 4) if expected else 1.0,
+        'latency_ms': {
+            'p50': p50,
+            'p95': p95,
+            'p99': p99,
+            'max': round(float(latencies.max()), 2) if len(latencies) else None
+        },
+        'send_rate': round(messages / send_seconds, 1) if send_seconds else None
+    }
+
+def measure_slow_consumers(connections=20000, messages=100, queue_size=None, policy=None):
+    """
+    Open connections NotificationConsumers whose clients never read, push
+    messages notifications to each, and report the memory they hold and what
+    the outbound queue policy did. Memory should grow with
+    connections * queue_size, not with messages.
+    """
+    import logging
+    import tracemalloc
+    from django.conf import settings
+    from .backpressure import OutboundQueue, metrics
+    from .consumers import NotificationConsumer
+    
+    queue_size = queue_size or settings.WS_OUTBOUND_QUEUE_SIZE
+    policy = policy or settings.WS_OUTBOUND_FULL_POLICY
+    
+    async def run():
+        stalled = asyncio.get_running_loop().create_future()
+        
+        async def stalled_client(message):
+            # Frames are never written; close and accept messages go through
+            if message['type'] == 'websocket.send':
+                await stalled
+        
+        before_actions = metrics()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        consumers = []
+        for index in range(connections):
+            consumer = NotificationConsumer()
+            consumer.channel_name = f'harness.{index}'
+            consumer.base_send = stalled_client
+            consumer.outbox = OutboundQueue(queue_size, policy)
+            consumers.append(consumer)
+        opened = tracemalloc.get_traced_memory()[0]
+        
+        started = time.perf_counter()
+        for number in range(messages):
+            event = {
+                'type': 'send_notification',
+                'content': {'message': f'Harness notification {number}', 'sent_at': time.time()}
+            }
+            for consumer in consumers:
+                await consumer.send_notification(event)
+        elapsed = time.perf_counter() - started
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        queued = [len(consumer.outbox) for consumer in consumers]
+        for consumer in consumers:
+            consumer.stop_writer()
+        await asyncio.sleep(0)
+        after_actions = metrics()
+        return {
+            'connections': connections,
+            'messages_per_connection': messages,
+            'queue_size': queue_size,
+            'policy': policy,
+            'max_queued': max(queued, default=0),
+            'queued_frames': sum(queued),
+            'memory_mb': {
+                'connections': round((opened - baseline) / 2 ** 20, 1),
+                'total': round((current - baseline) / 2 ** 20, 1),
+                'peak': round((peak - baseline) / 2 ** 20, 1),
+            },
+            'bytes_per_connection': round((current - baseline) / connections) if connections else 0,
+            'enqueue_rate': round(connections * messages / elapsed, 1) if elapsed else None,
+            'actions': {
+                action: after_actions.get(action, 0) - before_actions.get(action, 0)
+                for action in ('coalesced', 'dropped_oldest', 'overflow', 'disconnected_slow')
+            }
+        }
+    
+    # Keep per-frame debug logging out of the measurement
+    consumer_logger = logging.getLogger('app.api.realtime.consumers')
+    level = consumer_logger.level
+    consumer_logger.setLevel(logging.INFO)
+    try:
+        return asyncio.run(run())
+    finally:
+        consumer_logger.setLevel(level)
+
+def measure_connect_storm(users, connections=5000, waves=2, timeout=120):
+    """
+    Connect connections sockets at once through TokenAuthMiddleware, spreading
+    them over one WebSocket token per user, then disconnect them all; repeat
+    for each wave. The first wave authenticates cold, later ones replay the
+    same tokens as a reconnect storm does. Sockets are accepted by a bare
+    consumer, so the latency is the handshake and authentication alone.
+    Reports per wave the connect latency (ms) and how often the cache and
+    database were used.
+    """
+    import logging
+    from datetime import timedelta
+    from channels.generic.websocket import AsyncWebsocketConsumer
+    from channels.testing import WebsocketCommunicator
+    from rest_framework_simplejwt.tokens import AccessToken
+    from .backpressure import metrics
+    from .consumers import TokenAuthMiddleware
+    
+    class AcceptingConsumer(AsyncWebsocketConsumer):
+        # No channel layer: the in-memory layer scans every channel on each
+        # receive, which would dominate a storm on one process
+        channel_layer_alias = 'connect-storm'
+        
+        async def connect(self):
+            await self.accept()
+    
+    tokens = []
+    for user in users:
+        token = AccessToken.for_user(user)
+        token.set_exp(lifetime=timedelta(minutes=30))
+        token['token_type'] = 'websocket'
+        tokens.append(str(token))
+    application = TokenAuthMiddleware(AcceptingConsumer.as_asgi())
+    
+    async def connect(token):
+        communicator = WebsocketCommunicator(
+            application, '/ws/notifications/', subprotocols=['Bearer', token]
+        )
+        started = time.perf_counter()
+        connected, _ = await communicator.connect(timeout=timeout)
+        return communicator, connected, (time.perf_counter() - started) * 1000
+    
+    def percentiles(values):
+        values = np.array(values)
+        if not len(values):
+            return {'p50': None, 'p95': None, 'p99': None, 'max': None}
+        p50, p95, p99 = np.percentile(values, [50, 95, 99]).round(2).tolist()
+        return {'p50': p50, 'p95': p95, 'p99': p99, 'max': round(float(values.max()), 2)}
+    
+    async def wave():
+        before = metrics()
+        started = time.perf_counter()
+        results = await asyncio.gather(*(
+            connect(tokens[number % len(tokens)]) for number in range(connections)
+        ))
+        elapsed = time.perf_counter() - started
+        after = metrics()
+        await asyncio.gather(*(communicator.disconnect() for communicator, _, _ in results))
+        
+        latencies = [latency for _, connected, latency in results if connected]
+        return {
+            'accepted': len(latencies),
+            'latency_ms': percentiles(latencies),
+            'connect_rate': round(connections / elapsed, 1) if elapsed else None,
+            **{
+                counter: after.get(counter, 0) - before.get(counter, 0)
+                for counter in ('auth_cache_hits', 'auth_cache_misses', 'auth_database_lookups', 'auth_rejected')
+            }
+        }
+    
+    async def run():
+        return [await wave() for _ in range(waves)]
+    
+    # Keep per-connection logging out of the measurement
+    loggers = [logging.getLogger(name) for name in ('app.api.realtime.consumers', 'app.api.realtime.auth')]
+    levels = [logger.level for logger in loggers]
+    for logger in loggers:
+        logger.setLevel(logging.WARNING)
+    try:
+        results = asyncio.run(run())
+    finally:
+        for logger, level in zip(loggers, levels):
+            logger.setLevel(level)
+    return {
+        'connections': connections,
+        'tokens': len(tokens),
+        'waves': results
+    }
@@ -0,0 +1,61 @@
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from app.api.realtime.harness import local_broker, measure_delivery
+
+class Command(BaseCommand):
+    help = 'Measures cross-process notification latency and delivery rate over the Redis channel layer'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--redis-url',
+            help='Broker to test (default: REDIS_URL, or a throwaway local redis-server)'
+        )
+        parser.add_argument(
+            '--local-broker',
+            action='store_true',
+            help='Always start a throwaway local redis-server'
+        )
+        parser.add_argument('--processes', type=int, default=4, help='Subscriber processes')
+        parser.add_argument('--users', type=int, default=25, help='User groups joined per process')
+        parser.add_argument('--messages', type=int, default=1000)
+        parser.add_argument('--rate', type=float, help='Messages per second (default: unpaced)')
+        parser.add_argument(
+            '--broadcast',
+            action='store_true',
+            help='Send to the broadcast group instead of per-user groups'
+        )
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def run(self, url, options):
+        # Reuse the deployed pool, capacity and expiry tuning when it is configured
+        layer = settings.CHANNEL_LAYERS['default']
+        base_config = layer.get('CONFIG') if 'redis' in layer['BACKEND'].lower() else None
+        return measure_delivery(
+            url,
+            processes=options['processes'],
+            users_per_process=options['users'],
+            messages=options['messages'],
+            broadcast=options['broadcast'],
+            rate=options['rate'],
+            base_config=base_config,
+            timeout=options['timeout']
+        )
+
+    def handle(self, *args, **options):
+        url = options['redis_url'] or (None if options['local_broker'] else settings.REDIS_URL)
+        try:
+            if url:
+                result = self.run(url, options)
+            else:
+                with local_broker() as url:
+                    self.stdout.write(f'Started local broker at {url}')
+                    result = self.run(url, options)
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        
+        self.stdout.write(json.dumps(result, indent=2))
+        self.stdout.write(self.style.SUCCESS(
+            f"Delivered {result['delivered']}/{result['expected']} messages "
+            f"({result['delivery_rate']:.1%}), p99 latency {result['latency_ms']['p99']} ms"
+        ))
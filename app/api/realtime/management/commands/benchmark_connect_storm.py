@@ -0,0 +1,53 @@
+import json
+import random
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from app.api.realtime.harness import measure_connect_storm
+from app.utils.seeding import DatasetGenerator
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Measures WebSocket connect latency while thousands of clients connect at once'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=5000)
+        parser.add_argument('--users', type=int, default=500, help='Distinct users (one token each)')
+        parser.add_argument('--waves', type=int, default=2, help='Storms replaying the same tokens')
+        parser.add_argument('--cache-ttl', type=int, help='Default: WS_AUTH_CACHE_TTL; 0 disables the cache')
+        parser.add_argument('--seed', type=int, default=42)
+    
+    def handle(self, *args, **options):
+        tag = f'wsstorm{random.Random(options["seed"]).randrange(10 ** 6)}.'
+        users = list(User.objects.filter(username__startswith=tag).order_by('id'))
+        if len(users) < options['users']:
+            User.objects.filter(username__startswith=tag).delete()
+            DatasetGenerator(
+                users=options['users'],
+                lots=0,
+                days=1,
+                reservations=0,
+                seed=options['seed'],
+                prefix=tag
+            ).create_users()
+            users = list(User.objects.filter(username__startswith=tag).order_by('id'))
+        users = users[:options['users']]
+        
+        overrides = {}
+        if options['cache_ttl'] is not None:
+            overrides['WS_AUTH_CACHE_TTL'] = options['cache_ttl']
+        with override_settings(**overrides):
+            result = measure_connect_storm(
+                users,
+                connections=options['connections'],
+                waves=options['waves']
+            )
+        self.stdout.write(json.dumps(result, indent=2))
+        
+        for number, wave in enumerate(result['waves'], 1):
+            self.stdout.write(self.style.SUCCESS(
+                f"Wave {number}: {wave['accepted']}/{result['connections']} connected, "
+                f"p50 {wave['latency_ms']['p50']} ms, p99 {wave['latency_ms']['p99']} ms, "
+                f"{wave['auth_database_lookups']} database lookups"
+            ))
@@ -0,0 +1,26 @@
+import json
+from django.core.management.base import BaseCommand
+from app.api.realtime.backpressure import POLICIES
+from app.api.realtime.harness import measure_slow_consumers
+
+class Command(BaseCommand):
+    help = 'Measures memory held by WebSocket consumers whose clients stop reading'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=20000)
+        parser.add_argument('--messages', type=int, default=100, help='Notifications pushed to each connection')
+        parser.add_argument('--queue-size', type=int, help='Default: WS_OUTBOUND_QUEUE_SIZE')
+        parser.add_argument('--policy', choices=POLICIES, help='Default: WS_OUTBOUND_FULL_POLICY')
+
+    def handle(self, *args, **options):
+        result = measure_slow_consumers(
+            connections=options['connections'],
+            messages=options['messages'],
+            queue_size=options['queue_size'],
+            policy=options['policy']
+        )
+        self.stdout.write(json.dumps(result, indent=2))
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['connections']} stalled connections hold {result['memory_mb']['total']} MB "
+            f"({result['bytes_per_connection']} bytes each, at most {result['max_queued']} frames queued)"
+        ))
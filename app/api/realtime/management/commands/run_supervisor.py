@@ -0,0 +1,56 @@
+import asyncio
+import signal
+from django.core.management.base import BaseCommand, CommandError
+from app.api.notification.dispatcher import get_notification_dispatcher
+from app.api.realtime.supervisor import get_task_supervisor
+
+class Command(BaseCommand):
+    help = 'Runs the periodic jobs (reservation expiry, reminders, report rollups) under the task supervisor'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--job',
+            action='append',
+            dest='jobs',
+            help='Run only this job (repeatable); defaults to every job in PERIODIC_JOBS'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run each job once and exit, without the leader lease'
+        )
+    
+    def handle(self, *args, **options):
+        supervisor = get_task_supervisor()
+        if options['jobs']:
+            unknown = set(options['jobs']) - set(supervisor.jobs)
+            if unknown:
+                raise CommandError(f"Unknown jobs: {', '.join(sorted(unknown))}")
+            supervisor.jobs = {name: supervisor.jobs[name] for name in options['jobs']}
+        
+        if options['once']:
+            asyncio.run(self.run_once(supervisor))
+        else:
+            self.stdout.write(f"Supervising {', '.join(supervisor.jobs)} as {supervisor.identity}")
+            asyncio.run(self.supervise(supervisor))
+        # Jobs queue their notification pushes; deliver them before exiting
+        get_notification_dispatcher().close()
+        
+        self.stdout.write(self.style.SUCCESS('Task supervisor stopped'))
+    
+    async def run_once(self, supervisor):
+        for job in supervisor.jobs.values():
+            await supervisor.run_job(job)
+            outcome = f'failed: {job.last_error}' if job.last_error else f'returned {job.last_result}'
+            self.stdout.write(f'{job.name} {outcome} in {job.last_duration:.2f}s')
+    
+    async def supervise(self, supervisor):
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stopping.set)
+        
+        await supervisor.start()
+        await stopping.wait()
+        self.stdout.write('Stopping the task supervisor after running jobs finish...')
+        await supervisor.stop()
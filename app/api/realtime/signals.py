@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .auth import invalidate_user
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_websocket_auth(sender, instance, **kwargs):
+    """
+    Drop the user's cached WebSocket authentications whenever the account
+    changes, so a deactivation or role change applies to the next connect.
+    """
+    invalidate_user(instance.pk)
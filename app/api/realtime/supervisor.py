@@ -0,0 +1,273 @@
+"""
+Periodic background jobs shared by all replicas.
+
+The supervisor runs on an asyncio event loop: the ASGI server's own when the
+lifespan handler starts it, or its own under manage.py run_supervisor. Every
+job in PERIODIC_JOBS is a plain function run in a worker thread every
+interval seconds plus a random jitter of up to jitter seconds, so jobs and
+replicas do not hit the database in lockstep. Only the replica holding the
+leader lease in the cache runs jobs; the others keep contending for it, so a
+replica that dies hands over within SUPERVISOR_LEASE_TTL seconds, and the
+lease is checked again right before each run. The lease lives in Redis at
+REDIS_URL; without it the local memory cache holds it and every process
+leads itself. Lease calls block, so they are made from worker threads, never
+on the loop.
+"""
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+import redis
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+LEADER_KEY = 'supervisor:leader'
+
+# Compare-and-expire and compare-and-delete, so the lease is only renewed or
+# released while it is still ours
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+class PeriodicJob:
+    """A job function with its schedule and run statistics"""
+    
+    def __init__(self, name, func, interval, jitter=0):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.running = False
+        self.next_run = None
+        self.runs = 0
+        self.failures = 0
+        self.last_result = None
+        self.last_error = None
+        self.last_duration = None
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+        self.last_lag = None
+        self.max_lag = 0.0
+    
+    def delay(self):
+        """Seconds until the run after the one just due"""
+        return self.interval + random.uniform(0, self.jitter)
+    
+    def record(self, lag, duration):
+        self.runs += 1
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.last_duration = duration
+        self.max_duration = max(self.max_duration, duration)
+        self.total_duration += duration
+    
+    def metrics(self):
+        return {
+            'interval': self.interval,
+            'jitter': self.jitter,
+            'running': self.running,
+            'next_run_in': None if self.next_run is None else max(0.0, self.next_run - time.monotonic()),
+            'runs': self.runs,
+            'failures': self.failures,
+            'last_result': self.last_result,
+            'last_error': self.last_error,
+            'last_duration': self.last_duration,
+            'avg_duration': self.total_duration / self.runs if self.runs else None,
+            'max_duration': self.max_duration,
+            'last_lag': self.last_lag,
+            'max_lag': self.max_lag,
+        }
+
+class TaskSupervisor:
+    """Schedules registered jobs on the running event loop while this replica leads"""
+    
+    def __init__(self):
+        self.jobs = {}
+        self.identity = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.is_leader = False
+        self._tasks = []
+        self._stopping = None
+        self._redis = None
+    
+    def register(self, name, func, interval, jitter=0):
+        """Add a job; func is a callable or the dotted path of one"""
+        if isinstance(func, str):
+            func = import_string(func)
+        if interval <= 0:
+            raise ValueError(f'Periodic job {name} needs a positive interval')
+        self.jobs[name] = PeriodicJob(name, func, interval, jitter)
+        return self.jobs[name]
+    
+    def register_from_settings(self):
+        for name, options in settings.PERIODIC_JOBS.items():
+            self.register(name, options['task'], options['interval'], options.get('jitter', 0))
+    
+    @property
+    def started(self):
+        return bool(self._tasks)
+    
+    async def start(self):
+        """Start contending for the lease and scheduling jobs on the running loop"""
+        if self._tasks:
+            return
+        self._stopping = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._lead())] + [
+            asyncio.create_task(self._schedule(job)) for job in self.jobs.values()
+        ]
+        logger.info(f"Task supervisor {self.identity} started with jobs: {', '.join(self.jobs) or 'none'}")
+    
+    async def stop(self, timeout=None):
+        """
+        Stop scheduling, wait up to timeout seconds (SUPERVISOR_SHUTDOWN_TIMEOUT
+        by default) for running jobs and give up the lease. A job still running
+        then is abandoned; its worker thread finishes on its own.
+        """
+        if not self._tasks:
+            return
+        if timeout is None:
+            timeout = settings.SUPERVISOR_SHUTDOWN_TIMEOUT
+        self._stopping.set()
+        tasks, self._tasks = self._tasks, []
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        if pending:
+            running = [job.name for job in self.jobs.values() if job.running]
+            logger.warning(f"Task supervisor stopped before jobs finished: {', '.join(running)}")
+            for task in pending:
+                task.cancel()
+            await asyncio.wait(pending)
+        
+        self.is_leader = False
+        try:
+            await asyncio.to_thread(self._release_lease)
+        except Exception as e:
+            logger.error(f"Error releasing the supervisor lease: {str(e)}")
+        logger.info(f"Task supervisor {self.identity} stopped")
+    
+    async def _wait(self, seconds):
+        """Sleep for up to seconds; True once the supervisor is stopping"""
+        if seconds > 0:
+            try:
+                await asyncio.wait_for(self._stopping.wait(), seconds)
+            except asyncio.TimeoutError:
+                pass
+        return self._stopping.is_set()
+    
+    def _redis_client(self):
+        """The client the lease is kept with, or None without REDIS_URL"""
+        if not settings.REDIS_URL:
+            return None
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(
+                settings.REDIS_URL,
+                socket_connect_timeout=5,
+                socket_timeout=5
+            )
+        return self._redis
+    
+    def _acquire_lease(self, ttl):
+        """Take the free lease or renew our own; blocks on Redis, so run it in a thread"""
+        client = self._redis_client()
+        if client is None:
+            # The local memory cache is private to the process, so nothing
+            # takes the lease between the get and the touch
+            if cache.add(LEADER_KEY, self.identity, ttl):
+                return True
+            if cache.get(LEADER_KEY) == self.identity:
+                return cache.touch(LEADER_KEY, ttl)
+            return False
+        if client.set(LEADER_KEY, self.identity, nx=True, ex=ttl):
+            return True
+        return bool(client.eval(RENEW_SCRIPT, 1, LEADER_KEY, self.identity, ttl))
+    
+    def _release_lease(self):
+        client = self._redis_client()
+        if client is None:
+            if cache.get(LEADER_KEY) == self.identity:
+                cache.delete(LEADER_KEY)
+        else:
+            client.eval(RELEASE_SCRIPT, 1, LEADER_KEY, self.identity)
+    
+    async def _check_lease(self):
+        """Take or renew the lease from a worker thread; True while this replica leads"""
+        try:
+            leader = await asyncio.to_thread(self._acquire_lease, settings.SUPERVISOR_LEASE_TTL)
+        except Exception as e:
+            logger.error(f"Error renewing the supervisor lease: {str(e)}")
+            leader = False
+        if leader != self.is_leader:
+            logger.info(f"Task supervisor {self.identity} {'is now' if leader else 'is no longer'} the leader")
+        self.is_leader = leader
+        return leader
+    
+    async def _lead(self):
+        while True:
+            await self._check_lease()
+            # Renewing at a third of the TTL survives one missed renewal
+            if await self._wait(settings.SUPERVISOR_LEASE_TTL / 3):
+                return
+    
+    async def _schedule(self, job):
+        # The first run is jittered too, so replicas restarted together spread out
+        scheduled = time.monotonic() + random.uniform(0, job.jitter)
+        while True:
+            job.next_run = scheduled
+            if await self._wait(scheduled - time.monotonic()):
+                return
+            started = time.monotonic()
+            # Renewed before the run as well: a lease lost since the last
+            # renewal must not let two replicas run the same job
+            if self.is_leader and await self._check_lease():
+                await self.run_job(job, lag=started - scheduled)
+            # A run longer than the interval delays the next one rather than
+            # queueing catch-up runs; the overrun shows up as lag
+            scheduled = max(scheduled, started) + job.delay()
+    
+    async def run_job(self, job, lag=0.0):
+        """Run a job once in a worker thread, recording its duration, lag and outcome"""
+        job.running = True
+        started = time.monotonic()
+        try:
+            job.last_result = await database_sync_to_async(job.func, thread_sensitive=False)()
+            job.last_error = None
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            logger.exception(f"Periodic job {job.name} failed")
+        finally:
+            job.running = False
+            job.record(lag, time.monotonic() - started)
+    
+    def metrics(self):
+        return {
+            'identity': self.identity,
+            'started': self.started,
+            'leader': self.is_leader,
+            'jobs': {name: job.metrics() for name, job in self.jobs.items()},
+        }
+
+_supervisor = None
+
+def get_task_supervisor():
+    """The process-wide supervisor with the jobs from PERIODIC_JOBS"""
+    global _supervisor
+    if _supervisor is None:
+        supervisor = TaskSupervisor()
+        supervisor.register_from_settings()
+        _supervisor = supervisor
+    return _supervisor
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import RealtimeMetricsView
+
+urlpatterns = [
+    path('realtime/metrics/', RealtimeMetricsView.as_view()),
+]
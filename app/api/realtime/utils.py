@@ -1,27 +1,60 @@
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 
+BROADCAST_GROUP = "notifications"
+
+def user_notification_group(user_id):
+    return f"user_{user_id}_notifications"
+
 def send_notification_to_all(message):
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        "notifications",
-        {
-            "type": "send_notification",
-            "content": {
-                "message": message
-            }
+    """
+    Record one broadcast notification and push it to every connected user.
+    message is the text, or a dict with 'type', 'message' and 'data'.
+    """
+    # The pipeline imports the group names above
+    from app.api.notification.pipeline import NotificationPipeline
+    payload = message if isinstance(message, dict) else {"message": message}
+    with NotificationPipeline() as pipeline:
+        notification = pipeline.broadcast(
+            payload.get("message", ""),
+            payload.get("data"),
+            type=payload.get("type")
+        )
+    return notification
+
+def send_notification_to_user(user_id, message, extra_data=None, notification_type=None):
+    """
+    Record a notification for the user and push it with its id once committed.
+    Without notification_type, a 'type' in extra_data is taken as the type;
+    with it, extra_data cannot have one.
+    """
+    from app.api.notification.pipeline import NotificationPipeline
+    data = dict(extra_data or {})
+    if notification_type is None:
+        notification_type = data.pop("type", None)
+    with NotificationPipeline() as pipeline:
+        notification = pipeline.notify_user(user_id, message, data, type=notification_type)
+    return notification
+
+def lot_availability_group(lot_id):
+    return f"lot_{lot_id}_availability"
+
+def availability_message(lot_id, available, version):
+    """Channel layer event carrying a lot's available count"""
+    return {
+        "type": "send_availability",
+        "content": {
+            "type": "availability",
+            "lot_id": lot_id,
+            "available": available,
+            "version": version
         }
-    )
+    }
 
-def send_notification_to_user(user_id, message, extra_data=None):
+def send_availability_update(lot_id, available, version):
+    """Push a lot's new available count to every socket subscribed to it"""
     channel_layer = get_channel_layer()
     async_to_sync(channel_layer.group_send)(
-        f"user_{user_id}_notifications",
-        {
-            "type": "send_notification",
-            "content": {
-                "message": message,
-                **(extra_data or {})
-            }
-        }
-    ) 
\ No newline at end of file
+        lot_availability_group(lot_id),
+        availability_message(lot_id, available, version)
+    )
@@ -0,0 +1,20 @@
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from app.api.notification.dispatcher import get_notification_dispatcher
+from . import backpressure
+from .coalescing import get_availability_coalescer
+from .supervisor import get_task_supervisor
+
+class RealtimeMetricsView(APIView):
+    """Counters of this process's real-time fan-out (each replica reports its own)"""
+    
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request):
+        return Response({
+            'availability': get_availability_coalescer().metrics(),
+            'connections': backpressure.metrics(),
+            'notifications': get_notification_dispatcher().metrics(),
+            'supervisor': get_task_supervisor().metrics(),
+        })
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class ReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'app.api.reports' 
\ No newline at end of file
+    name = 'app.api.reports'
+
+    def ready(self):
+        import app.api.reports.signals  # noqa
@@ -0,0 +1,104 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from app.api.reservations.models import Reservation
+from .models import DailyReport, MonthlyReport, ParkingLotReport, day_bounds
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+class Echo:
+    """File-like object whose write() hands the line back to the caller."""
+    
+    def write(self, value):
+        return value
+
+def export_source(report_type, start_date, end_date):
+    """
+    Return (columns, queryset) for an export type, or None if it is unknown.
+    
+    Columns are (CSV header, NDJSON key, queryset lookup) triples; related
+    names are joined in the query so rows never trigger lazy loads.
+    """
+    if report_type == 'daily':
+        columns = [
+            ('Date', 'date', 'date'),
+            ('Total Revenue', 'total_revenue', 'total_revenue'),
+            ('Total Reservations', 'total_reservations', 'total_reservations'),
+            ('Average Duration', 'average_duration', 'average_duration'),
+            ('Peak Hour', 'peak_hour', 'peak_hour'),
+            ('Occupancy Rate', 'occupancy_rate', 'occupancy_rate'),
+        ]
+        queryset = DailyReport.objects.filter(
+            date__range=[start_date, end_date]
+        ).order_by('date')
+    elif report_type == 'monthly':
+        columns = [
+            ('Year', 'year', 'year'),
+            ('Month', 'month', 'month'),
+            ('Total Revenue', 'total_revenue', 'total_revenue'),
+            ('Total Reservations', 'total_reservations', 'total_reservations'),
+            ('Average Duration', 'average_duration', 'average_duration'),
+            ('Average Occupancy Rate', 'average_occupancy_rate', 'average_occupancy_rate'),
+            ('Peak Day', 'peak_day', 'peak_day'),
+        ]
+        queryset = MonthlyReport.objects.filter(
+            Q(year__gt=start_date.year) | Q(year=start_date.year, month__gte=start_date.month),
+            Q(year__lt=end_date.year) | Q(year=end_date.year, month__lte=end_date.month)
+        ).order_by('year', 'month')
+    elif report_type == 'parking_lot':
+        columns = [
+            ('Parking Lot', 'parking_lot_name', 'parking_lot__name'),
+            ('Date', 'date', 'date'),
+            ('Total Revenue', 'total_revenue', 'total_revenue'),
+            ('Total Reservations', 'total_reservations', 'total_reservations'),
+            ('Occupancy Rate', 'occupancy_rate', 'occupancy_rate'),
+            ('Average Duration', 'average_duration', 'average_duration'),
+            ('Peak Hour', 'peak_hour', 'peak_hour'),
+        ]
+        queryset = ParkingLotReport.objects.filter(
+            date__range=[start_date, end_date]
+        ).order_by('date', 'parking_lot_id')
+    elif report_type == 'reservations':
+        columns = [
+            ('ID', 'id', 'id'),
+            ('Parking Lot ID', 'parking_lot_id', 'parking_lot_id'),
+            ('Parking Lot', 'parking_lot_name', 'parking_lot__name'),
+            ('Parking Space ID', 'parking_space_id', 'parking_space_id'),
+            ('User ID', 'user_id', 'user_id'),
+            ('Vehicle Plate', 'vehicle_plate', 'vehicle_plate'),
+            ('Start Time', 'start_time', 'start_time'),
+            ('End Time', 'end_time', 'end_time'),
+            ('Status', 'status', 'status'),
+            ('Hourly Rate', 'hourly_rate', 'hourly_rate'),
+            ('Duration', 'duration', 'duration'),
+            ('Total Cost', 'total_cost', 'total_cost'),
+            ('Created At', 'created_at', 'created_at'),
+            ('Updated At', 'updated_at', 'updated_at'),
+        ]
+        queryset = Reservation.objects.filter(
+            start_time__gte=day_bounds(start_date)[0],
+            start_time__lt=day_bounds(end_date)[1]
+        ).order_by('start_time', 'id')
+    else:
+        return None
+    
+    return columns, queryset.values_list(*[lookup for _, _, lookup in columns])
+
+def stream_rows(columns, rows, file_format):
+    """Yield the encoded export line by line, header first."""
+    if file_format == 'ndjson':
+        keys = [key for _, key, _ in columns]
+        for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield json.dumps(dict(zip(keys, row)), cls=DjangoJSONEncoder) + '\n'
+    else:
+        writer = csv.writer(Echo())
+        yield writer.writerow([header for header, _, _ in columns])
+        for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield writer.writerow(row)
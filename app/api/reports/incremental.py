@@ -0,0 +1,135 @@
+"""Incremental maintenance of report rows from reservation changes."""
+from collections import namedtuple
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from app.api.parking_lots.models import ParkingLot
+from .models import (
+    DailyReport, ParkingLotReport,
+    REPORTABLE_STATUSES, busiest_hour
+)
+from .sketches import add_value
+from . import hyperloglog
+from .hyperloglog import normalize_plate
+
+CONTRIBUTION_FIELDS = (
+    'parking_lot_id', 'start_time', 'status', 'total_cost', 'duration',
+    'user_id', 'vehicle_plate'
+)
+
+Contribution = namedtuple(
+    'Contribution',
+    ['parking_lot_id', 'date', 'hour', 'total_cost', 'duration', 'user_id', 'plate']
+)
+
+def reservation_contribution(parking_lot_id, start_time, status, total_cost, duration,
+                             user_id, vehicle_plate):
+    """What a reservation adds to the reports, or None if it is not counted."""
+    if status not in REPORTABLE_STATUSES or start_time is None:
+        return None
+    local_start = timezone.localtime(start_time)
+    return Contribution(
+        parking_lot_id,
+        local_start.date(),
+        local_start.hour,
+        Decimal(total_cost),
+        float(duration),
+        user_id,
+        normalize_plate(vehicle_plate)
+    )
+
+def _apply_totals(report, contribution, sign):
+    """Add (sign=1) or remove (sign=-1) a contribution from a report's running totals."""
+    report.total_reservations = max(0, report.total_reservations + sign)
+    report.total_revenue = max(Decimal('0'), report.total_revenue + sign * contribution.total_cost)
+    report.total_duration = max(0.0, report.total_duration + sign * contribution.duration)
+    report.average_duration = (
+        report.total_duration / report.total_reservations
+        if report.total_reservations else 0
+    )
+
+def _apply_hour(report, contribution, sign):
+    """Move a contribution in or out of a report's hourly histogram."""
+    hourly_counts = list(report.hourly_counts) or [0] * 24
+    hourly_counts[contribution.hour] = max(0, hourly_counts[contribution.hour] + sign)
+    report.hourly_counts = hourly_counts
+    report.peak_hour = busiest_hour(hourly_counts)
+
+def _apply_sketches(report, contribution, sign):
+    """Move a contribution's duration and revenue in or out of the report's sketches."""
+    report.duration_sketch = add_value(report.duration_sketch, contribution.duration, sign)
+    report.revenue_sketch = add_value(report.revenue_sketch, contribution.total_cost, sign)
+
+def _apply_distinct(report, contribution):
+    """
+    Add a contribution's user and plate to the lot-day HyperLogLog sketches.
+    Sketches only grow; regenerating the report rebuilds them exactly.
+    """
+    report.visitor_sketch = hyperloglog.dump(
+        hyperloglog.add(hyperloglog.load(report.visitor_sketch), [contribution.user_id])
+    )
+    report.plate_sketch = hyperloglog.dump(
+        hyperloglog.add(hyperloglog.load(report.plate_sketch), [contribution.plate])
+    )
+
+def _locked_report(model, sign, **lookup):
+    """
+    Lock the report row and return it with whether it was just created; only
+    additions may create a missing row.
+    """
+    queryset = model.objects.select_for_update()
+    if sign > 0:
+        return queryset.get_or_create(**lookup)
+    return queryset.filter(**lookup).first(), False
+
+def _generate_report(model, contribution):
+    """Fill a new row from every reservation of its day, the changed one included."""
+    if model is DailyReport:
+        return DailyReport.generate_report(contribution.date, rollup=False)
+    parking_lot = ParkingLot.objects.get(pk=contribution.parking_lot_id)
+    return ParkingLotReport.generate_report(parking_lot, contribution.date)
+
+def apply_contribution(contribution, sign):
+    """
+    Update the day and lot-day rows touched by one reservation and mark the
+    day's rollups stale.
+    """
+    date = contribution.date
+    with transaction.atomic():
+        # Rows are always locked in the same order to avoid deadlocks
+        reports = {}
+        for model, lookup in (
+            (DailyReport, {'date': date}),
+            (ParkingLotReport, {'parking_lot_id': contribution.parking_lot_id, 'date': date}),
+        ):
+            report, created = _locked_report(model, sign, **lookup)
+            reports[model] = report
+            if created:
+                # The day may already have reservations, from before incremental
+                # maintenance or since its row was deleted, so a new row is
+                # generated in full rather than from this one change. Creating
+                # it first keeps concurrent writers waiting on the row lock.
+                reports[model] = _generate_report(model, contribution)
+            elif report is not None:
+                _apply_totals(report, contribution, sign)
+                _apply_hour(report, contribution, sign)
+                _apply_sketches(report, contribution, sign)
+                if model is ParkingLotReport and sign > 0:
+                    _apply_distinct(report, contribution)
+                report.source_watermark = timezone.now()
+                report.save()
+        
+        # Rolling weekly, monthly and yearly rows up here would lock them until
+        # the booking commits, serializing every booking on the year's row, so
+        # the roll_up_reports job does it from the marked daily rows
+        if reports[DailyReport] is not None:
+            DailyReport.objects.filter(pk=reports[DailyReport].pk).update(rollups_stale=True)
+
+def record_reservation_change(previous, current):
+    """Replace a reservation's previous contribution with its current one."""
+    if previous == current:
+        return
+    if previous is not None:
+        apply_contribution(previous, -1)
+    if current is not None:
+        apply_contribution(current, 1)
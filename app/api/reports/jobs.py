@@ -0,0 +1,169 @@
+"""Background execution of report jobs submitted through the API."""
+import logging
+import os
+import threading
+from datetime import date, timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from app.api.realtime.utils import send_notification_to_user
+from .exports import export_source, stream_rows
+from .models import ReportJob
+from .serializers import DateRangeReportSerializer
+from .services import ReportService
+
+logger = logging.getLogger(__name__)
+
+# Progress events are pushed at most this many times per job
+PROGRESS_STEPS = 10
+
+def notify_job(job, message):
+    """Push a job event to the requesting admin's notification group."""
+    try:
+        send_notification_to_user(job.requested_by_id, message, {
+            'type': 'report_job',
+            'job_id': job.pk,
+            'job_type': job.job_type,
+            'status': job.status,
+            'progress': job.progress
+        })
+    except Exception:
+        # A missing channel layer must not fail the job itself
+        logger.exception(f"Could not notify user {job.requested_by_id} about report job {job.pk}")
+
+def submit_job(user, job_type, params):
+    """Queue a report job and return it without computing anything."""
+    job = ReportJob.objects.create(requested_by=user, job_type=job_type, params=params)
+    notify_job(job, f'Report job {job.pk} queued')
+    return job
+
+def claim_next_job():
+    """
+    Move the oldest pending job, or a running one whose worker stopped renewing
+    its lease, to running; returns None when the queue is empty. A lost job
+    that already used its REPORT_JOB_MAX_ATTEMPTS fails instead.
+    """
+    while True:
+        now = timezone.now()
+        expired = now - timedelta(seconds=settings.REPORT_JOB_LEASE_TIMEOUT)
+        with transaction.atomic():
+            job = ReportJob.objects.select_for_update(skip_locked=True).filter(
+                Q(status=ReportJob.Status.PENDING) |
+                Q(status=ReportJob.Status.RUNNING, heartbeat_at__lt=expired)
+            ).order_by('created_at').first()
+            if job is None:
+                return None
+            
+            if job.attempts >= settings.REPORT_JOB_MAX_ATTEMPTS:
+                job.status = ReportJob.Status.FAILED
+                job.error = f'Worker lost during each of {job.attempts} attempts'
+                job.finished_at = now
+                job.save(update_fields=['status', 'error', 'finished_at'])
+            else:
+                job.status = ReportJob.Status.RUNNING
+                job.started_at = job.heartbeat_at = now
+                job.attempts += 1
+                job.save(update_fields=['status', 'started_at', 'heartbeat_at', 'attempts'])
+                return job
+        
+        notify_job(job, f'Report job {job.pk} failed')
+
+def renew_lease(job, stop):
+    """Renew a running job's heartbeat until stop is set; runs in its own thread."""
+    interval = settings.REPORT_JOB_LEASE_TIMEOUT / 3
+    try:
+        while not stop.wait(interval):
+            ReportJob.objects.filter(pk=job.pk, attempts=job.attempts).update(
+                heartbeat_at=timezone.now()
+            )
+    except Exception:
+        logger.exception(f"Could not renew the lease of report job {job.pk}")
+    finally:
+        connection.close()
+
+def set_progress(job, progress):
+    """Record and announce a job's progress percentage."""
+    job.progress = progress
+    ReportJob.objects.filter(pk=job.pk).update(progress=progress)
+    notify_job(job, f'Report job {job.pk} is {progress}% done')
+
+def run_date_range(job):
+    """Compute a date range report and keep it on the job row."""
+    data = ReportService.date_range(
+        date.fromisoformat(job.params['start_date']),
+        date.fromisoformat(job.params['end_date'])
+    )
+    job.result = DateRangeReportSerializer(data).data
+
+def run_export(job):
+    """Stream an export to a file under MEDIA_ROOT."""
+    params = job.params
+    columns, rows = export_source(
+        params['report_type'],
+        date.fromisoformat(params['start_date']),
+        date.fromisoformat(params['end_date'])
+    )
+    total = rows.count()
+    step = max(total // PROGRESS_STEPS, 1)
+    
+    name = (
+        f"report_jobs/{job.pk}_{params['report_type']}_"
+        f"{params['start_date']}_{params['end_date']}.{params['file_format']}"
+    )
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    
+    with open(path, 'w', newline='') as output:
+        lines = stream_rows(columns, rows, params['file_format'])
+        if params['file_format'] == 'csv':
+            output.write(next(lines))
+        for written, line in enumerate(lines, start=1):
+            output.write(line)
+            if written % step == 0 and written < total:
+                set_progress(job, written * 100 // total)
+    
+    job.result_file.name = name
+    job.result = {'rows': total}
+
+JOB_RUNNERS = {
+    ReportJob.JobType.DATE_RANGE: run_date_range,
+    ReportJob.JobType.EXPORT: run_export,
+}
+
+def run_job(job):
+    """Execute a claimed job and record its outcome; never raises."""
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=renew_lease, args=(job, stop), daemon=True)
+    heartbeat.start()
+    try:
+        JOB_RUNNERS[job.job_type](job)
+    except Exception as e:
+        logger.exception(f"Report job {job.pk} failed")
+        job.status = ReportJob.Status.FAILED
+        job.error = str(e)
+        message = f'Report job {job.pk} failed'
+    else:
+        job.status = ReportJob.Status.COMPLETED
+        job.progress = 100
+        message = f'Report job {job.pk} is ready'
+    finally:
+        stop.set()
+        heartbeat.join()
+    
+    job.finished_at = timezone.now()
+    # A worker that lost its lease (a long pause, say) must not overwrite the
+    # attempt that reclaimed the job
+    recorded = ReportJob.objects.filter(pk=job.pk, attempts=job.attempts).update(
+        status=job.status,
+        progress=job.progress,
+        result=job.result,
+        result_file=job.result_file.name,
+        error=job.error,
+        finished_at=job.finished_at
+    )
+    if recorded:
+        notify_job(job, message)
+    else:
+        logger.warning(f"Report job {job.pk} was claimed again; dropping the outcome of attempt {job.attempts}")
+    return job
@@ -0,0 +1,125 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from app.api.reports.models import DailyReport, ParkingLotReport, refresh_rollup_periods
+
+def _init_worker():
+    """Forked workers must open their own database connections."""
+    connections.close_all()
+
+def backfill_day(date_iso):
+    """Regenerate the daily report and every lot report of one date."""
+    date = datetime.strptime(date_iso, '%Y-%m-%d').date()
+    DailyReport.generate_report(date, rollup=False)
+    return date_iso, len(ParkingLotReport.generate_reports(date))
+
+class Command(BaseCommand):
+    help = 'Regenerates daily and parking lot reports for a date range in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', required=True, help='First date (YYYY-MM-DD)')
+        parser.add_argument('--end-date', required=True, help='Last date (YYYY-MM-DD)')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes; 1 runs in this process'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default='.backfill_reports.json',
+            help='File recording completed dates so an interrupted run of the same range can resume; '
+                 'removed once the run completes'
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Ignore and overwrite an existing checkpoint'
+        )
+
+    def load_checkpoint(self, path, reset, date_range):
+        if reset or not os.path.exists(path):
+            return set()
+        with open(path) as checkpoint:
+            state = json.load(checkpoint)
+        if state.get('range') != list(date_range):
+            self.stdout.write(f'Ignoring checkpoint {path} left by a backfill of another range')
+            return set()
+        return set(state.get('completed', []))
+
+    def save_checkpoint(self, path, date_range, completed):
+        # Write then rename so a crash never leaves a truncated checkpoint
+        with open(f'{path}.tmp', 'w') as checkpoint:
+            json.dump({'range': list(date_range), 'completed': sorted(completed)}, checkpoint)
+        os.replace(f'{path}.tmp', path)
+
+    def handle(self, *args, **options):
+        try:
+            start_date = datetime.strptime(options['start_date'], '%Y-%m-%d').date()
+            end_date = datetime.strptime(options['end_date'], '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError('Invalid date format. Use YYYY-MM-DD.')
+        if start_date > end_date:
+            raise CommandError('--start-date must not be after --end-date.')
+        
+        dates = [
+            (start_date + timedelta(days=offset)).isoformat()
+            for offset in range((end_date - start_date).days + 1)
+        ]
+        date_range = (dates[0], dates[-1])
+        completed = self.load_checkpoint(options['checkpoint'], options['reset'], date_range)
+        pending = [date for date in dates if date not in completed]
+        self.stdout.write(
+            f'Backfilling {len(pending)} of {len(dates)} days with {options["workers"]} workers...'
+        )
+        
+        started = time.perf_counter()
+        done = 0
+        lot_days = 0
+        
+        def record(date_iso, lots):
+            nonlocal done, lot_days
+            completed.add(date_iso)
+            done += 1
+            lot_days += lots
+            self.save_checkpoint(options['checkpoint'], date_range, completed)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{date_iso} done ({done}/{len(pending)}, '
+                f'{done / elapsed:.1f} days/s, {lot_days / elapsed:.1f} lot-days/s)'
+            )
+        
+        if options['workers'] <= 1:
+            for date_iso in pending:
+                record(*backfill_day(date_iso))
+        else:
+            # Never hand the parent's open connections to forked children
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=options['workers'],
+                mp_context=multiprocessing.get_context('fork'),
+                initializer=_init_worker
+            ) as pool:
+                futures = [pool.submit(backfill_day, date_iso) for date_iso in pending]
+                for future in as_completed(futures):
+                    record(*future.result())
+        
+        # Roll each week, month and year up once instead of once per day
+        periods = refresh_rollup_periods(
+            [datetime.strptime(date, '%Y-%m-%d').date() for date in dates]
+        )
+        # A finished run leaves nothing to resume, so a later backfill of the
+        # same range (say after a fix) regenerates every day again
+        if os.path.exists(options['checkpoint']):
+            os.remove(options['checkpoint'])
+        
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully backfilled {len(pending)} days and {periods} rollup periods '
+            f'in {elapsed:.1f} s ({lot_days / elapsed if elapsed else 0:.1f} lot-days/s)'
+        ))
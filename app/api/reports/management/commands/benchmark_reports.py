@@ -0,0 +1,81 @@
+import random
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from app.api.reports.models import DailyReport, MonthlyReport, ParkingLotReport
+from app.api.reports.services import ReportService
+from app.utils.seeding import DatasetGenerator
+
+class Command(BaseCommand):
+    help = 'Benchmarks report generation against a large synthetic reservation set'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reservations', type=int, default=1_000_000)
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--lots', type=int, default=10)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Commit the seeded data instead of rolling it back'
+        )
+
+    def measure(self, label, func):
+        """Run func once and print its wall time and query count."""
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(f'{label}: {elapsed * 1000:.1f} ms, {len(queries)} queries')
+
+    def seed(self, options):
+        """Bulk insert users, lots, spaces and reservations."""
+        tag = f'bench{random.Random(options["seed"]).randrange(10 ** 6)}.'
+        summary = DatasetGenerator(
+            users=options['users'],
+            lots=options['lots'],
+            days=options['days'],
+            reservations=options['reservations'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            prefix=tag,
+            log=self.stdout.write
+        ).generate()
+        return summary['lots'], summary['last_day']
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            started = time.perf_counter()
+            lots, today = self.seed(options)
+            self.stdout.write(self.style.SUCCESS(
+                f'Seeded {options["reservations"]} reservations in {time.perf_counter() - started:.1f} s'
+            ))
+            
+            per_day = options['reservations'] // options['days']
+            self.stdout.write(f'Benchmarking with ~{per_day} reservations per day')
+            self.measure('DailyReport.generate_report', lambda: DailyReport.generate_report(today))
+            self.measure(
+                'ParkingLotReport.generate_report',
+                lambda: ParkingLotReport.generate_report(lots[0], today)
+            )
+            self.measure(
+                f'ParkingLotReport.generate_reports ({len(lots)} lots)',
+                lambda: ParkingLotReport.generate_reports(today)
+            )
+            self.measure(
+                'MonthlyReport.generate_report',
+                lambda: MonthlyReport.generate_report(today.year, today.month)
+            )
+            for range_days in sorted({options['days'], 365}):
+                self.measure(
+                    f'ReportService.date_range ({range_days} days)',
+                    lambda: ReportService.date_range(today - timedelta(days=range_days - 1), today)
+                )
+            
+            if not options['keep']:
+                transaction.set_rollback(True)
+                self.stdout.write('Rolled back seeded data')
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from app.api.reports.models import DailyReport, ParkingLotReport
+
+class Command(BaseCommand):
+    help = 'Recomputes incrementally maintained reports from the reservation table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=2,
+            help='Number of days to reconcile, ending today'
+        )
+        parser.add_argument(
+            '--date',
+            help='Reconcile a single date (YYYY-MM-DD) instead of the last --days days'
+        )
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                dates = [datetime.strptime(options['date'], '%Y-%m-%d').date()]
+            except ValueError:
+                raise CommandError('Invalid date format. Use YYYY-MM-DD.')
+        else:
+            today = timezone.localdate()
+            dates = [today - timedelta(days=offset) for offset in range(options['days'])]
+        
+        for date in dates:
+            DailyReport.generate_report(date)
+            ParkingLotReport.generate_reports(date)
+            self.stdout.write(f'Reconciled {date}')
+        
+        self.stdout.write(self.style.SUCCESS('Successfully reconciled reports'))
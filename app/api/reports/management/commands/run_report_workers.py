@@ -0,0 +1,66 @@
+import threading
+from django.core.management.base import BaseCommand
+from django.db import connection
+from app.api.reports.jobs import claim_next_job, run_job
+
+class Command(BaseCommand):
+    help = 'Runs a pool of workers that execute queued report jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=2,
+            help='Number of jobs executed concurrently'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds an idle worker waits before checking the queue again'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of polling forever'
+        )
+
+    def work(self, stop, options):
+        """Claim and run jobs until stopped (or the queue drains with --once)."""
+        try:
+            while not stop.is_set():
+                job = claim_next_job()
+                if job is None:
+                    if options['once']:
+                        return
+                    stop.wait(options['poll_interval'])
+                    continue
+                
+                self.stdout.write(f'Running report job {job.pk} ({job.job_type})')
+                job = run_job(job)
+                self.stdout.write(f'Report job {job.pk} {job.status}')
+        finally:
+            connection.close()
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        workers = [
+            threading.Thread(target=self.work, args=(stop, options), daemon=True)
+            for _ in range(max(options['workers'], 1))
+        ]
+        for worker in workers:
+            worker.start()
+        
+        self.stdout.write(f'Started {len(workers)} report workers')
+        try:
+            # Joining with a timeout keeps the main thread responsive to Ctrl+C
+            while any(worker.is_alive() for worker in workers):
+                for worker in workers:
+                    worker.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping report workers after their current job...')
+            stop.set()
+            for worker in workers:
+                worker.join()
+        
+        self.stdout.write(self.style.SUCCESS('Report workers stopped'))
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reports", "0002_dailyreport_occupancy_rate_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dailyreport",
+            name="hourly_counts",
+            field=models.JSONField(
+                blank=True, default=list, verbose_name="hourly counts"
+            ),
+        ),
+        migrations.AddField(
+            model_name="dailyreport",
+            name="total_duration",
+            field=models.FloatField(default=0, verbose_name="total duration"),
+        ),
+        migrations.AddField(
+            model_name="monthlyreport",
+            name="total_duration",
+            field=models.FloatField(default=0, verbose_name="total duration"),
+        ),
+        migrations.AddField(
+            model_name="parkinglotreport",
+            name="hourly_counts",
+            field=models.JSONField(
+                blank=True, default=list, verbose_name="hourly counts"
+            ),
+        ),
+        migrations.AddField(
+            model_name="parkinglotreport",
+            name="total_duration",
+            field=models.FloatField(default=0, verbose_name="total duration"),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0003_report_running_totals"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dailyreport",
+            name="hourly_occupancy",
+            field=models.JSONField(
+                blank=True, default=list, verbose_name="hourly occupancy"
+            ),
+        ),
+        migrations.AddField(
+            model_name="parkinglotreport",
+            name="hourly_occupancy",
+            field=models.JSONField(
+                blank=True, default=list, verbose_name="hourly occupancy"
+            ),
+        ),
+    ]
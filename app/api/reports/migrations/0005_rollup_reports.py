@@ -0,0 +1,116 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0004_report_hourly_occupancy"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WeeklyReport",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "total_revenue",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=12,
+                        verbose_name="total revenue",
+                    ),
+                ),
+                (
+                    "total_reservations",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="total reservations"
+                    ),
+                ),
+                (
+                    "average_duration",
+                    models.FloatField(default=0, verbose_name="average duration"),
+                ),
+                (
+                    "average_occupancy_rate",
+                    models.FloatField(default=0, verbose_name="average occupancy rate"),
+                ),
+                ("peak_day", models.DateField(null=True, verbose_name="peak day")),
+                (
+                    "total_duration",
+                    models.FloatField(default=0, verbose_name="total duration"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "week_start",
+                    models.DateField(unique=True, verbose_name="week start"),
+                ),
+            ],
+            options={
+                "verbose_name": "weekly report",
+                "verbose_name_plural": "weekly reports",
+                "ordering": ["-week_start"],
+            },
+        ),
+        migrations.CreateModel(
+            name="YearlyReport",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "total_revenue",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=12,
+                        verbose_name="total revenue",
+                    ),
+                ),
+                (
+                    "total_reservations",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="total reservations"
+                    ),
+                ),
+                (
+                    "average_duration",
+                    models.FloatField(default=0, verbose_name="average duration"),
+                ),
+                (
+                    "average_occupancy_rate",
+                    models.FloatField(default=0, verbose_name="average occupancy rate"),
+                ),
+                ("peak_day", models.DateField(null=True, verbose_name="peak day")),
+                (
+                    "total_duration",
+                    models.FloatField(default=0, verbose_name="total duration"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("year", models.PositiveIntegerField(unique=True, verbose_name="year")),
+            ],
+            options={
+                "verbose_name": "yearly report",
+                "verbose_name_plural": "yearly reports",
+                "ordering": ["-year"],
+            },
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0006_report_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dailyreport",
+            name="computed_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="computed at"
+            ),
+        ),
+        migrations.AddField(
+            model_name="dailyreport",
+            name="source_watermark",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="source watermark"
+            ),
+        ),
+        migrations.AddField(
+            model_name="monthlyreport",
+            name="computed_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="computed at"
+            ),
+        ),
+        migrations.AddField(
+            model_name="monthlyreport",
+            name="source_watermark",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="source watermark"
+            ),
+        ),
+        migrations.AddField(
+            model_name="parkinglotreport",
+            name="computed_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="computed at"
+            ),
+        ),
+        migrations.AddField(
+            model_name="parkinglotreport",
+            name="source_watermark",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="source watermark"
+            ),
+        ),
+        migrations.AddField(
+            model_name="weeklyreport",
+            name="computed_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="computed at"
+            ),
+        ),
+        migrations.AddField(
+            model_name="weeklyreport",
+            name="source_watermark",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="source watermark"
+            ),
+        ),
+        migrations.AddField(
+            model_name="yearlyreport",
+            name="computed_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="computed at"
+            ),
+        ),
+        migrations.AddField(
+            model_name="yearlyreport",
+            name="source_watermark",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="source watermark"
+            ),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0007_report_freshness"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dailyreport",
+            name="duration_sketch",
+            field=models.JSONField(
+                blank=True, default=dict, verbose_name="duration sketch"
+            ),
+        ),
+        migrations.AddField(
+            model_name="dailyreport",
+            name="revenue_sketch",
+            field=models.JSONField(
+                blank=True, default=dict, verbose_name="revenue sketch"
+            ),
+        ),
+        migrations.AddField(
+            model_name="monthlyreport",
+            name="duration_sketch",
+            field=models.JSONField(
+                blank=True, default=dict, verbose_name="duration sketch"
+            ),
+        ),
+        migrations.AddField(
+            model_name="monthlyreport",
+            name="revenue_sketch",
+            field=models.JSONField(
+                blank=True, default=dict, verbose_name="revenue sketch"
+            ),
+        ),
+        migrations.AddField(
+            model_name="parkinglotreport",
+            name="duration_sketch",
+            field=models.JSONField(
+                blank=True, default=dict, verbose_name="duration sketch"
+            ),
+        ),
+        migrations.AddField(
+            model_name="parkinglotreport",
+            name="revenue_sketch",
+            field=models.JSONField(
+                blank=True, default=dict, verbose_name="revenue sketch"
+            ),
+        ),
+        migrations.AddField(
+            model_name="weeklyreport",
+            name="duration_sketch",
+            field=models.JSONField(
+                blank=True, default=dict, verbose_name="duration sketch"
+            ),
+        ),
+        migrations.AddField(
+            model_name="weeklyreport",
+            name="revenue_sketch",
+            field=models.JSONField(
+                blank=True, default=dict, verbose_name="revenue sketch"
+            ),
+        ),
+        migrations.AddField(
+            model_name="yearlyreport",
+            name="duration_sketch",
+            field=models.JSONField(
+                blank=True, default=dict, verbose_name="duration sketch"
+            ),
+        ),
+        migrations.AddField(
+            model_name="yearlyreport",
+            name="revenue_sketch",
+            field=models.JSONField(
+                blank=True, default=dict, verbose_name="revenue sketch"
+            ),
+        ),
+    ]
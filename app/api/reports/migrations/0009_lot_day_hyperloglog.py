@@ -0,0 +1,27 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0008_report_quantile_sketches"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="parkinglotreport",
+            name="plate_sketch",
+            field=models.BinaryField(
+                blank=True, null=True, verbose_name="plate sketch"
+            ),
+        ),
+        migrations.AddField(
+            model_name="parkinglotreport",
+            name="visitor_sketch",
+            field=models.BinaryField(
+                blank=True, null=True, verbose_name="visitor sketch"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-19 01:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0009_lot_day_hyperloglog"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dailyreport",
+            name="rollups_stale",
+            field=models.BooleanField(default=False, verbose_name="rollups stale"),
+        ),
+    ]
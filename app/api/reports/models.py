@@ -1,12 +1,144 @@
-from django.db import models
+import math
+from django.db import models, transaction
+from django.db.models import Sum, Count, Avg, Max, Case, When, Value, Q
+from django.db.models.functions import Cast, ExtractHour, Floor, Least, Ln
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
 from app.api.parking_lots.models import ParkingLot
 from app.api.reservations.models import Reservation
-from datetime import datetime
+from .occupancy import lot_occupancy
+from .sketches import SKETCH_BUCKETS, SKETCH_GAMMA, SKETCH_MIN_VALUE, merge_sketches
+from . import hyperloglog
+from .hyperloglog import normalize_plate
+from datetime import date as date_cls, datetime, time, timedelta
+from decimal import Decimal
 
 User = get_user_model()
 
+# Expired reservations ran to their end time and were paid for
+REPORTABLE_STATUSES = ['active', 'completed', 'expired']
+
+def day_bounds(date):
+    """Return the aware [start, end) datetimes of a local calendar day."""
+    start = timezone.make_aware(datetime.combine(date, time.min))
+    end = timezone.make_aware(datetime.combine(date + timedelta(days=1), time.min))
+    return start, end
+
+def reportable_reservations(start, end, **filters):
+    """Reservations counted in reports that start within [start, end)."""
+    return Reservation.objects.filter(
+        start_time__gte=start,
+        start_time__lt=end,
+        status__in=REPORTABLE_STATUSES,
+        **filters
+    )
+
+def reservation_totals(reservations):
+    """Revenue, count and duration of a queryset in one aggregate query."""
+    totals = reservations.aggregate(
+        total_revenue=Sum('total_cost', default=0),
+        total_reservations=Count('id'),
+        total_duration=Sum('duration', default=0)
+    )
+    totals['total_duration'] = float(totals['total_duration'])
+    totals['average_duration'] = (
+        totals['total_duration'] / totals['total_reservations']
+        if totals['total_reservations'] else 0
+    )
+    return totals
+
+def latest_change(start, end, **filters):
+    """When the reservations starting in [start, end) last changed, whatever their status."""
+    return Reservation.objects.filter(
+        start_time__gte=start,
+        start_time__lt=end,
+        **filters
+    ).aggregate(latest=Max('updated_at'))['latest']
+
+def sketch_bucket(field):
+    """The sketch bucket of a numeric column computed in SQL, as sketches.bucket_of does."""
+    value = Cast(field, models.FloatField())
+    return Case(
+        When(**{f'{field}__lt': SKETCH_MIN_VALUE}, then=Value(0)),
+        default=Least(
+            Cast(
+                Floor(Ln(value / Value(SKETCH_MIN_VALUE)) / Value(math.log(SKETCH_GAMMA))),
+                models.IntegerField()
+            ) + Value(1),
+            Value(SKETCH_BUCKETS - 1)
+        ),
+        output_field=models.IntegerField()
+    )
+
+def bucketed_sketches(reservations, field, group=None):
+    """
+    Sketches of a column by the value of group (or under None), counted with
+    one query grouped by bucket, so at most SKETCH_BUCKETS rows per group
+    come back however many reservations there are.
+    """
+    fields = ['bucket'] if group is None else [group, 'bucket']
+    sketches = {}
+    for row in reservations.annotate(
+        bucket=sketch_bucket(field)
+    ).values(*fields).annotate(count=Count('id')).order_by():
+        sketches.setdefault(row.get(group), {})[str(row['bucket'])] = row['count']
+    return sketches
+
+def reservation_sketches(reservations):
+    """Duration and revenue quantile sketches of a queryset."""
+    return {
+        'duration_sketch': bucketed_sketches(reservations, 'duration').get(None, {}),
+        'revenue_sketch': bucketed_sketches(reservations, 'total_cost').get(None, {})
+    }
+
+def distinct_values(reservations, *fields):
+    """Stream the distinct values of fields, deduplicated by the database."""
+    return reservations.values_list(*fields).distinct().order_by().iterator(
+        chunk_size=hyperloglog.HLL_CHUNK_SIZE
+    )
+
+def distinct_sketches(reservations):
+    """HyperLogLog sketches of the distinct users and normalized plates of a queryset."""
+    visitors = hyperloglog.add(
+        hyperloglog.empty(),
+        (user_id for user_id, in distinct_values(reservations, 'user_id'))
+    )
+    plates = hyperloglog.add(
+        hyperloglog.empty(),
+        (normalize_plate(plate) for plate, in distinct_values(reservations, 'vehicle_plate'))
+    )
+    return {
+        'visitor_sketch': hyperloglog.dump(visitors),
+        'plate_sketch': hyperloglog.dump(plates)
+    }
+
+def hourly_histogram(reservations):
+    """Reservation starts per local hour (24 buckets), using one grouped query."""
+    counts = [0] * 24
+    for row in reservations.annotate(
+        hour=ExtractHour('start_time')
+    ).values('hour').annotate(count=Count('id')).order_by():
+        counts[row['hour']] = row['count']
+    return counts
+
+def busiest_hour(hourly_counts):
+    """Busiest hour of a histogram, earliest hour on ties."""
+    if not any(hourly_counts):
+        return None
+    return time(max(range(24), key=lambda hour: (hourly_counts[hour], -hour)))
+
+def overall_occupancy_rate():
+    """Current occupancy across every lot, computed in the database."""
+    spaces = ParkingLot.objects.aggregate(
+        total=Sum('total_spaces', default=0),
+        available=Sum('available_spaces', default=0)
+    )
+    if not spaces['total']:
+        return 0
+    return (spaces['total'] - spaces['available']) / spaces['total'] * 100
+
 class DailyReport(models.Model):
     """Model for daily parking reports."""
     
@@ -30,6 +162,27 @@ class DailyReport(models.Model):
         _('occupancy rate'),
         default=0
     )
+    total_duration = models.FloatField(
+        _('total duration'),
+        default=0
+    )
+    hourly_counts = models.JSONField(
+        _('hourly counts'),
+        default=list,
+        blank=True
+    )
+    hourly_occupancy = models.JSONField(
+        _('hourly occupancy'),
+        default=list,
+        blank=True
+    )
+    duration_sketch = models.JSONField(_('duration sketch'), default=dict, blank=True)
+    revenue_sketch = models.JSONField(_('revenue sketch'), default=dict, blank=True)
+    computed_at = models.DateTimeField(_('computed at'), null=True, blank=True)
+    source_watermark = models.DateTimeField(_('source watermark'), null=True, blank=True)
+    # Set when a reservation change updates the day; the weekly, monthly and
+    # yearly reports containing it are rolled up again by the periodic job
+    rollups_stale = models.BooleanField(_('rollups stale'), default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -42,58 +195,64 @@ class DailyReport(models.Model):
         return f"Daily Report - {self.date}"
     
     @classmethod
-    def generate_report(cls, date):
-        """Generate a daily report for the specified date."""
-        # Get all reservations for the date
-        reservations = Reservation.objects.filter(
-            start_time__date=date,
-            status__in=['active', 'completed']
-        )
-        
-        # Calculate total revenue
-        total_revenue = sum(reservation.total_cost for reservation in reservations)
-        
-        # Calculate total reservations
-        total_reservations = reservations.count()
-        
-        # Calculate average duration
-        durations = [reservation.duration for reservation in reservations]
-        average_duration = sum(durations) / len(durations) if durations else 0
-        
-        # Find peak hour
-        hourly_counts = {}
-        for reservation in reservations:
-            hour = reservation.start_time.hour
-            hourly_counts[hour] = hourly_counts.get(hour, 0) + 1
-        
-        peak_hour = max(hourly_counts.items(), key=lambda x: x[1])[0] if hourly_counts else None
-        if peak_hour is not None:
-            peak_hour = datetime.strptime(f"{peak_hour:02d}:00", "%H:%M").time()
-        
-        # Calculate overall occupancy rate
-        total_spaces = sum(lot.total_spaces for lot in ParkingLot.objects.all())
-        occupied_spaces = sum(lot.total_spaces - lot.available_spaces for lot in ParkingLot.objects.all())
-        occupancy_rate = (occupied_spaces / total_spaces * 100) if total_spaces > 0 else 0
+    def generate_report(cls, date, rollup=True):
+        """Generate a daily report for the specified date, refreshing its rollups unless rollup is False."""
+        start, end = day_bounds(date)
+        reservations = reportable_reservations(start, end)
+        totals = reservation_totals(reservations)
+        hourly_counts = hourly_histogram(reservations)
+        occupancy = lot_occupancy(date, REPORTABLE_STATUSES)[None]
         
         # Create or update report
         report, created = cls.objects.update_or_create(
             date=date,
             defaults={
-                'total_revenue': total_revenue,
-                'total_reservations': total_reservations,
-                'average_duration': average_duration,
-                'peak_hour': peak_hour,
-                'occupancy_rate': occupancy_rate
+                **totals,
+                **occupancy,
+                **reservation_sketches(reservations),
+                'hourly_counts': hourly_counts,
+                'peak_hour': busiest_hour(hourly_counts),
+                'computed_at': timezone.now(),
+                'source_watermark': latest_change(start, end)
             }
         )
+        if rollup:
+            refresh_rollups(date)
         
         return report
 
-class MonthlyReport(models.Model):
-    """Model for monthly parking reports."""
+def daily_rollup(start_date, end_date):
+    """Totals of the DailyReport rows in [start_date, end_date), without reading reservations."""
+    days = DailyReport.objects.filter(date__gte=start_date, date__lt=end_date)
+    totals = days.aggregate(
+        total_revenue=Sum('total_revenue', default=0),
+        total_reservations=Sum('total_reservations', default=0),
+        total_duration=Sum('total_duration', default=0),
+        average_occupancy_rate=Avg('occupancy_rate', default=0),
+        source_watermark=Max('source_watermark')
+    )
+    totals['average_duration'] = (
+        totals['total_duration'] / totals['total_reservations']
+        if totals['total_reservations'] else 0
+    )
+    sketches = list(days.values_list('duration_sketch', 'revenue_sketch'))
+    totals['duration_sketch'] = merge_sketches(duration for duration, _ in sketches)
+    totals['revenue_sketch'] = merge_sketches(revenue for _, revenue in sketches)
+    totals['peak_day'] = days.filter(
+        total_reservations__gt=0
+    ).order_by('-total_reservations', 'date').values_list('date', flat=True).first()
+    return totals
+
+class RollupReport(models.Model):
+    """
+    Period report rolled up from the DailyReport rows it spans.
+    
+    Subclasses describe their period with three functions: period_start(date)
+    gives the first day of the period holding a date, next_period(first) the
+    first day of the period after it, and period_key(first) the lookup of its
+    row.
+    """
     
-    year = models.PositiveIntegerField(_('year'))
-    month = models.PositiveIntegerField(_('month'))
     total_revenue = models.DecimalField(
         _('total revenue'),
         max_digits=12,
@@ -113,9 +272,73 @@ class MonthlyReport(models.Model):
         default=0
     )
     peak_day = models.DateField(_('peak day'), null=True)
+    total_duration = models.FloatField(
+        _('total duration'),
+        default=0
+    )
+    duration_sketch = models.JSONField(_('duration sketch'), default=dict, blank=True)
+    revenue_sketch = models.JSONField(_('revenue sketch'), default=dict, blank=True)
+    computed_at = models.DateTimeField(_('computed at'), null=True, blank=True)
+    source_watermark = models.DateTimeField(_('source watermark'), null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        abstract = True
+    
+    @classmethod
+    def period_lookup(cls, date):
+        """Lookup identifying the period that contains a date."""
+        return cls.period_key(cls.period_start(date))
+    
+    @classmethod
+    def period_bounds(cls, date):
+        """The [start, end) dates of the period that contains a date."""
+        first = cls.period_start(date)
+        return first, cls.next_period(first)
+    
+    @classmethod
+    def refresh(cls, date):
+        """Recompute the report of the period containing a date from its daily rows."""
+        lookup = cls.period_lookup(date)
+        with transaction.atomic():
+            # Lock the period row first so concurrent day updates roll up in turn
+            report = cls.objects.select_for_update().get_or_create(**lookup)[0]
+            for field, value in daily_rollup(*cls.period_bounds(date)).items():
+                setattr(report, field, value)
+            report.computed_at = timezone.now()
+            report.save()
+        
+        return report
+
+class WeeklyReport(RollupReport):
+    """Model for weekly parking reports, weeks starting on Monday."""
+    
+    week_start = models.DateField(_('week start'), unique=True)
+    
+    class Meta:
+        verbose_name = _('weekly report')
+        verbose_name_plural = _('weekly reports')
+        ordering = ['-week_start']
+    
+    def __str__(self):
+        return f"Weekly Report - {self.week_start}"
+    
+    period_start = staticmethod(lambda date: date - timedelta(days=date.weekday()))
+    next_period = staticmethod(lambda first: first + timedelta(days=7))
+    period_key = staticmethod(lambda first: {'week_start': first})
+    
+    @classmethod
+    def generate_report(cls, week_start):
+        """Generate a weekly report for the week starting on the specified date."""
+        return cls.refresh(week_start)
+
+class MonthlyReport(RollupReport):
+    """Model for monthly parking reports."""
+    
+    year = models.PositiveIntegerField(_('year'))
+    month = models.PositiveIntegerField(_('month'))
+    
     class Meta:
         verbose_name = _('monthly report')
         verbose_name_plural = _('monthly reports')
@@ -125,58 +348,151 @@ class MonthlyReport(models.Model):
     def __str__(self):
         return f"Monthly Report - {self.year}/{self.month}"
     
+    period_start = staticmethod(lambda date: date.replace(day=1))
+    next_period = staticmethod(lambda first: date_cls(first.year + first.month // 12, first.month % 12 + 1, 1))
+    period_key = staticmethod(lambda first: {'year': first.year, 'month': first.month})
+    
     @classmethod
     def generate_report(cls, year, month):
         """Generate a monthly report for the specified year and month."""
-        from calendar import monthrange
-        _, last_day = monthrange(year, month)
-        
-        # Get all reservations for the month
-        reservations = Reservation.objects.filter(
-            start_time__year=year,
-            start_time__month=month,
-            status__in=['active', 'completed']
-        )
-        
-        # Calculate total revenue
-        total_revenue = sum(reservation.total_cost for reservation in reservations)
-        
-        # Calculate total reservations
-        total_reservations = reservations.count()
-        
-        # Calculate average duration
-        durations = [reservation.duration for reservation in reservations]
-        average_duration = sum(durations) / len(durations) if durations else 0
-        
-        # Calculate average occupancy rate
-        daily_reports = DailyReport.objects.filter(
-            date__year=year,
-            date__month=month
-        )
-        average_occupancy_rate = sum(report.occupancy_rate for report in daily_reports) / len(daily_reports) if daily_reports else 0
-        
-        # Find peak day
-        daily_counts = {}
-        for reservation in reservations:
-            day = reservation.start_time.date()
-            daily_counts[day] = daily_counts.get(day, 0) + 1
-        
-        peak_day = max(daily_counts.items(), key=lambda x: x[1])[0] if daily_counts else None
-        
-        # Create or update report
-        report, created = cls.objects.update_or_create(
-            year=year,
-            month=month,
-            defaults={
-                'total_revenue': total_revenue,
-                'total_reservations': total_reservations,
-                'average_duration': average_duration,
-                'average_occupancy_rate': average_occupancy_rate,
-                'peak_day': peak_day
-            }
-        )
-        
-        return report
+        return cls.refresh(date_cls(year, month, 1))
+
+class YearlyReport(RollupReport):
+    """Model for yearly parking reports."""
+    
+    year = models.PositiveIntegerField(_('year'), unique=True)
+    
+    class Meta:
+        verbose_name = _('yearly report')
+        verbose_name_plural = _('yearly reports')
+        ordering = ['-year']
+    
+    def __str__(self):
+        return f"Yearly Report - {self.year}"
+    
+    period_start = staticmethod(lambda date: date.replace(month=1, day=1))
+    next_period = staticmethod(lambda first: first.replace(year=first.year + 1))
+    period_key = staticmethod(lambda first: {'year': first.year})
+    
+    @classmethod
+    def generate_report(cls, year):
+        """Generate a yearly report for the specified year."""
+        return cls.refresh(date_cls(year, 1, 1))
+
+ROLLUP_MODELS = (WeeklyReport, MonthlyReport, YearlyReport)
+
+def refresh_rollups(date):
+    """Refresh the weekly, monthly and yearly reports containing a day."""
+    for model in ROLLUP_MODELS:
+        model.refresh(date)
+
+def refresh_rollup_periods(dates):
+    """Refresh each week, month and year touched by dates once; returns the period count."""
+    periods = 0
+    for model in ROLLUP_MODELS:
+        lookups = {tuple(model.period_lookup(day).items()): day for day in dates}
+        for day in lookups.values():
+            model.refresh(day)
+        periods += len(lookups)
+    return periods
+
+def _runs_into_whole_month(first, after, end_date):
+    """Whether the week [first, after) ends in a later month that [..., end_date] holds whole."""
+    last = after - timedelta(days=1)
+    if last.month == first.month:
+        return False
+    return MonthlyReport.period_bounds(last)[1] <= end_date + timedelta(days=1)
+
+def covering_periods(start_date, end_date):
+    """
+    Split the days of [start_date, end_date] into whole years, months and
+    weeks, largest first, and the days left over at the edges. A week running
+    into a month the range holds whole is left as days so the month is used.
+    Returns ([(model, first day), ...], [day, ...]).
+    """
+    periods, days = [], []
+    day = start_date
+    while day <= end_date:
+        for model in reversed(ROLLUP_MODELS):
+            first, after = model.period_bounds(day)
+            if first != day or after > end_date + timedelta(days=1):
+                continue
+            if model is WeeklyReport and _runs_into_whole_month(first, after, end_date):
+                continue
+            periods.append((model, first))
+            day = after
+            break
+        else:
+            days.append(day)
+            day += timedelta(days=1)
+    return periods, days
+
+def range_sketches(start_date, end_date, using=None):
+    """
+    (duration_sketch, revenue_sketch) pairs covering the days in
+    [start_date, end_date]. Whole weeks, months and years are read from their
+    rollups; the edges, and periods whose rollup is missing or has days still
+    waiting to be rolled up, are read from the daily rows.
+    """
+    periods, days = covering_periods(start_date, end_date)
+    daily = DailyReport.objects.using(using)
+    stale = list(daily.filter(
+        date__range=[start_date, end_date],
+        rollups_stale=True
+    ).values_list('date', flat=True))
+    
+    sketches = []
+    for model in ROLLUP_MODELS:
+        firsts = [first for period_model, first in periods if period_model is model]
+        if not firsts:
+            continue
+        condition = Q()
+        for first in firsts:
+            condition |= Q(**model.period_key(first))
+        stored = {
+            tuple(row[:-2]): row[-2:]
+            for row in model.objects.using(using).filter(condition).values_list(
+                *model.period_key(firsts[0]), 'duration_sketch', 'revenue_sketch'
+            )
+        }
+        for first in firsts:
+            after = model.next_period(first)
+            row = stored.get(tuple(model.period_key(first).values()))
+            if row is None or any(first <= day < after for day in stale):
+                days.extend(first + timedelta(days=offset) for offset in range((after - first).days))
+            else:
+                sketches.append(row)
+    
+    # The days left form a few runs, each read with one range condition
+    condition = Q()
+    for first, last in _day_runs(sorted(days)):
+        condition |= Q(date__range=[first, last])
+    if days:
+        sketches += list(daily.filter(condition).values_list('duration_sketch', 'revenue_sketch'))
+    return sketches
+
+def _day_runs(days):
+    """(first, last) of each run of consecutive days in a sorted list."""
+    runs = []
+    for day in days:
+        if runs and runs[-1][1] == day - timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return runs
+
+def refresh_stale_rollups():
+    """Roll up the periods of the days changed since the last call; returns the period count."""
+    dates = list(DailyReport.objects.filter(rollups_stale=True).values_list('date', flat=True))
+    if not dates:
+        return 0
+    # Clearing first means a day that changes during the refresh is marked again
+    DailyReport.objects.filter(date__in=dates).update(rollups_stale=False)
+    try:
+        return refresh_rollup_periods(dates)
+    except Exception:
+        DailyReport.objects.filter(date__in=dates).update(rollups_stale=True)
+        raise
 
 class ParkingLotReport(models.Model):
     """Model for parking lot specific reports."""
@@ -206,6 +522,26 @@ class ParkingLotReport(models.Model):
         default=0
     )
     peak_hour = models.TimeField(_('peak hour'), null=True)
+    total_duration = models.FloatField(
+        _('total duration'),
+        default=0
+    )
+    hourly_counts = models.JSONField(
+        _('hourly counts'),
+        default=list,
+        blank=True
+    )
+    hourly_occupancy = models.JSONField(
+        _('hourly occupancy'),
+        default=list,
+        blank=True
+    )
+    duration_sketch = models.JSONField(_('duration sketch'), default=dict, blank=True)
+    revenue_sketch = models.JSONField(_('revenue sketch'), default=dict, blank=True)
+    visitor_sketch = models.BinaryField(_('visitor sketch'), null=True, blank=True)
+    plate_sketch = models.BinaryField(_('plate sketch'), null=True, blank=True)
+    computed_at = models.DateTimeField(_('computed at'), null=True, blank=True)
+    source_watermark = models.DateTimeField(_('source watermark'), null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -221,47 +557,178 @@ class ParkingLotReport(models.Model):
     @classmethod
     def generate_report(cls, parking_lot, date):
         """Generate a report for a specific parking lot and date."""
-        # Get all reservations for the parking lot and date
-        reservations = Reservation.objects.filter(
+        start, end = day_bounds(date)
+        reservations = reportable_reservations(start, end, parking_lot=parking_lot)
+        totals = reservation_totals(reservations)
+        hourly_counts = hourly_histogram(reservations)
+        occupancy = lot_occupancy(date, REPORTABLE_STATUSES, [parking_lot])[parking_lot.pk]
+        
+        # Create or update report
+        report, created = cls.objects.update_or_create(
             parking_lot=parking_lot,
-            start_time__date=date,
-            status__in=['active', 'completed']
+            date=date,
+            defaults={
+                **totals,
+                **occupancy,
+                **reservation_sketches(reservations),
+                **distinct_sketches(reservations),
+                'hourly_counts': hourly_counts,
+                'peak_hour': busiest_hour(hourly_counts),
+                'computed_at': timezone.now(),
+                'source_watermark': latest_change(start, end, parking_lot=parking_lot)
+            }
         )
         
-        # Calculate total revenue
-        total_revenue = sum(reservation.total_cost for reservation in reservations)
+        return report
+    
+    @classmethod
+    def generate_reports(cls, date):
+        """
+        Generate the reports of every parking lot for a date.
         
-        # Calculate total reservations
-        total_reservations = reservations.count()
+        Totals and hourly counts come from one query grouped by lot and hour,
+        occupancy from one sweep over all lots, and the rows are written with
+        one bulk upsert, so the number of queries does not grow with the lots.
+        """
+        start, end = day_bounds(date)
+        occupancy = lot_occupancy(date, REPORTABLE_STATUSES)
+        occupancy.pop(None)
         
-        # Calculate occupancy rate
-        occupancy_rate = parking_lot.occupancy_rate
+        figures = {
+            lot_id: {
+                'total_revenue': Decimal('0'),
+                'total_reservations': 0,
+                'total_duration': 0.0,
+                'hourly_counts': [0] * 24
+            }
+            for lot_id in occupancy
+        }
+        for row in reportable_reservations(start, end).annotate(
+            hour=ExtractHour('start_time')
+        ).values('parking_lot_id', 'hour').annotate(
+            count=Count('id'),
+            revenue=Sum('total_cost', default=0),
+            duration=Sum('duration', default=0)
+        ).order_by():
+            lot = figures.get(row['parking_lot_id'])
+            if lot is None:
+                continue
+            lot['total_revenue'] += row['revenue']
+            lot['total_reservations'] += row['count']
+            lot['total_duration'] += float(row['duration'])
+            lot['hourly_counts'][row['hour']] = row['count']
         
-        # Calculate average duration
-        durations = [reservation.duration for reservation in reservations]
-        average_duration = sum(durations) / len(durations) if durations else 0
+        lot_ids = list(figures)
+        index_of = {lot_id: index for index, lot_id in enumerate(lot_ids)}
+        reservations = reportable_reservations(start, end)
+        durations = bucketed_sketches(reservations, 'duration', 'parking_lot_id')
+        revenues = bucketed_sketches(reservations, 'total_cost', 'parking_lot_id')
+        for lot_id, visitors, plates in zip(
+            lot_ids,
+            hyperloglog.build_grouped((
+                (index_of[lot], user_id)
+                for lot, user_id in distinct_values(reservations, 'parking_lot_id', 'user_id')
+                if lot in index_of
+            ), len(lot_ids)),
+            hyperloglog.build_grouped((
+                (index_of[lot], normalize_plate(plate))
+                for lot, plate in distinct_values(reservations, 'parking_lot_id', 'vehicle_plate')
+                if lot in index_of
+            ), len(lot_ids))
+        ):
+            figures[lot_id]['duration_sketch'] = durations.get(lot_id, {})
+            figures[lot_id]['revenue_sketch'] = revenues.get(lot_id, {})
+            figures[lot_id]['visitor_sketch'] = hyperloglog.dump(visitors)
+            figures[lot_id]['plate_sketch'] = hyperloglog.dump(plates)
         
-        # Find peak hour
-        hourly_counts = {}
-        for reservation in reservations:
-            hour = reservation.start_time.hour
-            hourly_counts[hour] = hourly_counts.get(hour, 0) + 1
+        watermarks = dict(Reservation.objects.filter(
+            start_time__gte=start,
+            start_time__lt=end
+        ).values('parking_lot_id').annotate(
+            latest=Max('updated_at')
+        ).order_by().values_list('parking_lot_id', 'latest'))
         
-        peak_hour = max(hourly_counts.items(), key=lambda x: x[1])[0] if hourly_counts else None
-        if peak_hour is not None:
-            peak_hour = datetime.strptime(f"{peak_hour:02d}:00", "%H:%M").time()
+        computed_at = timezone.now()
+        reports = [
+            cls(
+                parking_lot_id=lot_id,
+                date=date,
+                **lot,
+                **occupancy[lot_id],
+                average_duration=(
+                    lot['total_duration'] / lot['total_reservations']
+                    if lot['total_reservations'] else 0
+                ),
+                peak_hour=busiest_hour(lot['hourly_counts']),
+                computed_at=computed_at,
+                source_watermark=watermarks.get(lot_id)
+            )
+            for lot_id, lot in figures.items()
+        ]
         
-        # Create or update report
-        report, created = cls.objects.update_or_create(
-            parking_lot=parking_lot,
-            date=date,
-            defaults={
-                'total_revenue': total_revenue,
-                'total_reservations': total_reservations,
-                'occupancy_rate': occupancy_rate,
-                'average_duration': average_duration,
-                'peak_hour': peak_hour
-            }
+        # Upsert every lot's row in one statement
+        return cls.objects.bulk_create(
+            reports,
+            update_conflicts=True,
+            unique_fields=['parking_lot', 'date'],
+            update_fields=[
+                'total_revenue', 'total_reservations', 'total_duration',
+                'average_duration', 'hourly_counts', 'peak_hour',
+                'occupancy_rate', 'hourly_occupancy', 'duration_sketch',
+                'revenue_sketch', 'visitor_sketch', 'plate_sketch', 'computed_at',
+                'source_watermark', 'updated_at'
+            ]
         )
-        
-        return report 
\ No newline at end of file
+
+class ReportJob(models.Model):
+    """Long-running report computed by the background worker pool."""
+    
+    class JobType(models.TextChoices):
+        DATE_RANGE = 'date_range', _('Date Range Report')
+        EXPORT = 'export', _('Export')
+    
+    class Status(models.TextChoices):
+        PENDING = 'pending', _('Pending')
+        RUNNING = 'running', _('Running')
+        COMPLETED = 'completed', _('Completed')
+        FAILED = 'failed', _('Failed')
+    
+    requested_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='report_jobs'
+    )
+    job_type = models.CharField(
+        _('job type'),
+        max_length=20,
+        choices=JobType.choices
+    )
+    params = models.JSONField(_('parameters'), default=dict, blank=True)
+    status = models.CharField(
+        _('status'),
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    progress = models.PositiveSmallIntegerField(_('progress'), default=0)
+    result = models.JSONField(_('result'), null=True, blank=True, encoder=DjangoJSONEncoder)
+    result_file = models.FileField(_('result file'), upload_to='report_jobs/', blank=True)
+    error = models.TextField(_('error'), blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Renewed by the worker while the job runs; a stale heartbeat means the
+    # worker was lost and the job may be claimed again
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(_('attempts'), default=0)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = _('report job')
+        verbose_name_plural = _('report jobs')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Report Job {self.pk} - {self.job_type} ({self.status})"
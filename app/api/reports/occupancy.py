@@ -0,0 +1,133 @@
+"""Time-weighted occupancy computed from reservation intervals."""
+from datetime import datetime, time, timedelta
+import numpy as np
+from django.utils import timezone
+from app.api.parking_lots.models import ParkingLot
+from app.api.reservations.models import Reservation
+
+def hour_edges(date, days=1):
+    """Aware datetimes of the local hour boundaries of consecutive days, both ends included."""
+    edges = [
+        timezone.make_aware(datetime.combine(date + timedelta(days=day), time(hour)))
+        for day in range(days)
+        for hour in range(24)
+    ]
+    edges.append(timezone.make_aware(datetime.combine(date + timedelta(days=days), time.min)))
+    return edges
+
+def occupied_seconds(lot_index, starts, ends, boundaries):
+    """
+    Occupied space-seconds between consecutive boundaries, per lot.
+    
+    For sorted interval starts s and ends e, the occupied space-seconds before
+    time T is sum(T - s for s < T) - sum(T - e for e < T). Evaluating that at
+    every boundary with searchsorted over prefix sums is a single sweep over
+    the sorted intervals. Lots are laid out on disjoint stretches of one
+    timeline (lot_index * span) so every lot is handled in the same pass.
+    
+    lot_index, starts and ends are 1-D arrays with times in seconds relative
+    to boundaries[0]; boundaries is 1-D and increasing. Returns an array of
+    shape (lots, len(boundaries) - 1).
+    """
+    lots = int(lot_index.max()) + 1 if len(lot_index) else 0
+    span = boundaries[-1] - boundaries[0] + 1
+    offsets = lot_index * span
+    starts = np.sort(np.clip(starts, boundaries[0], boundaries[-1]) + offsets)
+    ends = np.sort(np.clip(ends, boundaries[0], boundaries[-1]) + offsets)
+    points = (np.arange(lots)[:, None] * span + boundaries[None, :]).ravel()
+    
+    start_sums = np.concatenate(([0.0], np.cumsum(starts)))
+    end_sums = np.concatenate(([0.0], np.cumsum(ends)))
+    started = np.searchsorted(starts, points, side='left')
+    ended = np.searchsorted(ends, points, side='left')
+    area = (started * points - start_sums[started]) - (ended * points - end_sums[ended])
+    
+    return np.diff(area.reshape(lots, len(boundaries)), axis=1)
+
+def hourly_occupied_seconds(edges, statuses, parking_lots=None):
+    """
+    Occupied space-seconds of every lot between consecutive hour edges.
+    
+    Returns (lot_ids, capacities, occupied, hour_seconds): lot ids and their
+    total spaces, an array of shape (lots, len(edges) - 1), and the length of
+    each bucket. Intervals are read with one query and swept in one pass.
+    """
+    window_start = edges[0]
+    
+    capacities = ParkingLot.objects.all()
+    reservations = Reservation.objects.filter(
+        status__in=statuses,
+        start_time__lt=edges[-1],
+        end_time__gt=window_start
+    )
+    if parking_lots is not None:
+        capacities = capacities.filter(pk__in=[lot.pk for lot in parking_lots])
+        reservations = reservations.filter(parking_lot__in=parking_lots)
+    capacities = dict(capacities.values_list('id', 'total_spaces'))
+    
+    lot_ids = list(capacities)
+    index_of = {lot_id: index for index, lot_id in enumerate(lot_ids)}
+    rows = [
+        (index_of[lot_id], (start - window_start).total_seconds(), (end - window_start).total_seconds())
+        for lot_id, start, end in reservations.values_list('parking_lot_id', 'start_time', 'end_time')
+        if lot_id in index_of
+    ]
+    intervals = np.array(rows, dtype=float).reshape(-1, 3)
+    boundaries = np.array([(edge - window_start).total_seconds() for edge in edges])
+    
+    occupied = np.zeros((len(lot_ids), len(edges) - 1))
+    if len(intervals):
+        swept = occupied_seconds(intervals[:, 0].astype(int), intervals[:, 1], intervals[:, 2], boundaries)
+        occupied[:len(swept)] = swept
+    capacity = np.array([capacities[lot_id] for lot_id in lot_ids], dtype=float)
+    return lot_ids, capacity, occupied, np.diff(boundaries)
+
+def lot_occupancy(date, statuses, parking_lots=None):
+    """
+    Time-weighted occupancy of every lot over a local day.
+    
+    Returns {lot_id: {'occupancy_rate': float, 'hourly_occupancy': [24 floats]}}
+    plus the same figures for all lots combined under the key None. Rates are
+    percentages of the lot's capacity-time occupied by reservations in the
+    given statuses, read with one query over the intervals overlapping the day.
+    """
+    lot_ids, capacity, occupied, hour_seconds = hourly_occupied_seconds(
+        hour_edges(date), statuses, parking_lots
+    )
+    
+    def rates(occupied_rows, spaces):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            hourly = np.where(spaces > 0, occupied_rows / (spaces * hour_seconds) * 100, 0)
+            daily = occupied_rows.sum() / (spaces * hour_seconds.sum()) * 100 if spaces > 0 else 0
+        return {
+            'occupancy_rate': float(min(daily, 100)),
+            'hourly_occupancy': np.minimum(hourly, 100).round(2).tolist()
+        }
+    
+    result = {
+        lot_id: rates(occupied[index], capacity[index])
+        for index, lot_id in enumerate(lot_ids)
+    }
+    result[None] = rates(occupied.sum(axis=0), capacity.sum())
+    return result
+
+def hour_of_week_occupancy(start_date, end_date, statuses):
+    """
+    Average occupancy (percent) of every lot for each of the 168 hours of the week.
+    
+    Hours are bucketed Monday 00:00 first. Returns (lot_ids, array of shape
+    (lots, 168)); hours of the week that do not occur in the window are 0.
+    """
+    edges = hour_edges(start_date, (end_date - start_date).days + 1)
+    lot_ids, capacity, occupied, hour_seconds = hourly_occupied_seconds(edges, statuses)
+    
+    local_edges = [timezone.localtime(edge) for edge in edges[:-1]]
+    hour_of_week = np.array([edge.weekday() * 24 + edge.hour for edge in local_edges])
+    
+    occupied_by_hour = np.zeros((len(lot_ids), 168))
+    np.add.at(occupied_by_hour, (slice(None), hour_of_week), occupied)
+    available_by_hour = np.bincount(hour_of_week, weights=hour_seconds, minlength=168)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = occupied_by_hour / (capacity[:, None] * available_by_hour[None, :]) * 100
+    return lot_ids, np.minimum(np.nan_to_num(rates, nan=0, posinf=0), 100)
@@ -1,5 +1,8 @@
 from rest_framework import serializers
-from .models import DailyReport, ParkingLotReport, MonthlyReport
+from .models import (
+    DailyReport, ParkingLotReport, MonthlyReport, WeeklyReport, YearlyReport, ReportJob
+)
+from .exports import EXPORT_CONTENT_TYPES
 
 class DailyReportSerializer(serializers.ModelSerializer):
     """Serializer for daily reports."""
@@ -9,6 +12,7 @@ class DailyReportSerializer(serializers.ModelSerializer):
         fields = [
             'date', 'total_revenue', 'total_reservations',
             'average_duration', 'peak_hour', 'occupancy_rate',
+            'hourly_counts', 'hourly_occupancy', 'computed_at', 'source_watermark',
             'created_at', 'updated_at'
         ]
         read_only_fields = ('created_at', 'updated_at')
@@ -19,7 +23,25 @@ class MonthlyReportSerializer(serializers.ModelSerializer):
         fields = [
             'year', 'month', 'total_revenue', 'total_reservations',
             'average_duration', 'average_occupancy_rate', 'peak_day',
-            'created_at', 'updated_at'
+            'computed_at', 'source_watermark', 'created_at', 'updated_at'
+        ]
+
+class WeeklyReportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WeeklyReport
+        fields = [
+            'week_start', 'total_revenue', 'total_reservations',
+            'average_duration', 'average_occupancy_rate', 'peak_day',
+            'computed_at', 'source_watermark', 'created_at', 'updated_at'
+        ]
+
+class YearlyReportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = YearlyReport
+        fields = [
+            'year', 'total_revenue', 'total_reservations',
+            'average_duration', 'average_occupancy_rate', 'peak_day',
+            'computed_at', 'source_watermark', 'created_at', 'updated_at'
         ]
 
 class ParkingLotReportSerializer(serializers.ModelSerializer):
@@ -35,7 +57,8 @@ class ParkingLotReportSerializer(serializers.ModelSerializer):
         fields = [
             'parking_lot', 'parking_lot_name', 'date', 'total_revenue',
             'total_reservations', 'occupancy_rate', 'average_duration',
-            'peak_hour', 'created_at', 'updated_at'
+            'peak_hour', 'hourly_counts', 'hourly_occupancy', 'computed_at',
+            'source_watermark', 'created_at', 'updated_at'
         ]
         read_only_fields = ('created_at', 'updated_at')
 
@@ -83,4 +106,47 @@ class DateRangeReportSerializer(serializers.Serializer):
     average_duration = serializers.FloatField()
     average_occupancy_rate = serializers.FloatField()
     daily_data = DailyReservationsSerializer(many=True)
-    revenue_data = RevenueSerializer(many=True) 
\ No newline at end of file
+    revenue_data = RevenueSerializer(many=True) 
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    """Serializer for background report jobs."""
+    
+    class Meta:
+        model = ReportJob
+        fields = [
+            'id', 'job_type', 'params', 'status', 'progress', 'result',
+            'result_file', 'error', 'attempts', 'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+class ReportJobCreateSerializer(serializers.Serializer):
+    """Validates a report job submission."""
+    
+    job_type = serializers.ChoiceField(choices=ReportJob.JobType.choices)
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    report_type = serializers.ChoiceField(
+        choices=['daily', 'monthly', 'parking_lot', 'reservations'],
+        default='daily'
+    )
+    file_format = serializers.ChoiceField(
+        choices=list(EXPORT_CONTENT_TYPES),
+        default='csv'
+    )
+    
+    def validate(self, data):
+        if data['start_date'] > data['end_date']:
+            raise serializers.ValidationError('start_date must not be after end_date.')
+        return data
+    
+    def job_params(self):
+        """JSON parameters stored on the job row."""
+        data = self.validated_data
+        params = {
+            'start_date': data['start_date'].isoformat(),
+            'end_date': data['end_date'].isoformat()
+        }
+        if data['job_type'] == ReportJob.JobType.EXPORT:
+            params['report_type'] = data['report_type']
+            params['file_format'] = data['file_format']
+        return params
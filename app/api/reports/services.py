@@ -0,0 +1,227 @@
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.db.models import Avg, Count, Sum
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay, TruncDate
+from django.utils import timezone
+from app.utils.cache import stale_while_revalidate
+from app.api.parking_lots.models import ParkingLot
+from .models import (
+    DailyReport, ParkingLotReport, REPORTABLE_STATUSES, day_bounds, range_sketches,
+    reportable_reservations, overall_occupancy_rate
+)
+from .occupancy import hour_of_week_occupancy
+from .sketches import merge_sketches, quantiles
+from . import hyperloglog
+
+class ReportService:
+    SUMMARY_CACHE_KEY = 'reports:summary'
+    HEATMAP_METRICS = ('reservations', 'occupancy')
+    HOURS_PER_WEEK = 168
+
+    @staticmethod
+    def summary():
+        """
+        Compute today's statistics compared with yesterday
+        """
+        today = timezone.localdate()
+        yesterday = today - timedelta(days=1)
+        
+        # Both days in one grouped query
+        days = {
+            row['date']: row
+            for row in reportable_reservations(
+                day_bounds(yesterday)[0],
+                day_bounds(today)[1]
+            ).annotate(
+                date=TruncDate('start_time')
+            ).values('date').annotate(
+                revenue=Sum('total_cost', default=0),
+                count=Count('id'),
+                duration=Sum('duration', default=0)
+            ).order_by()
+        }
+        empty = {'revenue': 0, 'count': 0, 'duration': 0}
+        today_data = days.get(today, empty)
+        yesterday_data = days.get(yesterday, empty)
+        
+        def average_duration(data):
+            return float(data['duration']) / data['count'] if data['count'] else 0
+        
+        utilization = overall_occupancy_rate()
+        yesterday_utilization = DailyReport.objects.filter(
+            date=yesterday
+        ).values_list('occupancy_rate', flat=True).first() or 0
+        
+        return {
+            'total_revenue': today_data['revenue'],
+            'daily_reservations': today_data['count'],
+            'parking_utilization': utilization,
+            'average_duration': average_duration(today_data),
+            'revenue_change': today_data['revenue'] - yesterday_data['revenue'],
+            'reservation_change': today_data['count'] - yesterday_data['count'],
+            'utilization_change': utilization - yesterday_utilization,
+            'duration_change': average_duration(today_data) - average_duration(yesterday_data)
+        }
+
+    @staticmethod
+    def cached_summary():
+        """
+        Serve the summary from cache, refreshing it in the background when stale
+        """
+        return stale_while_revalidate(
+            ReportService.SUMMARY_CACHE_KEY,
+            ReportService.summary,
+            ttl=settings.REPORT_SUMMARY_CACHE_TTL,
+            stale_ttl=settings.REPORT_SUMMARY_CACHE_STALE_TTL
+        )
+
+    @staticmethod
+    def date_range(start_date, end_date):
+        """
+        Build the date range report from one grouped reservation query and one
+        aggregate over the stored daily reports
+        """
+        daily_rows = list(
+            reportable_reservations(
+                day_bounds(start_date)[0],
+                day_bounds(end_date)[1]
+            ).annotate(
+                date=TruncDate('start_time')
+            ).values('date').annotate(
+                reservations=Count('id'),
+                revenue=Sum('total_cost', default=0),
+                duration=Sum('duration', default=0)
+            ).order_by('date')
+        )
+        
+        total_reservations = sum(row['reservations'] for row in daily_rows)
+        total_duration = sum(float(row['duration']) for row in daily_rows)
+        
+        average_occupancy_rate = DailyReport.objects.filter(
+            date__range=[start_date, end_date]
+        ).aggregate(
+            rate=Avg('occupancy_rate', default=0)
+        )['rate']
+        
+        return {
+            'start_date': start_date,
+            'end_date': end_date,
+            'total_revenue': sum(row['revenue'] for row in daily_rows),
+            'total_reservations': total_reservations,
+            'average_duration': total_duration / total_reservations if total_reservations else 0,
+            'average_occupancy_rate': average_occupancy_rate,
+            'daily_data': [
+                {'date': row['date'], 'reservations': row['reservations']}
+                for row in daily_rows
+            ],
+            'revenue_data': [
+                {'date': row['date'], 'revenue': row['revenue']}
+                for row in daily_rows
+            ]
+        }
+
+    @staticmethod
+    def heatmap(start_date, end_date, metric='reservations'):
+        """
+        Lots x 168 matrix of demand by hour of week (Monday 00:00 first).
+        Reservation counts come from one bucketed aggregate; occupancy from a
+        NumPy sweep over the reservation intervals in the window
+        """
+        lots = list(ParkingLot.objects.order_by('name', 'id').values_list('id', 'name'))
+        row_of = {lot_id: index for index, (lot_id, _) in enumerate(lots)}
+        
+        if metric == 'occupancy':
+            lot_ids, rates = hour_of_week_occupancy(start_date, end_date, REPORTABLE_STATUSES)
+            data = [[0.0] * ReportService.HOURS_PER_WEEK for _ in lots]
+            for index, lot_id in enumerate(lot_ids):
+                if lot_id in row_of:
+                    data[row_of[lot_id]] = rates[index].round(1).tolist()
+        else:
+            data = [[0] * ReportService.HOURS_PER_WEEK for _ in lots]
+            for row in reportable_reservations(
+                day_bounds(start_date)[0],
+                day_bounds(end_date)[1]
+            ).annotate(
+                weekday=ExtractIsoWeekDay('start_time'),
+                hour=ExtractHour('start_time')
+            ).values('parking_lot_id', 'weekday', 'hour').annotate(
+                count=Count('id')
+            ).order_by():
+                if row['parking_lot_id'] in row_of:
+                    data[row_of[row['parking_lot_id']]][(row['weekday'] - 1) * 24 + row['hour']] = row['count']
+        
+        return {
+            'start_date': start_date,
+            'end_date': end_date,
+            'metric': metric,
+            'lots': [{'id': lot_id, 'name': name} for lot_id, name in lots],
+            'data': data
+        }
+
+    @staticmethod
+    def cached_heatmap(start_date, end_date, metric='reservations'):
+        """
+        Serve a heatmap from a cache entry per window and metric
+        """
+        return stale_while_revalidate(
+            f'reports:heatmap:{metric}:{start_date.isoformat()}:{end_date.isoformat()}',
+            lambda: ReportService.heatmap(start_date, end_date, metric),
+            ttl=settings.REPORT_HEATMAP_CACHE_TTL,
+            stale_ttl=settings.REPORT_HEATMAP_CACHE_STALE_TTL
+        )
+
+    @staticmethod
+    def percentiles(start_date, end_date, percentiles=(50, 90, 99), parking_lot_id=None):
+        """
+        Duration and revenue percentiles over a date range, merged from the
+        sketches stored on the weekly, monthly and yearly rollups for whole
+        periods and on the daily (or lot) reports otherwise, without reading
+        reservations
+        """
+        if parking_lot_id is None:
+            sketches = range_sketches(start_date, end_date, settings.REPORTS_READ_DATABASE)
+        else:
+            sketches = list(ParkingLotReport.objects.using(settings.REPORTS_READ_DATABASE).filter(
+                parking_lot_id=parking_lot_id,
+                date__range=[start_date, end_date]
+            ).values_list('duration_sketch', 'revenue_sketch'))
+        
+        fractions = [percentile / 100 for percentile in percentiles]
+        duration = merge_sketches(sketch for sketch, _ in sketches)
+        revenue = merge_sketches(sketch for _, sketch in sketches)
+        return {
+            'start_date': start_date,
+            'end_date': end_date,
+            'parking_lot': parking_lot_id,
+            'count': sum(duration.values()),
+            'duration': dict(zip((f'p{p:g}' for p in percentiles), quantiles(duration, fractions))),
+            'revenue': dict(zip((f'p{p:g}' for p in percentiles), quantiles(revenue, fractions)))
+        }
+
+    @staticmethod
+    def unique_counts(start_date, end_date, parking_lot_id=None):
+        """
+        Approximate distinct visitors and plates over a date range, merged from
+        the lot-day HyperLogLog sketches instead of COUNT(DISTINCT) over reservations
+        """
+        reports = ParkingLotReport.objects.using(settings.REPORTS_READ_DATABASE).filter(
+            date__range=[start_date, end_date]
+        )
+        if parking_lot_id is not None:
+            reports = reports.filter(parking_lot_id=parking_lot_id)
+        visitors = hyperloglog.empty()
+        plates = hyperloglog.empty()
+        for visitor_sketch, plate_sketch in reports.values_list(
+            'visitor_sketch', 'plate_sketch'
+        ).iterator(chunk_size=500):
+            np.maximum(visitors, hyperloglog.load(visitor_sketch), out=visitors)
+            np.maximum(plates, hyperloglog.load(plate_sketch), out=plates)
+        
+        return {
+            'start_date': start_date,
+            'end_date': end_date,
+            'parking_lot': parking_lot_id,
+            'unique_visitors': hyperloglog.estimate(visitors),
+            'unique_plates': hyperloglog.estimate(plates)
+        }
@@ -0,0 +1,43 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from app.api.reservations.models import Reservation
+from .incremental import (
+    CONTRIBUTION_FIELDS, reservation_contribution, record_reservation_change
+)
+
+def _current_contribution(instance):
+    return reservation_contribution(
+        **{field: getattr(instance, field) for field in CONTRIBUTION_FIELDS}
+    )
+
+@receiver(pre_save, sender=Reservation)
+def remember_report_contribution(sender, instance, raw, **kwargs):
+    """
+    Remember what the stored row contributes to the reports before it changes
+    """
+    instance._report_contribution = None
+    if raw or instance._state.adding:
+        return
+    
+    stored = Reservation.objects.filter(pk=instance.pk).values(*CONTRIBUTION_FIELDS).first()
+    if stored:
+        instance._report_contribution = reservation_contribution(**stored)
+
+@receiver(post_save, sender=Reservation)
+def update_reports_on_save(sender, instance, raw, **kwargs):
+    """
+    Move the reservation's contribution between report rows
+    """
+    if raw:
+        return
+    record_reservation_change(
+        getattr(instance, '_report_contribution', None),
+        _current_contribution(instance)
+    )
+
+@receiver(post_delete, sender=Reservation)
+def update_reports_on_delete(sender, instance, **kwargs):
+    """
+    Remove a deleted reservation from the reports
+    """
+    record_reservation_change(_current_contribution(instance), None)
@@ -0,0 +1,75 @@
+"""
+Fixed-size, mergeable quantile sketches stored as JSON on report rows.
+
+A sketch is a log-bucketed histogram: bucket 0 holds values below
+SKETCH_MIN_VALUE and bucket i >= 1 covers
+[SKETCH_MIN_VALUE * SKETCH_GAMMA ** (i - 1), SKETCH_MIN_VALUE * SKETCH_GAMMA ** i).
+Quantiles are therefore accurate to within SKETCH_GAMMA relative error, and
+sketches merge exactly by adding bucket counts. They are stored sparsely as
+{"bucket": count} with at most SKETCH_BUCKETS entries.
+"""
+import math
+import numpy as np
+
+SKETCH_MIN_VALUE = 0.01
+SKETCH_GAMMA = 1.05
+SKETCH_BUCKETS = 400
+
+def bucket_of(values):
+    """Bucket indices of an array of non-negative values."""
+    values = np.asarray(values, dtype=float)
+    with np.errstate(divide='ignore'):
+        buckets = np.floor(np.log(values / SKETCH_MIN_VALUE) / math.log(SKETCH_GAMMA)) + 1
+    buckets = np.where(values < SKETCH_MIN_VALUE, 0, buckets)
+    return np.clip(buckets, 0, SKETCH_BUCKETS - 1).astype(int)
+
+def bucket_value(bucket):
+    """Representative (geometric middle) value of a bucket."""
+    if bucket == 0:
+        return 0.0
+    return SKETCH_MIN_VALUE * SKETCH_GAMMA ** (bucket - 0.5)
+
+def to_sketch(counts):
+    """Sparse JSON form of a dense array of bucket counts."""
+    return {str(bucket): int(counts[bucket]) for bucket in np.flatnonzero(counts)}
+
+def build_sketch(values):
+    """Sketch of a sequence of values."""
+    return to_sketch(np.bincount(bucket_of(values), minlength=SKETCH_BUCKETS))
+
+def add_value(sketch, value, sign=1):
+    """Add (sign=1) or remove (sign=-1) one value, returning a new sketch."""
+    key = str(int(bucket_of([float(value)])[0]))
+    sketch = dict(sketch or {})
+    count = sketch.get(key, 0) + sign
+    if count > 0:
+        sketch[key] = count
+    else:
+        sketch.pop(key, None)
+    return sketch
+
+def merge_sketches(sketches):
+    """Merge any number of sketches into one."""
+    merged = {}
+    for sketch in sketches:
+        for key, count in (sketch or {}).items():
+            merged[key] = merged.get(key, 0) + count
+    return merged
+
+def quantiles(sketch, fractions):
+    """Estimate quantiles (fractions in [0, 1]) of a sketch; None when it is empty."""
+    buckets = sorted((int(key), count) for key, count in (sketch or {}).items())
+    total = sum(count for _, count in buckets)
+    if not total:
+        return [None for _ in fractions]
+    
+    results = []
+    for fraction in fractions:
+        rank = max(math.ceil(fraction * total), 1)
+        seen = 0
+        for bucket, count in buckets:
+            seen += count
+            if seen >= rank:
+                results.append(round(bucket_value(bucket), 2))
+                break
+    return results
@@ -0,0 +1,18 @@
+"""Periodic report jobs, run by the task supervisor (see PERIODIC_JOBS)."""
+from datetime import timedelta
+from django.utils import timezone
+from .models import DailyReport, ParkingLotReport, refresh_rollup_periods, refresh_stale_rollups
+
+def refresh_reports(days=2):
+    """Recompute the last days' daily and per-lot reports and their rollups; returns the day count."""
+    today = timezone.localdate()
+    dates = [today - timedelta(days=offset) for offset in range(days)]
+    for date in dates:
+        DailyReport.generate_report(date, rollup=False)
+        ParkingLotReport.generate_reports(date)
+    refresh_rollup_periods(dates)
+    return len(dates)
+
+def roll_up_reports():
+    """Roll up the weekly, monthly and yearly reports of days changed since the last run."""
+    return refresh_stale_rollups()
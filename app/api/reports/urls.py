@@ -1,16 +1,23 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ReportViewSet
+from .views import ReportViewSet, ReportJobViewSet
 
 router = DefaultRouter()
+router.register(r'reports/jobs', ReportJobViewSet, basename='report-job')
 router.register(r'reports', ReportViewSet, basename='report')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('reports/summary/', ReportViewSet.as_view({'get': 'summary'})),
-    path('reports/monthly/', ReportViewSet.as_view({'get': 'monthly'})),
-    path('reports/daily/', ReportViewSet.as_view({'get': 'daily'})),
+    path('reports/monthly/', ReportViewSet.as_view({'get': 'monthly', 'post': 'monthly'})),
+    path('reports/weekly/', ReportViewSet.as_view({'get': 'weekly', 'post': 'weekly'})),
+    path('reports/yearly/', ReportViewSet.as_view({'get': 'yearly', 'post': 'yearly'})),
+    path('reports/daily/', ReportViewSet.as_view({'get': 'daily', 'post': 'daily'})),
     path('reports/date-range/', ReportViewSet.as_view({'get': 'date_range'})),
-    path('reports/parking-lot/<int:pk>/', ReportViewSet.as_view({'get': 'parking_lot'})),
+    path('reports/parking-lots/', ReportViewSet.as_view({'get': 'parking_lots', 'post': 'parking_lots'})),
+    path('reports/parking-lot/<int:pk>/', ReportViewSet.as_view({'get': 'parking_lot', 'post': 'parking_lot'})),
+    path('reports/heatmap/', ReportViewSet.as_view({'get': 'heatmap'})),
+    path('reports/percentiles/', ReportViewSet.as_view({'get': 'percentiles'})),
+    path('reports/unique/', ReportViewSet.as_view({'get': 'unique'})),
     path('reports/export/', ReportViewSet.as_view({'get': 'export'})),
 ] 
\ No newline at end of file
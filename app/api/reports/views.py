@@ -1,23 +1,39 @@
-from rest_framework import viewsets, permissions, status
+from rest_framework import viewsets, mixins, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
 from django.utils import timezone
 from django.db.models import Count, Sum, Avg
 from django.db.models.functions import TruncDate, TruncHour
-from datetime import timedelta, datetime
-import csv
-from django.http import HttpResponse
-from .models import DailyReport, ParkingLotReport, MonthlyReport
+from datetime import MAXYEAR, MINYEAR, timedelta, datetime
+from django.http import FileResponse, StreamingHttpResponse
+from .models import DailyReport, ParkingLotReport, MonthlyReport, WeeklyReport, YearlyReport, ReportJob
 from .serializers import (
     DailyReportSerializer, ParkingLotReportSerializer,
     ReportSummarySerializer, DailyReservationsSerializer,
     RevenueSerializer, PeakHoursSerializer,
     UserDemographicsSerializer, MonthlyReportSerializer,
-    DateRangeReportSerializer
+    WeeklyReportSerializer, YearlyReportSerializer,
+    DateRangeReportSerializer, ReportJobSerializer, ReportJobCreateSerializer
 )
+from .services import ReportService
+from .exports import EXPORT_CONTENT_TYPES, export_source, stream_rows
+from .jobs import submit_job
 from app.api.reservations.models import Reservation
 from app.api.parking_lots.models import ParkingLot
 
+# Longest window a heatmap may cover
+HEATMAP_MAX_DAYS = 366
+
+def stored_report(model, **lookup):
+    """
+    Read a stored report without computing or writing anything.
+    A report that was never generated comes back unsaved and zeroed, with computed_at null.
+    """
+    report = model.objects.using(settings.REPORTS_READ_DATABASE).filter(**lookup).first()
+    return report if report is not None else model(**lookup)
+
 class ReportViewSet(viewsets.ViewSet):
     """ViewSet for generating and retrieving reports."""
     
@@ -26,61 +42,67 @@ class ReportViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def summary(self, request):
         """Get summary of current day's statistics."""
-        today = timezone.now().date()
-        yesterday = today - timedelta(days=1)
-        
-        # Get today's data
-        today_reservations = Reservation.objects.filter(
-            start_time__date=today,
-            status__in=['active', 'completed']
-        )
-        today_revenue = sum(r.total_cost for r in today_reservations)
-        today_count = today_reservations.count()
-        today_duration = sum(r.duration for r in today_reservations) / today_count if today_count > 0 else 0
-        
-        # Get yesterday's data for comparison
-        yesterday_reservations = Reservation.objects.filter(
-            start_time__date=yesterday,
-            status__in=['active', 'completed']
-        )
-        yesterday_revenue = sum(r.total_cost for r in yesterday_reservations)
-        yesterday_count = yesterday_reservations.count()
-        yesterday_duration = sum(r.duration for r in yesterday_reservations) / yesterday_count if yesterday_count > 0 else 0
-        
-        # Calculate overall parking utilization
-        total_spaces = sum(lot.total_spaces for lot in ParkingLot.objects.all())
-        occupied_spaces = sum(lot.total_spaces - lot.available_spaces for lot in ParkingLot.objects.all())
-        utilization = (occupied_spaces / total_spaces * 100) if total_spaces > 0 else 0
-        
-        # Calculate yesterday's utilization
-        yesterday_utilization = DailyReport.objects.filter(date=yesterday).first()
-        yesterday_utilization = yesterday_utilization.occupancy_rate if yesterday_utilization else 0
-        
-        data = {
-            'total_revenue': today_revenue,
-            'daily_reservations': today_count,
-            'parking_utilization': utilization,
-            'average_duration': today_duration,
-            'revenue_change': today_revenue - yesterday_revenue,
-            'reservation_change': today_count - yesterday_count,
-            'utilization_change': utilization - yesterday_utilization,
-            'duration_change': today_duration - yesterday_duration
-        }
-        
-        serializer = ReportSummarySerializer(data)
+        serializer = ReportSummarySerializer(ReportService.cached_summary())
         return Response(serializer.data)
     
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get', 'post'])
     def monthly(self, request):
-        """Get monthly report for the current month."""
-        today = timezone.now()
-        year = today.year
-        month = today.month
+        """Get the stored report for the current month; POST regenerates it."""
+        today = timezone.localdate()
         
-        report = MonthlyReport.generate_report(year=year, month=month)
+        if request.method == 'POST':
+            report = MonthlyReport.generate_report(year=today.year, month=today.month)
+        else:
+            report = stored_report(MonthlyReport, year=today.year, month=today.month)
         serializer = MonthlyReportSerializer(report)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get', 'post'])
+    def weekly(self, request):
+        """Get the stored report for the week containing a date (default today); POST regenerates it."""
+        date_str = request.query_params.get('date')
+        
+        if not date_str:
+            date = timezone.localdate()
+        else:
+            try:
+                date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            except ValueError:
+                return Response(
+                    {'detail': 'Invalid date format. Use YYYY-MM-DD.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        if request.method == 'POST':
+            report = WeeklyReport.refresh(date)
+        else:
+            report = stored_report(WeeklyReport, **WeeklyReport.period_lookup(date))
+        serializer = WeeklyReportSerializer(report)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get', 'post'])
+    def yearly(self, request):
+        """Get the stored report for a year (default the current year); POST regenerates it."""
+        year = request.query_params.get('year', timezone.localdate().year)
+        
+        try:
+            year = int(year)
+        except ValueError:
+            year = None
+        # The period runs up to January 1 of the next year, which must be a valid date too
+        if year is None or not MINYEAR <= year < MAXYEAR:
+            return Response(
+                {'detail': 'Invalid year.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if request.method == 'POST':
+            report = YearlyReport.generate_report(year)
+        else:
+            report = stored_report(YearlyReport, year=year)
+        serializer = YearlyReportSerializer(report)
+        return Response(serializer.data)
+    
     @action(detail=False, methods=['get'])
     def date_range(self, request):
         """Get report for a custom date range."""
@@ -102,57 +124,114 @@ class ReportViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get reservations for the date range
-        reservations = Reservation.objects.filter(
-            start_time__date__range=[start_date, end_date],
-            status__in=['active', 'completed']
-        )
+        if start_date > end_date:
+            return Response(
+                {'detail': 'start_date must not be after end_date.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Calculate summary statistics
-        total_revenue = sum(r.total_cost for r in reservations)
-        total_reservations = reservations.count()
-        average_duration = sum(r.duration for r in reservations) / total_reservations if total_reservations > 0 else 0
+        data = ReportService.date_range(start_date, end_date)
+        serializer = DateRangeReportSerializer(data)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def heatmap(self, request):
+        """Get a lots x 168 hour-of-week matrix of reservations or occupancy."""
+        today = timezone.localdate()
+        try:
+            start_date = datetime.strptime(
+                request.query_params.get('start_date', (today - timedelta(days=27)).isoformat()),
+                '%Y-%m-%d'
+            ).date()
+            end_date = datetime.strptime(
+                request.query_params.get('end_date', today.isoformat()),
+                '%Y-%m-%d'
+            ).date()
+        except ValueError:
+            return Response(
+                {'detail': 'Invalid date format. Use YYYY-MM-DD.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Calculate average occupancy rate
-        daily_reports = DailyReport.objects.filter(
-            date__range=[start_date, end_date]
-        )
-        average_occupancy_rate = sum(report.occupancy_rate for report in daily_reports) / len(daily_reports) if daily_reports else 0
+        if start_date > end_date or (end_date - start_date).days >= HEATMAP_MAX_DAYS:
+            return Response(
+                {'detail': f'Use a window of 1 to {HEATMAP_MAX_DAYS} days ending on end_date.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Get daily data
-        daily_data = reservations.annotate(
-            date=TruncDate('start_time')
-        ).values('date').annotate(
-            reservations=Count('id')
-        ).order_by('date')
+        metric = request.query_params.get('metric', 'reservations')
+        if metric not in ReportService.HEATMAP_METRICS:
+            return Response(
+                {'detail': 'Invalid metric. Use reservations or occupancy.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(ReportService.cached_heatmap(start_date, end_date, metric))
+    
+    @action(detail=False, methods=['get'])
+    def percentiles(self, request):
+        """Get duration and revenue percentiles over a date range from the stored sketches."""
+        today = timezone.localdate()
+        try:
+            start_date = datetime.strptime(
+                request.query_params.get('start_date', today.isoformat()), '%Y-%m-%d'
+            ).date()
+            end_date = datetime.strptime(
+                request.query_params.get('end_date', today.isoformat()), '%Y-%m-%d'
+            ).date()
+        except ValueError:
+            return Response(
+                {'detail': 'Invalid date format. Use YYYY-MM-DD.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Get revenue data by date
-        revenue_data = []
-        for date in daily_data:
-            date_reservations = reservations.filter(start_time__date=date['date'])
-            revenue = sum(r.total_cost for r in date_reservations)
-            revenue_data.append({
-                'date': date['date'],
-                'revenue': revenue
-            })
-        
-        data = {
-            'start_date': start_date,
-            'end_date': end_date,
-            'total_revenue': total_revenue,
-            'total_reservations': total_reservations,
-            'average_duration': average_duration,
-            'average_occupancy_rate': average_occupancy_rate,
-            'daily_data': daily_data,
-            'revenue_data': revenue_data
-        }
+        try:
+            percentiles = [float(p) for p in request.query_params.get('q', '50,90,99').split(',')]
+            parking_lot_id = request.query_params.get('parking_lot')
+            parking_lot_id = int(parking_lot_id) if parking_lot_id else None
+        except ValueError:
+            return Response(
+                {'detail': 'q must be comma separated numbers and parking_lot an id.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start_date > end_date or not all(0 <= p <= 100 for p in percentiles):
+            return Response(
+                {'detail': 'start_date must not be after end_date, and percentiles must be within 0-100.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        serializer = DateRangeReportSerializer(data)
-        return Response(serializer.data)
+        return Response(ReportService.percentiles(start_date, end_date, percentiles, parking_lot_id))
+    
+    @action(detail=False, methods=['get'])
+    def unique(self, request):
+        """Get approximate unique visitors and plates over a date range."""
+        today = timezone.localdate()
+        try:
+            start_date = datetime.strptime(
+                request.query_params.get('start_date', today.isoformat()), '%Y-%m-%d'
+            ).date()
+            end_date = datetime.strptime(
+                request.query_params.get('end_date', today.isoformat()), '%Y-%m-%d'
+            ).date()
+            parking_lot_id = request.query_params.get('parking_lot')
+            parking_lot_id = int(parking_lot_id) if parking_lot_id else None
+        except ValueError:
+            return Response(
+                {'detail': 'Use YYYY-MM-DD dates and a numeric parking_lot.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if start_date > end_date:
+            return Response(
+                {'detail': 'start_date must not be after end_date.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(ReportService.unique_counts(start_date, end_date, parking_lot_id))
     
     @action(detail=False, methods=['get'])
     def export(self, request):
-        """Export report data to CSV."""
+        """Export report data or raw reservations as streamed CSV or NDJSON."""
         report_type = request.query_params.get('type', 'daily')
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
@@ -172,60 +251,29 @@ class ReportViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{report_type}_report_{start_date}_{end_date}.csv"'
-        
-        writer = csv.writer(response)
-        
-        if report_type == 'daily':
-            reports = DailyReport.objects.filter(date__range=[start_date, end_date])
-            writer.writerow(['Date', 'Total Revenue', 'Total Reservations', 'Average Duration', 'Peak Hour', 'Occupancy Rate'])
-            for report in reports:
-                writer.writerow([
-                    report.date,
-                    report.total_revenue,
-                    report.total_reservations,
-                    report.average_duration,
-                    report.peak_hour,
-                    report.occupancy_rate
-                ])
-        elif report_type == 'monthly':
-            reports = MonthlyReport.objects.filter(
-                year__gte=start_date.year,
-                year__lte=end_date.year,
-                month__gte=start_date.month if start_date.year == end_date.year else 1,
-                month__lte=end_date.month if start_date.year == end_date.year else 12
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_CONTENT_TYPES:
+            return Response(
+                {'detail': 'Invalid file format. Use csv or ndjson.'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            writer.writerow(['Year', 'Month', 'Total Revenue', 'Total Reservations', 'Average Duration', 'Average Occupancy Rate', 'Peak Day'])
-            for report in reports:
-                writer.writerow([
-                    report.year,
-                    report.month,
-                    report.total_revenue,
-                    report.total_reservations,
-                    report.average_duration,
-                    report.average_occupancy_rate,
-                    report.peak_day
-                ])
-        elif report_type == 'parking_lot':
-            reports = ParkingLotReport.objects.filter(date__range=[start_date, end_date])
-            writer.writerow(['Parking Lot', 'Date', 'Total Revenue', 'Total Reservations', 'Occupancy Rate', 'Average Duration', 'Peak Hour'])
-            for report in reports:
-                writer.writerow([
-                    report.parking_lot.name,
-                    report.date,
-                    report.total_revenue,
-                    report.total_reservations,
-                    report.occupancy_rate,
-                    report.average_duration,
-                    report.peak_hour
-                ])
-        else:
+        
+        source = export_source(report_type, start_date, end_date)
+        if source is None:
             return Response(
-                {'detail': 'Invalid report type. Use daily, monthly, or parking_lot.'},
+                {'detail': 'Invalid report type. Use daily, monthly, parking_lot, or reservations.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # Stream rows from a server-side cursor so memory stays flat
+        columns, rows = source
+        response = StreamingHttpResponse(
+            stream_rows(columns, rows, file_format),
+            content_type=EXPORT_CONTENT_TYPES[file_format]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{report_type}_report_{start_date}_{end_date}.{file_format}"'
+        )
         return response
     
     @action(detail=False, methods=['get'])
@@ -258,7 +306,7 @@ class ReportViewSet(viewsets.ViewSet):
         ).annotate(
             date=TruncDate('start_time')
         ).values('date').annotate(
-            revenue=Sum('total_cost')
+            revenue=Sum('total_cost', default=0)
         ).order_by('date')
         
         serializer = RevenueSerializer(reservations, many=True)
@@ -301,34 +349,69 @@ class ReportViewSet(viewsets.ViewSet):
         serializer = UserDemographicsSerializer(data, many=True)
         return Response(serializer.data)
     
-    @action(detail=True, methods=['get'])
-    def parking_lot(self, request, pk=None):
-        """Get detailed report for a specific parking lot."""
-        try:
-            parking_lot = ParkingLot.objects.get(pk=pk)
-        except ParkingLot.DoesNotExist:
-            return Response(
-                {'detail': 'Parking lot not found.'},
-                status=status.HTTP_404_NOT_FOUND
-            )
+    @action(detail=False, methods=['get', 'post'])
+    def parking_lots(self, request):
+        """List every parking lot's stored report for a date; POST regenerates them all."""
+        date_str = request.query_params.get('date')
         
-        # Generate report for today
-        report = ParkingLotReport.generate_report(
-            parking_lot=parking_lot,
-            date=timezone.now().date()
-        )
+        if not date_str:
+            date = timezone.localdate()
+        else:
+            try:
+                date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            except ValueError:
+                return Response(
+                    {'detail': 'Invalid date format. Use YYYY-MM-DD.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        database = settings.REPORTS_READ_DATABASE
+        if request.method == 'POST':
+            ParkingLotReport.generate_reports(date)
+            database = DEFAULT_DB_ALIAS
+        
+        # Lot names are joined in the same query instead of loaded per row
+        reports = ParkingLotReport.objects.using(database).select_related('parking_lot').filter(date=date).order_by('parking_lot__name')
+        serializer = ParkingLotReportSerializer(reports, many=True)
+        return Response(serializer.data)
+    
+    @action(detail=True, methods=['get', 'post'])
+    def parking_lot(self, request, pk=None):
+        """Get the stored report of a parking lot for today; POST regenerates it."""
+        today = timezone.localdate()
+        report = ParkingLotReport.objects.using(
+            settings.REPORTS_READ_DATABASE
+        ).select_related('parking_lot').filter(
+            parking_lot_id=pk,
+            date=today
+        ).first()
+        
+        if report is None or request.method == 'POST':
+            parking_lot = report.parking_lot if report else ParkingLot.objects.using(
+                settings.REPORTS_READ_DATABASE
+            ).filter(pk=pk).first()
+            if parking_lot is None:
+                return Response(
+                    {'detail': 'Parking lot not found.'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            
+            if request.method == 'POST':
+                report = ParkingLotReport.generate_report(parking_lot=parking_lot, date=today)
+            else:
+                report = ParkingLotReport(parking_lot=parking_lot, date=today)
         
         serializer = ParkingLotReportSerializer(report)
         return Response(serializer.data)
     
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get', 'post'])
     def daily(self, request):
-        """Get daily report for a specific date."""
+        """Get the stored daily report for a date; POST regenerates it."""
         date_str = request.query_params.get('date')
         
         if not date_str:
             # If no date provided, use today's date
-            date = timezone.now().date()
+            date = timezone.localdate()
         else:
             try:
                 date = datetime.strptime(date_str, '%Y-%m-%d').date()
@@ -338,7 +421,49 @@ class ReportViewSet(viewsets.ViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
         
-        # Get or create daily report
-        report = DailyReport.generate_report(date=date)
+        if request.method == 'POST':
+            report = DailyReport.generate_report(date=date)
+        else:
+            report = stored_report(DailyReport, date=date)
         serializer = DailyReportSerializer(report)
-        return Response(serializer.data) 
\ No newline at end of file
+        return Response(serializer.data)
+
+class ReportJobViewSet(mixins.ListModelMixin,
+                       mixins.RetrieveModelMixin,
+                       viewsets.GenericViewSet):
+    """
+    Submit long-running reports to the background worker pool.
+    Progress and completion are pushed to the admin's notification group.
+    """
+    serializer_class = ReportJobSerializer
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get_queryset(self):
+        return ReportJob.objects.filter(requested_by=self.request.user)
+    
+    def create(self, request):
+        """Queue a date range report or export and return its id right away."""
+        serializer = ReportJobCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = submit_job(
+            request.user,
+            serializer.validated_data['job_type'],
+            serializer.job_params()
+        )
+        return Response(ReportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Download the file produced by a completed export job."""
+        job = self.get_object()
+        if job.status != ReportJob.Status.COMPLETED or not job.result_file:
+            return Response(
+                {'detail': 'Result file not available.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return FileResponse(
+            job.result_file.open('rb'),
+            as_attachment=True,
+            filename=job.result_file.name.rsplit('/', 1)[-1],
+            content_type=EXPORT_CONTENT_TYPES[job.params['file_format']]
+        )
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from app.api.reservations.models import Reservation
+
+class Command(BaseCommand):
+    help = 'Backfills the persisted rate snapshot, duration and total cost of reservations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of reservations updated per chunk'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute every reservation, not only those without a rate snapshot'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        
+        queryset = Reservation.objects.select_related('parking_lot').only(
+            'id', 'start_time', 'end_time', 'hourly_rate',
+            'duration', 'total_cost', 'parking_lot__hourly_rate'
+        ).order_by('pk')
+        if not options['all']:
+            queryset = queryset.filter(hourly_rate__isnull=True)
+        
+        self.stdout.write('Backfilling reservation totals...')
+        
+        # Walk the table by primary key so every chunk is a cheap index range scan
+        last_pk = 0
+        updated = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            
+            for reservation in batch:
+                reservation.calculate_totals()
+            
+            with transaction.atomic():
+                Reservation.objects.bulk_update(
+                    batch,
+                    ['hourly_rate', 'duration', 'total_cost'],
+                    batch_size=batch_size
+                )
+            
+            last_pk = batch[-1].pk
+            updated += len(batch)
+            self.stdout.write(f'Updated {updated} reservations...')
+        
+        self.stdout.write(self.style.SUCCESS(f'Successfully backfilled {updated} reservations'))
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:18
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reservations", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reservation",
+            name="duration",
+            field=models.DecimalField(
+                decimal_places=4,
+                default=Decimal("0"),
+                max_digits=8,
+                verbose_name="duration",
+            ),
+        ),
+        migrations.AddField(
+            model_name="reservation",
+            name="hourly_rate",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                max_digits=6,
+                null=True,
+                verbose_name="hourly rate",
+            ),
+        ),
+        migrations.AddField(
+            model_name="reservation",
+            name="total_cost",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=Decimal("0"),
+                max_digits=10,
+                verbose_name="total cost",
+            ),
+        ),
+    ]
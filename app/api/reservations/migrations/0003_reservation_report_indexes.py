@@ -0,0 +1,28 @@
+# Generated by Django 5.0.2 on 2026-10-19 00:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("parking_lots", "0001_initial"),
+        ("reservations", "0002_reservation_totals"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["start_time", "status"], name="reservation_start_t_34824f_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["parking_lot", "start_time"],
+                name="reservation_parking_27a958_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.2 on 2026-10-19 02:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reservations", "0003_reservation_report_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="reservation",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("active", "Active"),
+                    ("completed", "Completed"),
+                    ("cancelled", "Cancelled"),
+                    ("expired", "Expired"),
+                ],
+                default="active",
+                max_length=20,
+                verbose_name="status",
+            ),
+        ),
+    ]
@@ -13,6 +13,7 @@ class Reservation(models.Model):
         ACTIVE = 'active', _('Active')
         COMPLETED = 'completed', _('Completed')
         CANCELLED = 'cancelled', _('Cancelled')
+        EXPIRED = 'expired', _('Expired')
     
     parking_lot = models.ForeignKey(
         ParkingLot,
@@ -39,6 +40,25 @@ class Reservation(models.Model):
         choices=Status.choices,
         default=Status.ACTIVE
     )
+    hourly_rate = models.DecimalField(
+        _('hourly rate'),
+        max_digits=6,
+        decimal_places=2,
+        null=True,
+        blank=True
+    )
+    duration = models.DecimalField(
+        _('duration'),
+        max_digits=8,
+        decimal_places=4,
+        default=Decimal('0')
+    )
+    total_cost = models.DecimalField(
+        _('total cost'),
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal('0')
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -46,27 +66,39 @@ class Reservation(models.Model):
         verbose_name = _('reservation')
         verbose_name_plural = _('reservations')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['start_time', 'status']),
+            models.Index(fields=['parking_lot', 'start_time']),
+        ]
     
     def __str__(self):
         return f"Reservation {self.id} - {self.user.get_full_name()}"
     
-    @property
-    def duration(self):
-        """Calculate the duration of the reservation in hours."""
+    def calculate_totals(self):
+        """Snapshot the lot's hourly rate and compute duration (hours) and cost."""
+        if self.hourly_rate is None:
+            self.hourly_rate = self.parking_lot.hourly_rate
+        
         if self.end_time and self.start_time:
-            duration = self.end_time - self.start_time
-            return Decimal(str(duration.total_seconds() / 3600))  # Convert to hours and to Decimal
-        return Decimal('0')
-    
-    @property
-    def total_cost(self):
-        """Calculate the total cost of the reservation."""
-        return self.duration * self.parking_lot.hourly_rate
+            seconds = Decimal(int((self.end_time - self.start_time).total_seconds()))
+        else:
+            seconds = Decimal('0')
+        
+        self.duration = (seconds / 3600).quantize(Decimal('0.0001'))
+        self.total_cost = (seconds * self.hourly_rate / 3600).quantize(Decimal('0.01'))
     
     def save(self, *args, **kwargs):
         """Override save to handle space status updates."""
         is_new = self._state.adding
         
+        # Keep the persisted duration and cost in sync with the booked times
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.calculate_totals()
+        elif {'start_time', 'end_time', 'hourly_rate'} & set(update_fields):
+            self.calculate_totals()
+            kwargs['update_fields'] = set(update_fields) | {'hourly_rate', 'duration', 'total_cost'}
+        
         if is_new:
             # New reservation
             self.parking_space.status = ParkingSpace.Status.RESERVED
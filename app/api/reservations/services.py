@@ -1,6 +1,7 @@
 from django.utils import timezone
 from django.db import transaction
 from app.api.reservations.models import Reservation
+from app.api.notification.models import Notification
 from app.api.realtime.utils import send_notification_to_user
 from datetime import timedelta
 
@@ -27,7 +28,8 @@ class ReservationService:
                     "parking_lot": reservation.parking_lot.name,
                     "start_time": reservation.start_time.isoformat(),
                     "end_time": reservation.end_time.isoformat(),
-                }
+                },
+                notification_type=Notification.NotificationType.NEW_RESERVATION
             )
             return reservation
 
@@ -51,7 +53,8 @@ class ReservationService:
                     {
                         "reservation_id": reservation.id,
                         "parking_lot": reservation.parking_lot.name,
-                    }
+                    },
+                    notification_type=Notification.NotificationType.RESERVATION_CANCELLED
                 )
                 return reservation
             except Reservation.DoesNotExist:
@@ -60,48 +63,66 @@ class ReservationService:
     @staticmethod
     def check_expired_reservations():
         """
-        Check and update expired reservations
+        Check and update expired reservations; returns how many expired
         """
         
         # Get all active reservations that have expired
         expired_reservations = Reservation.objects.filter(
             status='active',
             end_time__lt=timezone.now()
-        )
+        ).select_related('parking_lot')
+        count = 0
         for reservation in expired_reservations:
             reservation.status = 'expired'
             reservation.save()
             send_notification_to_user(
-                reservation.user.id,
+                reservation.user_id,
                 "Your reservation has expired",
                 {
                     "reservation_id": reservation.id,
                     "parking_lot": reservation.parking_lot.name,
-                }
+                },
+                notification_type=Notification.NotificationType.RESERVATION_EXPIRED
             )
+            count += 1
+        return count
 
     @staticmethod
     def check_upcoming_reservations():
         """
-        Check and notify about upcoming reservations
+        Check and notify about upcoming reservations; returns how many were reminded
         """
         # Get all active reservations starting in the next 30 minutes
-        upcoming_time = timezone.now() + timedelta(minutes=30)
+        now = timezone.now()
+        upcoming_time = now + timedelta(minutes=30)
         upcoming_reservations = Reservation.objects.filter(
             status='active',
             start_time__lte=upcoming_time,
-            start_time__gt=timezone.now()
-        )
+            start_time__gt=now
+        ).select_related('parking_lot')
+        # The check runs periodically, so skip reservations already reminded
+        # within the window
+        reminded = set(Notification.objects.filter(
+            type=Notification.NotificationType.UPCOMING_RESERVATION,
+            created_at__gte=now - timedelta(minutes=30),
+            user_id__in=upcoming_reservations.values('user_id')
+        ).values_list('data__reservation_id', flat=True))
+        count = 0
         for reservation in upcoming_reservations:
+            if reservation.id in reminded:
+                continue
             send_notification_to_user(
-                reservation.user.id,
+                reservation.user_id,
                 "Your reservation starts in 30 minutes",
                 {
                     "reservation_id": reservation.id,
                     "parking_lot": reservation.parking_lot.name,
                     "start_time": reservation.start_time.isoformat(),
-                }
+                },
+                notification_type=Notification.NotificationType.UPCOMING_RESERVATION
             )
+            count += 1
+        return count
 
     @staticmethod
     def get_user_active_reservations(user):
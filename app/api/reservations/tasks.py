@@ -0,0 +1,10 @@
+"""Periodic reservation jobs, run by the task supervisor (see PERIODIC_JOBS)."""
+from .services import ReservationService
+
+def expire_reservations():
+    """Expire active reservations whose end time has passed."""
+    return ReservationService.check_expired_reservations()
+
+def remind_upcoming_reservations():
+    """Remind users of reservations starting within 30 minutes."""
+    return ReservationService.check_upcoming_reservations()
@@ -215,24 +215,11 @@ class ReservationViewSet(viewsets.ModelViewSet):
     def cancel(self, request, pk=None):
         """Cancel a reservation using the service."""
         try:
-            reservation = self.get_object()
-            
-            # Get the user who should receive the notification (the reservation owner)
-            notification_user = reservation.user
+            self.get_object()
             
-            # Cancel the reservation
-            reservation = ReservationService.cancel_reservation(pk, request.user)
-            
-            # Send notification to the reservation owner
-            send_notification_to_user(
-                notification_user.id,
-                "Your reservation has been cancelled",
-                {
-                    "reservation_id": reservation.id,
-                    "parking_lot": reservation.parking_lot.name,
-                    "cancelled_by": request.user.get_full_name() if request.user.is_admin else "You"
-                }
-            )
+            # Cancel the reservation; the service records and pushes the
+            # cancellation notification to the owner
+            ReservationService.cancel_reservation(pk, request.user)
             
             return Response(
                 {'detail': 'Reservation cancelled successfully.'},
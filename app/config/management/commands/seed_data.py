@@ -1,18 +1,26 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
-from app.api.parking_lots.models import ParkingLot, ParkingSpace
-from app.api.reservations.models import Reservation
-from app.api.reports.models import DailyReport, MonthlyReport, ParkingLotReport
-from django.utils import timezone
-from datetime import timedelta, datetime
-import random
-from decimal import Decimal
+from app.api.reports.models import DailyReport, ParkingLotReport, refresh_rollup_periods
+from app.utils.seeding import DatasetGenerator
+from datetime import timedelta
 from django.db import connection
 
 User = get_user_model()
 
 class Command(BaseCommand):
-    help = 'Seeds the database with sample data'
+    help = 'Seeds the database with deterministic sample data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5)
+        parser.add_argument('--lots', type=int, default=5)
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument(
+            '--reservations',
+            type=int,
+            help='Number of reservations (default: 2 per user per day)'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=10000)
 
     def reset_database(self):
         """Reset the database by dropping all data and resetting sequences."""
@@ -75,186 +83,34 @@ class Command(BaseCommand):
         )
         self.stdout.write(self.style.SUCCESS('Created admin user'))
 
-        # Create regular users with more realistic data
-        users = []
-        user_data = [
-            {'first_name': 'John', 'last_name': 'Doe', 'email': 'john.doe@example.com'},
-            {'first_name': 'Jane', 'last_name': 'Smith', 'email': 'jane.smith@example.com'},
-            {'first_name': 'Michael', 'last_name': 'Johnson', 'email': 'michael.j@example.com'},
-            {'first_name': 'Sarah', 'last_name': 'Williams', 'email': 'sarah.w@example.com'},
-            {'first_name': 'David', 'last_name': 'Brown', 'email': 'david.b@example.com'},
-        ]
-
-        for user_info in user_data:
-            user = User.objects.create_user(
-                email=user_info['email'],
-                username=user_info['email'].split('@')[0],
-                password='user123',
-                first_name=user_info['first_name'],
-                last_name=user_info['last_name'],
-                role='user',
-                is_staff=False,
-                is_superuser=False
-            )
-            users.append(user)
-        self.stdout.write(self.style.SUCCESS('Created regular users'))
-
-        # Create parking lots with more realistic data
-        parking_lots = []
-        locations = [
-            {
-                'name': 'SM City Davao',
-                'lat': 7.0731,
-                'lng': 125.6128,
-                'address': 'Quimpo Blvd, Davao City',
-                'total_spaces': 500,
-                'hourly_rate': 50.00
-            },
-            {
-                'name': 'Abreeza Mall',
-                'lat': 7.0682,
-                'lng': 125.6087,
-                'address': 'J.P. Laurel Ave, Davao City',
-                'total_spaces': 300,
-                'hourly_rate': 40.00
-            },
-            {
-                'name': 'Gaisano Mall',
-                'lat': 7.0725,
-                'lng': 125.6135,
-                'address': 'J.P. Laurel Ave, Davao City',
-                'total_spaces': 400,
-                'hourly_rate': 35.00
-            },
-            {
-                'name': 'NCCC Mall',
-                'lat': 7.0715,
-                'lng': 125.6145,
-                'address': 'J.P. Laurel Ave, Davao City',
-                'total_spaces': 350,
-                'hourly_rate': 30.00
-            },
-            {
-                'name': 'Victoria Plaza',
-                'lat': 7.0705,
-                'lng': 125.6155,
-                'address': 'J.P. Laurel Ave, Davao City',
-                'total_spaces': 250,
-                'hourly_rate': 25.00
-            },
-        ]
-
-        for loc in locations:
-            # Calculate available spaces (random between 20% and 80% of total)
-            available_spaces = random.randint(
-                int(loc['total_spaces'] * 0.2),
-                int(loc['total_spaces'] * 0.8)
-            )
-            
-            lot = ParkingLot.objects.create(
-                name=loc['name'],
-                latitude=Decimal(str(loc['lat'])),
-                longitude=Decimal(str(loc['lng'])),
-                address=loc['address'],
-                total_spaces=loc['total_spaces'],
-                available_spaces=available_spaces,
-                status=ParkingLot.Status.ACTIVE,
-                hourly_rate=Decimal(str(loc['hourly_rate']))
-            )
-            parking_lots.append(lot)
-        self.stdout.write(self.style.SUCCESS('Created parking lots'))
-
-        # Create parking spaces for each lot
-        for lot in parking_lots:
-            # Get a short prefix from the lot name (first 3 letters)
-            prefix = lot.name[:3].upper()
-            
-            # Calculate how many spaces should be available
-            available_count = lot.available_spaces
-            total_count = lot.total_spaces
-            
-            for i in range(total_count):
-                # Calculate if space should be available
-                should_be_available = i < available_count
-                
-                ParkingSpace.objects.create(
-                    parking_lot=lot,
-                    space_number=f"{prefix}{i+1:03d}",  # Format: "SMC001", "ABR001", etc.
-                    status=ParkingSpace.Status.AVAILABLE if should_be_available else ParkingSpace.Status.OCCUPIED
-                )
-        self.stdout.write(self.style.SUCCESS('Created parking spaces'))
-
-        # Create reservations with more realistic data
-        total_reservations = 0
-        vehicle_plates = [
-            'ABC123', 'XYZ789', 'DEF456', 'GHI789', 'JKL012',
-            'MNO345', 'PQR678', 'STU901', 'VWX234', 'YZA567'
-        ]
-        
-        # Generate reservations for the last 30 days
-        for day in range(30):
-            current_date = timezone.now().date() - timedelta(days=day)
-            
-            for user in users:
-                reservations_per_user = random.randint(1, 3)  # Random number of reservations per user
-                while reservations_per_user > 0:
-                    lot = random.choice(parking_lots)
-                    # Get an available parking space from the lot
-                    available_spaces = ParkingSpace.objects.filter(
-                        parking_lot=lot,
-                        status=ParkingSpace.Status.AVAILABLE
-                    )
-                    
-                    if not available_spaces.exists():
-                        self.stdout.write(self.style.WARNING(f'No available spaces in {lot.name}, skipping...'))
-                        break
-                    
-                    space = random.choice(list(available_spaces))
-                    
-                    # Generate realistic reservation times
-                    start_time = timezone.make_aware(datetime.combine(
-                        current_date,
-                        datetime.strptime(f"{random.randint(6, 20)}:{random.choice(['00', '15', '30', '45'])}", "%H:%M").time()
-                    ))
-                    duration = random.randint(1, 8)  # Random duration between 1 and 8 hours
-                    end_time = start_time + timedelta(hours=duration)
-                    
-                    try:
-                        Reservation.objects.create(
-                            parking_lot=lot,
-                            parking_space=space,
-                            user=user,
-                            vehicle_plate=random.choice(vehicle_plates),
-                            start_time=start_time,
-                            end_time=end_time,
-                            status='completed',  # Set as completed for historical data
-                            notes=f"Reservation for {user.get_full_name()}"
-                        )
-                        reservations_per_user -= 1
-                        total_reservations += 1
-                    except Exception as e:
-                        self.stdout.write(self.style.ERROR(f'Error creating reservation: {str(e)}'))
-                        break
-
-        self.stdout.write(self.style.SUCCESS(f'Created {total_reservations} reservations'))
+        # Create users, lots, spaces and reservations in bulk
+        generator = DatasetGenerator(
+            users=options['users'],
+            lots=options['lots'],
+            days=options['days'],
+            reservations=options['reservations'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write
+        )
+        summary = generator.generate()
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {summary['users']} users, {len(summary['lots'])} parking lots, "
+            f"{summary['spaces']} parking spaces and {summary['reservations']} reservations"
+        ))
 
-        # Generate reports for the last 30 days
+        # Generate reports for every seeded day
         self.stdout.write('Generating reports...')
         
-        # Generate daily reports
-        for day in range(30):
-            current_date = timezone.now().date() - timedelta(days=day)
-            DailyReport.generate_report(current_date)
+        days = [summary['first_day'] + timedelta(days=day) for day in range(options['days'])]
+        for current_date in days:
+            DailyReport.generate_report(current_date, rollup=False)
             
-            # Generate parking lot reports for each lot
-            for lot in parking_lots:
-                ParkingLotReport.generate_report(lot, current_date)
+            # Generate every parking lot's report in one batch
+            ParkingLotReport.generate_reports(current_date)
         
-        # Generate monthly reports for the last 3 months
-        current_date = timezone.now().date()
-        for month_offset in range(3):
-            target_date = current_date - timedelta(days=30 * month_offset)
-            MonthlyReport.generate_report(target_date.year, target_date.month)
+        # Roll each week, month and year up once
+        refresh_rollup_periods(days)
         
         self.stdout.write(self.style.SUCCESS('Successfully generated reports'))
-        self.stdout.write(self.style.SUCCESS('Successfully seeded data')) 
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS('Successfully seeded data')) 
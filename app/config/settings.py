@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 from datetime import timedelta
+from urllib.parse import urlsplit
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -101,6 +102,20 @@ DATABASES = {
     }
 }
 
+# Optional read replica; report GETs are pure reads and can be served from it
+if os.environ.get('POSTGRES_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ.get('POSTGRES_REPLICA_HOST'),
+        'PORT': os.environ.get('POSTGRES_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+REPORTS_READ_DATABASE = os.environ.get(
+    'REPORTS_READ_DATABASE',
+    'replica' if 'replica' in DATABASES else 'default'
+)
+
 
 
 # Password validation
@@ -190,8 +205,83 @@ SIMPLE_JWT = {
     'JTI_CLAIM': 'jti',
 }
 
+# Admin report summary cache (seconds): served fresh for the TTL, then served
+# stale while a single background refresh runs, until the stale TTL expires
+REPORT_SUMMARY_CACHE_TTL = int(os.environ.get('REPORT_SUMMARY_CACHE_TTL', 10))
+REPORT_SUMMARY_CACHE_STALE_TTL = int(os.environ.get('REPORT_SUMMARY_CACHE_STALE_TTL', 300))
+
+# Hour-of-week heatmaps are cached per window and metric the same way
+REPORT_HEATMAP_CACHE_TTL = int(os.environ.get('REPORT_HEATMAP_CACHE_TTL', 300))
+REPORT_HEATMAP_CACHE_STALE_TTL = int(os.environ.get('REPORT_HEATMAP_CACHE_STALE_TTL', 3600))
+
+# A running report job renews its lease every third of the timeout (seconds);
+# a job whose worker stopped renewing is claimed again, up to the max attempts
+REPORT_JOB_LEASE_TIMEOUT = int(os.environ.get('REPORT_JOB_LEASE_TIMEOUT', 300))
+REPORT_JOB_MAX_ATTEMPTS = int(os.environ.get('REPORT_JOB_MAX_ATTEMPTS', 3))
+
 # WebSocket token settings
 WS_TOKEN_LIFETIME = timedelta(minutes=30)  # WebSocket tokens expire after 30 minutes
+# Seconds an authenticated WebSocket user is cached per token; 0 reads the
+# user from the database on every connect
+WS_AUTH_CACHE_TTL = int(os.environ.get('WS_AUTH_CACHE_TTL', 60))
+# Lot availability groups a single socket may join
+WS_MAX_LOT_SUBSCRIPTIONS = int(os.environ.get('WS_MAX_LOT_SUBSCRIPTIONS', 200))
+# Outbound frames buffered per socket, and what to do when a slow client fills
+# its queue: 'drop_oldest', 'coalesce' (latest availability per lot) or 'disconnect'
+WS_OUTBOUND_QUEUE_SIZE = int(os.environ.get('WS_OUTBOUND_QUEUE_SIZE', 32))
+WS_OUTBOUND_FULL_POLICY = os.environ.get('WS_OUTBOUND_FULL_POLICY', 'coalesce')
+# Sockets are pinged every interval and closed after the idle timeout without
+# any client message (seconds)
+WS_HEARTBEAT_INTERVAL = float(os.environ.get('WS_HEARTBEAT_INTERVAL', 30))
+WS_IDLE_TIMEOUT = float(os.environ.get('WS_IDLE_TIMEOUT', 90))
+# Availability changes are merged per lot and sent at most once per window (seconds);
+# 0 sends every change immediately
+AVAILABILITY_COALESCE_WINDOW = float(os.environ.get('AVAILABILITY_COALESCE_WINDOW', 0.25))
+# Notifications are recorded in bulk inserts of at most this many rows
+NOTIFICATION_BUFFER_SIZE = int(os.environ.get('NOTIFICATION_BUFFER_SIZE', 1000))
+# Notifications replayed to a reconnecting socket per resume
+NOTIFICATION_REPLAY_LIMIT = int(os.environ.get('NOTIFICATION_REPLAY_LIMIT', 100))
+# Ids are allocated at insert but become visible at commit, so a replay also
+# re-sends the notifications within this many ids below last_id
+NOTIFICATION_REPLAY_OVERLAP = int(os.environ.get('NOTIFICATION_REPLAY_OVERLAP', 200))
+# Recorded notifications are pushed from a background thread: events sent per
+# batch, queued events kept before new ones are dropped, and retries of a failed
+# send after a backoff (seconds) doubling per attempt up to the maximum
+NOTIFICATION_DISPATCH_BATCH_SIZE = int(os.environ.get('NOTIFICATION_DISPATCH_BATCH_SIZE', 100))
+NOTIFICATION_DISPATCH_MAX_PENDING = int(os.environ.get('NOTIFICATION_DISPATCH_MAX_PENDING', 10000))
+NOTIFICATION_DISPATCH_RETRIES = int(os.environ.get('NOTIFICATION_DISPATCH_RETRIES', 5))
+NOTIFICATION_DISPATCH_BACKOFF = float(os.environ.get('NOTIFICATION_DISPATCH_BACKOFF', 0.5))
+NOTIFICATION_DISPATCH_MAX_BACKOFF = float(os.environ.get('NOTIFICATION_DISPATCH_MAX_BACKOFF', 30))
+# Periodic jobs of the task supervisor: dotted path of the job function, seconds
+# between runs and at most how many seconds of random jitter each wait adds
+PERIODIC_JOBS = {
+    'expire_reservations': {
+        'task': 'app.api.reservations.tasks.expire_reservations',
+        'interval': float(os.environ.get('EXPIRE_RESERVATIONS_INTERVAL', 60)),
+        'jitter': 5,
+    },
+    'remind_upcoming_reservations': {
+        'task': 'app.api.reservations.tasks.remind_upcoming_reservations',
+        'interval': float(os.environ.get('REMIND_UPCOMING_RESERVATIONS_INTERVAL', 60)),
+        'jitter': 5,
+    },
+    'roll_up_reports': {
+        'task': 'app.api.reports.tasks.roll_up_reports',
+        'interval': float(os.environ.get('ROLL_UP_REPORTS_INTERVAL', 60)),
+        'jitter': 5,
+    },
+    'refresh_reports': {
+        'task': 'app.api.reports.tasks.refresh_reports',
+        'interval': float(os.environ.get('REFRESH_REPORTS_INTERVAL', 900)),
+        'jitter': 60,
+    },
+}
+# Start the supervisor from the ASGI lifespan; set to 0 to run it only through
+# manage.py run_supervisor
+SUPERVISOR_IN_ASGI = os.environ.get('SUPERVISOR_IN_ASGI', '1') == '1'
+# Seconds the leader lease lasts without renewal, and shutdown waits for running jobs
+SUPERVISOR_LEASE_TTL = int(os.environ.get('SUPERVISOR_LEASE_TTL', 30))
+SUPERVISOR_SHUTDOWN_TIMEOUT = float(os.environ.get('SUPERVISOR_SHUTDOWN_TIMEOUT', 10))
 
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
@@ -220,11 +310,65 @@ SWAGGER_SETTINGS = {
 
 # Channels configuration
 ASGI_APPLICATION = 'app.config.asgi.application'
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer'
+
+# Replicas only see each other's group sends through a shared broker. Without
+# REDIS_HOST (local runs, tests) the in-process layer is used instead.
+REDIS_HOST = os.environ.get('REDIS_HOST')
+REDIS_PORT = os.environ.get('REDIS_PORT', '6379')
+REDIS_URL = os.environ.get(
+    'REDIS_URL',
+    f'redis://{REDIS_HOST}:{REDIS_PORT}' if REDIS_HOST else ''
+)
+
+def redis_database_url(db):
+    """REDIS_URL pointing at database db, replacing any database the URL names"""
+    return urlsplit(REDIS_URL)._replace(path=f'/{db}').geturl()
+
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                # Extra keys are passed to redis.asyncio.ConnectionPool, one pool per event loop
+                'hosts': [{
+                    'address': redis_database_url(os.environ.get('CHANNEL_LAYER_REDIS_DB', '0')),
+                    'max_connections': int(os.environ.get('CHANNEL_LAYER_MAX_CONNECTIONS', 100)),
+                    'socket_connect_timeout': 5,
+                    'socket_keepalive': True,
+                    'health_check_interval': 30,
+                    'retry_on_timeout': True,
+                }],
+                'prefix': 'asgi',
+                # Messages queued per channel before new ones are dropped
+                'capacity': int(os.environ.get('CHANNEL_LAYER_CAPACITY', 1500)),
+                # Seconds an undelivered message lives in Redis
+                'expiry': int(os.environ.get('CHANNEL_LAYER_EXPIRY', 30)),
+                # Seconds a group membership lives without being refreshed
+                'group_expiry': int(os.environ.get('CHANNEL_LAYER_GROUP_EXPIRY', 86400)),
+            },
+        }
+    }
+    
+    # Report and summary caches must be shared across replicas as well
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': redis_database_url(os.environ.get('CACHE_REDIS_DB', '1')),
+            'KEY_PREFIX': 'parkwise',
+            'OPTIONS': {
+                'max_connections': int(os.environ.get('CACHE_MAX_CONNECTIONS', 50)),
+                'socket_connect_timeout': 5,
+                'socket_timeout': 5,
+                'retry_on_timeout': True,
+            },
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer'
+        }
     }
-}
 
 # Logging configuration
 LOGGING = {
@@ -53,6 +53,7 @@ urlpatterns = [
         path('', include('app.api.parking_lots.urls')),
         path('', include('app.api.reservations.urls')),
         path('', include('app.api.reports.urls')),
+        path('', include('app.api.realtime.urls')),
     ])),
 ]
 
@@ -0,0 +1,290 @@
+import asyncio
+import time
+from unittest.mock import patch
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from app.api.accounts.models import User
+from app.api.notification.dispatcher import NotificationDispatcher
+from app.api.notification.models import Notification
+from app.api.notification.pipeline import NotificationPipeline
+from app.api.realtime.consumers import NotificationConsumer
+from app.api.realtime.utils import send_notification_to_all, send_notification_to_user
+
+class NotificationPipelineTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='driver@example.com',
+            username='driver',
+            password='driverpass123'
+        )
+        self.other = User.objects.create_user(
+            email='other@example.com',
+            username='other',
+            password='otherpass123'
+        )
+        self.channel_layer = get_channel_layer()
+        self.channel = async_to_sync(self.channel_layer.new_channel)()
+        async_to_sync(self.channel_layer.group_add)(f'user_{self.user.id}_notifications', self.channel)
+        async_to_sync(self.channel_layer.group_add)('notifications', self.channel)
+    
+    def drain_events(self):
+        events = []
+        while True:
+            try:
+                message = async_to_sync(asyncio.wait_for)(
+                    self.channel_layer.receive(self.channel), timeout=0.05
+                )
+            except asyncio.TimeoutError:
+                return events
+            events.append(message['content'])
+    
+    def list_notifications(self, user, **params):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        response = client.get('/api/user/notifications/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+    
+    def test_notification_is_recorded_then_pushed_with_its_id(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            notification = send_notification_to_user(
+                self.user.id,
+                'Your reservation has expired',
+                {'reservation_id': 7},
+                notification_type=Notification.NotificationType.RESERVATION_EXPIRED
+            )
+        
+        # Nothing is pushed before the row is committed
+        self.assertEqual(self.drain_events(), [])
+        for callback in callbacks:
+            callback()
+        events = self.drain_events()
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]['id'], notification.id)
+        self.assertEqual(events[0]['type'], 'reservation_expired')
+        self.assertEqual(events[0]['reservation_id'], 7)
+        
+        listed = self.list_notifications(self.user)
+        self.assertEqual([item['id'] for item in listed], [notification.id])
+        self.assertEqual(listed[0]['data'], {'reservation_id': 7})
+        self.assertEqual(self.list_notifications(self.other), [])
+    
+    def test_data_cannot_shadow_message_fields(self):
+        with self.assertRaisesMessage(ValueError, 'reserved keys: type'):
+            send_notification_to_user(
+                self.user.id,
+                'Your reservation has been updated',
+                {'reservation_id': 7, 'type': 'rescheduled'},
+                notification_type=Notification.NotificationType.CUSTOM
+            )
+        self.assertFalse(Notification.objects.exists())
+        
+        # Without an explicit type, the data's type becomes the notification's
+        with self.captureOnCommitCallbacks(execute=True):
+            notification = send_notification_to_user(
+                self.user.id,
+                'Report job 3 finished',
+                {'type': 'report_job', 'job_id': 3}
+            )
+        self.assertEqual(notification.data, {'job_id': 3})
+        self.assertEqual(self.drain_events()[0]['type'], 'report_job')
+    
+    def test_buffered_inserts(self):
+        with self.assertNumQueries(3):
+            with NotificationPipeline(buffer_size=3, push=False) as pipeline:
+                pipeline.notify_users([self.user.id, self.other.id] * 4, 'Lot closing early')
+        self.assertEqual(pipeline.recorded, 8)
+        self.assertEqual(Notification.objects.filter(user=self.user).count(), 4)
+    
+    def test_broadcast_is_one_row_with_per_user_state(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            broadcast = send_notification_to_all({
+                'type': 'new_parking_lot',
+                'message': "New parking lot 'Abreeza' has been added",
+                'data': {'parking_lot_id': 3}
+            })
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertIsNone(broadcast.user_id)
+        events = self.drain_events()
+        self.assertEqual(events[0]['id'], broadcast.id)
+        self.assertEqual(events[0]['type'], 'new_parking_lot')
+        
+        broadcast.mark_as_read(self.user)
+        self.assertEqual(self.list_notifications(self.user)[0]['status'], 'read')
+        self.assertEqual(self.list_notifications(self.other)[0]['status'], 'unread')
+        self.assertEqual(len(self.list_notifications(self.other, status='unread')), 1)
+        self.assertEqual(len(self.list_notifications(self.user, status='unread')), 0)
+        
+        # Deleting a broadcast only hides it from that user
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        self.assertEqual(client.delete(f'/api/user/notifications/{broadcast.id}/').status_code, 204)
+        self.assertEqual(self.list_notifications(self.user), [])
+        self.assertEqual(len(self.list_notifications(self.other)), 1)
+        self.assertTrue(Notification.objects.filter(pk=broadcast.pk).exists())
+    
+    def test_broadcasts_before_joining_are_not_listed(self):
+        send_notification_to_all('Welcome to Parkwise')
+        newcomer = User.objects.create_user(
+            email='newcomer@example.com',
+            username='newcomer',
+            password='newcomerpass123'
+        )
+        self.assertEqual(self.list_notifications(newcomer), [])
+        self.assertEqual(len(self.list_notifications(self.user)), 1)
+
+@override_settings(
+    NOTIFICATION_REPLAY_LIMIT=3,
+    NOTIFICATION_REPLAY_OVERLAP=0,
+    WS_OUTBOUND_QUEUE_SIZE=2,
+    WS_OUTBOUND_FULL_POLICY='drop_oldest'
+)
+class NotificationReplayTestCase(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='driver@example.com',
+            username='driver',
+            password='driverpass123'
+        )
+        self.other = User.objects.create_user(
+            email='other@example.com',
+            username='other',
+            password='otherpass123'
+        )
+        self.seen = send_notification_to_user(self.user.id, 'Seen before the drop')
+        send_notification_to_user(self.other.id, 'Not for this user')
+        self.missed = [
+            send_notification_to_user(self.user.id, 'Missed 1').id,
+            send_notification_to_all('Missed broadcast').id,
+            send_notification_to_user(self.user.id, 'Missed 2').id,
+            send_notification_to_user(self.user.id, 'Missed 3').id,
+        ]
+    
+    async def connect(self, path='/ws/notifications/'):
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), path)
+        communicator.scope['user'] = self.user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+    
+    async def receive_replay(self, communicator):
+        frames = []
+        while True:
+            frame = await communicator.receive_json_from(timeout=1)
+            if frame['type'] == 'replay_complete':
+                return frames, frame
+            frames.append(frame)
+    
+    async def test_reconnect_replays_missed_notifications_in_pages(self):
+        communicator = await self.connect(f'/ws/notifications/?last_id={self.seen.id}')
+        
+        # Capped at the limit and streamed past the two-frame outbound queue
+        frames, complete = await self.receive_replay(communicator)
+        self.assertEqual([frame['id'] for frame in frames], self.missed[:3])
+        self.assertEqual(frames[1]['message'], 'Missed broadcast')
+        self.assertEqual(complete['last_id'], self.missed[2])
+        self.assertEqual(complete['count'], 3)
+        self.assertTrue(complete['has_more'])
+        
+        await communicator.send_json_to({'action': 'resume', 'last_id': complete['last_id']})
+        frames, complete = await self.receive_replay(communicator)
+        self.assertEqual([frame['id'] for frame in frames], self.missed[3:])
+        self.assertFalse(complete['has_more'])
+        await communicator.disconnect()
+    
+    @override_settings(NOTIFICATION_REPLAY_LIMIT=10, NOTIFICATION_REPLAY_OVERLAP=3)
+    async def test_replay_resends_ids_below_last_id_that_committed_late(self):
+        # The client saw the last missed notification while the ones before it
+        # were still uncommitted; those within three ids below it are sent again
+        communicator = await self.connect(f'/ws/notifications/?last_id={self.missed[3]}')
+        frames, complete = await self.receive_replay(communicator)
+        self.assertEqual([frame['id'] for frame in frames], [self.missed[1], self.missed[2]])
+        self.assertEqual(complete['last_id'], self.missed[3])
+        self.assertEqual(complete['count'], 2)
+        self.assertFalse(complete['has_more'])
+        await communicator.disconnect()
+    
+    async def test_resume_rejects_invalid_ids(self):
+        communicator = await self.connect()
+        await communicator.send_json_to({'action': 'resume', 'last_id': 'latest'})
+        frame = await communicator.receive_json_from(timeout=1)
+        self.assertEqual(frame['type'], 'error')
+        self.assertTrue(await communicator.receive_nothing(timeout=0.1))
+        await communicator.disconnect()
+
+class RecordingLayer:
+    """Stands in for a broker-backed layer: fails the first sends or is slow"""
+    def __init__(self, failures=0, delay=0):
+        self.failures = failures
+        self.delay = delay
+        self.sent = []
+    
+    async def group_send(self, group, message):
+        await asyncio.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('broker unavailable')
+        self.sent.append((group, message['content']['id']))
+
+@override_settings(
+    NOTIFICATION_DISPATCH_BACKOFF=0.01,
+    NOTIFICATION_DISPATCH_MAX_BACKOFF=0.05,
+    NOTIFICATION_DISPATCH_BATCH_SIZE=10
+)
+class NotificationDispatcherTestCase(TestCase):
+    def setUp(self):
+        self.dispatcher = NotificationDispatcher()
+    
+    def tearDown(self):
+        self.dispatcher.close()
+    
+    def dispatch(self, layer, events):
+        with patch('app.api.notification.dispatcher.get_channel_layer', return_value=layer):
+            started = time.monotonic()
+            self.dispatcher.submit(events)
+            submitted = time.monotonic() - started
+            self.dispatcher.close()
+        return submitted
+    
+    def events(self, group, ids):
+        return [(group, {'type': 'send_notification', 'content': {'id': id}}) for id in ids]
+    
+    def test_submit_does_not_wait_for_the_layer(self):
+        layer = RecordingLayer(delay=0.2)
+        submitted = self.dispatch(layer, self.events('user_1_notifications', [1, 2]))
+        self.assertLess(submitted, 0.1)
+        self.assertEqual(layer.sent, [('user_1_notifications', 1), ('user_1_notifications', 2)])
+    
+    def test_failed_sends_are_retried_in_group_order(self):
+        layer = RecordingLayer(failures=2)
+        events = self.events('user_1_notifications', range(1, 26)) + self.events('user_2_notifications', [100])
+        self.dispatch(layer, events)
+        
+        self.assertEqual(
+            [id for group, id in layer.sent if group == 'user_1_notifications'],
+            list(range(1, 26))
+        )
+        self.assertIn(('user_2_notifications', 100), layer.sent)
+        metrics = self.dispatcher.metrics()
+        self.assertEqual(metrics['sent'], 26)
+        self.assertEqual(metrics['retried'], 2)
+        self.assertEqual(metrics['failed'], 0)
+    
+    @override_settings(NOTIFICATION_DISPATCH_RETRIES=2)
+    def test_gives_up_after_retries(self):
+        layer = RecordingLayer(failures=3)
+        self.dispatch(layer, self.events('user_1_notifications', [1, 2]))
+        self.assertEqual(layer.sent, [('user_1_notifications', 2)])
+        self.assertEqual(self.dispatcher.metrics()['failed'], 1)
+    
+    @override_settings(NOTIFICATION_DISPATCH_MAX_PENDING=3)
+    def test_full_queue_drops_events(self):
+        layer = RecordingLayer(delay=0.05)
+        self.dispatch(layer, self.events('user_1_notifications', range(1, 6)))
+        self.assertEqual(len(layer.sent), 3)
+        metrics = self.dispatcher.metrics()
+        self.assertEqual(metrics['dropped'], 2)
+        self.assertEqual(metrics['pending'], 0)
@@ -0,0 +1,414 @@
+import asyncio
+import shutil
+import time
+import unittest
+from datetime import timedelta
+from unittest import mock
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from app.api.accounts.models import User
+from app.api.parking_lots.models import ParkingLot
+from app.api.realtime.auth import CLOSE_FORBIDDEN, CLOSE_UNAUTHORIZED
+from app.api.realtime.backpressure import CLOSE_IDLE_TIMEOUT, OutboundQueue, metrics
+from app.api.realtime.coalescing import AvailabilityCoalescer
+from app.api.realtime.consumers import NotificationConsumer, TokenAuthMiddleware
+from app.api.realtime.harness import (
+    layer_config, local_broker, measure_connect_storm, measure_delivery, measure_slow_consumers
+)
+from app.api.realtime.supervisor import LEADER_KEY, TaskSupervisor
+
+class ChannelLayerHarnessTestCase(SimpleTestCase):
+    def test_layer_config_keeps_tuning_under_own_prefix(self):
+        """The harness reuses pool and capacity settings but never the live key prefix"""
+        base = {
+            'hosts': [{'address': 'redis://redis:6379/0', 'max_connections': 100}],
+            'prefix': 'asgi',
+            'capacity': 1500
+        }
+        config = layer_config('redis://127.0.0.1:7000', base)
+        self.assertEqual(config['hosts'], [{'address': 'redis://127.0.0.1:7000', 'max_connections': 100}])
+        self.assertEqual(config['capacity'], 1500)
+        self.assertNotEqual(config['prefix'], base['prefix'])
+        self.assertEqual(base['hosts'][0]['address'], 'redis://redis:6379/0')
+    
+    @unittest.skipUnless(shutil.which('redis-server'), 'redis-server is not installed')
+    def test_notifications_cross_processes(self):
+        """Group sends from this process reach subscribers in other processes"""
+        with local_broker() as url:
+            targeted = measure_delivery(url, processes=2, users_per_process=5, messages=200, timeout=20)
+            broadcast = measure_delivery(url, processes=2, messages=50, broadcast=True, timeout=20)
+        
+        self.assertEqual(targeted['delivered'], 200)
+        self.assertEqual(targeted['delivery_rate'], 1.0)
+        self.assertIsNotNone(targeted['latency_ms']['p99'])
+        self.assertEqual(broadcast['expected'], 100)
+        self.assertEqual(broadcast['delivered'], 100)
+
+@override_settings(AVAILABILITY_COALESCE_WINDOW=0)
+class LotAvailabilitySubscriptionTestCase(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='driver@example.com',
+            username='driver',
+            password='driverpass123'
+        )
+        self.lot = ParkingLot.objects.create(
+            name='Subscribed Lot',
+            address='1 Test St',
+            latitude=7.07,
+            longitude=125.61,
+            total_spaces=10,
+            available_spaces=10,
+            hourly_rate=50
+        )
+        self.other_lot = ParkingLot.objects.create(
+            name='Other Lot',
+            address='2 Test St',
+            latitude=7.07,
+            longitude=125.61,
+            total_spaces=10,
+            available_spaces=10,
+            hourly_rate=50
+        )
+    
+    async def connect(self):
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+        communicator.scope['user'] = self.user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+    
+    @database_sync_to_async
+    def take_space(self, lot):
+        lot.refresh_from_db()
+        lot.available_spaces -= 1
+        lot.save()
+    
+    def test_version_bumps_only_when_availability_changes(self):
+        """Each change to available_spaces bumps the version; other edits do not"""
+        lot = ParkingLot.objects.get(pk=self.lot.pk)
+        lot.available_spaces = 9
+        lot.save()
+        self.assertEqual(lot.availability_version, 1)
+        lot.name = 'Renamed Lot'
+        lot.save()
+        lot.available_spaces = 8
+        lot.save(update_fields=['available_spaces'])
+        self.assertEqual(ParkingLot.objects.get(pk=lot.pk).availability_version, 2)
+    
+    async def test_subscribe_snapshot_and_deltas(self):
+        """Subscribers get a snapshot, then a delta for every change to their lots only"""
+        communicator = await self.connect()
+        await communicator.send_json_to({
+            'action': 'subscribe',
+            'lot_ids': [self.lot.pk, 999999]
+        })
+        self.assertEqual(await communicator.receive_json_from(), {
+            'type': 'subscribed',
+            'lots': [{'lot_id': self.lot.pk, 'available': 10, 'version': 0}]
+        })
+        
+        await self.take_space(self.other_lot)
+        await self.take_space(self.lot)
+        await self.take_space(self.lot)
+        self.assertEqual(await communicator.receive_json_from(), {
+            'type': 'availability', 'lot_id': self.lot.pk, 'available': 9, 'version': 1
+        })
+        self.assertEqual(await communicator.receive_json_from(), {
+            'type': 'availability', 'lot_id': self.lot.pk, 'available': 8, 'version': 2
+        })
+        
+        await communicator.send_json_to({'action': 'unsubscribe', 'lot_ids': [self.lot.pk]})
+        self.assertEqual(
+            await communicator.receive_json_from(),
+            {'type': 'unsubscribed', 'lot_ids': [self.lot.pk]}
+        )
+        await self.take_space(self.lot)
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+    
+    async def test_rejects_invalid_subscriptions(self):
+        """Malformed lot ids are answered with an error instead of being joined"""
+        communicator = await self.connect()
+        await communicator.send_json_to({'action': 'subscribe', 'lot_ids': 'all'})
+        response = await communicator.receive_json_from()
+        self.assertEqual(response['type'], 'error')
+        await communicator.disconnect()
+
+class RecordingChannelLayer:
+    def __init__(self):
+        self.sent = []
+    
+    async def group_send(self, group, message):
+        self.sent.append((group, message['content']))
+
+class AvailabilityCoalescerTestCase(TransactionTestCase):
+    def test_burst_is_sent_once_per_window(self):
+        """A burst of updates to one lot is sent once, with its newest state"""
+        layer = RecordingChannelLayer()
+        coalescer = AvailabilityCoalescer(window=0.05)
+        with mock.patch('app.api.realtime.coalescing.get_channel_layer', return_value=layer):
+            for version in range(1, 51):
+                coalescer.submit(7, 100 - version, version)
+            coalescer.submit(8, 9, 3)
+            # A late commit of an older write must not overwrite the newer state
+            coalescer.submit(7, 60, 40)
+            time.sleep(0.3)
+            coalescer.submit(7, 49, 51)
+            coalescer.close()
+        
+        self.assertEqual(layer.sent, [
+            ('lot_7_availability', {'type': 'availability', 'lot_id': 7, 'available': 50, 'version': 50}),
+            ('lot_8_availability', {'type': 'availability', 'lot_id': 8, 'available': 9, 'version': 3}),
+            ('lot_7_availability', {'type': 'availability', 'lot_id': 7, 'available': 49, 'version': 51}),
+        ])
+        metrics = coalescer.metrics()
+        self.assertEqual(metrics['updates_received'], 53)
+        self.assertEqual(metrics['updates_coalesced'], 50)
+        self.assertEqual(metrics['messages_sent'], 3)
+    
+    def test_metrics_endpoint_is_admin_only(self):
+        admin = User.objects.create_user(
+            email='admin@example.com',
+            username='admin',
+            password='adminpass123',
+            role=User.Role.ADMIN,
+            is_staff=True
+        )
+        client = APIClient()
+        self.assertEqual(client.get('/api/admin/realtime/metrics/').status_code, 401)
+        client.force_authenticate(admin)
+        response = client.get('/api/admin/realtime/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('messages_sent', response.json()['availability'])
+
+class BackpressureTestCase(TransactionTestCase):
+    def test_outbound_queue_policies(self):
+        """Full queues drop their oldest frame, coalesce keyed frames or refuse"""
+        queue = OutboundQueue(2, 'drop_oldest')
+        self.assertEqual([queue.push(frame) for frame in 'abc'], ['queued', 'queued', 'dropped_oldest'])
+        self.assertEqual([queue.pop(), queue.pop()], ['b', 'c'])
+        
+        queue = OutboundQueue(2, 'coalesce')
+        queue.push('lot 1 v1', key=1)
+        queue.push('note')
+        self.assertEqual(queue.push('lot 1 v2', key=1), 'coalesced')
+        self.assertEqual(queue.push('lot 2 v1', key=2), 'dropped_oldest')
+        self.assertEqual([queue.pop(), queue.pop()], ['note', 'lot 2 v1'])
+        
+        queue = OutboundQueue(1, 'disconnect')
+        queue.push('a')
+        self.assertEqual(queue.push('b'), 'overflow')
+        self.assertEqual(len(queue), 1)
+    
+    def test_stalled_clients_hold_bounded_memory(self):
+        """A client that stops reading holds at most queue_size frames"""
+        result = measure_slow_consumers(connections=50, messages=40, queue_size=8, policy='drop_oldest')
+        self.assertEqual(result['max_queued'], 8)
+        self.assertEqual(result['actions']['dropped_oldest'], 50 * 32)
+        
+        result = measure_slow_consumers(connections=50, messages=40, queue_size=8, policy='disconnect')
+        self.assertEqual(result['actions']['disconnected_slow'], 50)
+        self.assertEqual(result['max_queued'], 0)
+    
+    @override_settings(WS_HEARTBEAT_INTERVAL=0.05, WS_IDLE_TIMEOUT=0.12)
+    async def test_idle_socket_is_pinged_then_reaped(self):
+        user = await database_sync_to_async(User.objects.create_user)(
+            email='idle@example.com',
+            username='idle',
+            password='idlepass123'
+        )
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+        communicator.scope['user'] = user
+        await communicator.connect()
+        
+        self.assertEqual((await communicator.receive_json_from(timeout=1))['type'], 'ping')
+        await communicator.send_json_to({'action': 'ping'})
+        self.assertEqual((await communicator.receive_json_from(timeout=1))['type'], 'pong')
+        
+        while True:
+            output = await communicator.receive_output(timeout=1)
+            if output['type'] == 'websocket.close':
+                break
+        self.assertEqual(output['code'], CLOSE_IDLE_TIMEOUT)
+
+class WebSocketAuthTestCase(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='socket@example.com',
+            username='socket',
+            password='socketpass123'
+        )
+    
+    def websocket_token(self, token_type='websocket'):
+        token = AccessToken.for_user(self.user)
+        token.set_exp(lifetime=timedelta(minutes=30))
+        token['token_type'] = token_type
+        return str(token)
+    
+    async def connect(self, subprotocols):
+        """Connect through the middleware; returns the close code, or None if the socket stays open"""
+        application = TokenAuthMiddleware(NotificationConsumer.as_asgi())
+        communicator = WebsocketCommunicator(application, '/ws/notifications/', subprotocols=subprotocols)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        if await communicator.receive_nothing(timeout=0.1):
+            await communicator.disconnect()
+            return None
+        output = await communicator.receive_output()
+        self.assertEqual(output['type'], 'websocket.close')
+        return output['code']
+    
+    async def test_user_is_cached_per_token_until_the_account_changes(self):
+        token = self.websocket_token()
+        before = metrics()
+        self.assertIsNone(await self.connect(['Bearer', token]))
+        self.assertIsNone(await self.connect(['Bearer', token]))
+        after = metrics()
+        self.assertEqual(after.get('auth_database_lookups', 0) - before.get('auth_database_lookups', 0), 1)
+        self.assertEqual(after.get('auth_cache_hits', 0) - before.get('auth_cache_hits', 0), 1)
+        
+        # Deactivating the account applies to the very next connect
+        self.user.status = User.Status.INACTIVE
+        await database_sync_to_async(self.user.save)()
+        self.assertEqual(await self.connect(['Bearer', token]), CLOSE_FORBIDDEN)
+    
+    async def test_rejected_handshakes_close_with_a_code(self):
+        self.assertEqual(await self.connect([]), CLOSE_UNAUTHORIZED)
+        self.assertEqual(await self.connect(['Bearer', 'not-a-token']), CLOSE_UNAUTHORIZED)
+        self.assertEqual(
+            await self.connect(['Bearer', self.websocket_token(token_type='access')]),
+            CLOSE_UNAUTHORIZED
+        )
+        
+        token = self.websocket_token()
+        await database_sync_to_async(self.user.delete)()
+        self.assertEqual(await self.connect(['Bearer', token]), CLOSE_UNAUTHORIZED)
+    
+    def test_connect_storm_shares_lookups(self):
+        """Concurrent connects with one token query the user once; a second storm hits the cache"""
+        result = measure_connect_storm([self.user], connections=100, waves=2)
+        cold, warm = result['waves']
+        self.assertEqual(cold['accepted'], 100)
+        self.assertEqual(cold['auth_database_lookups'], 1)
+        self.assertEqual(warm['accepted'], 100)
+        self.assertEqual(warm['auth_cache_hits'], 100)
+        self.assertEqual(warm['auth_database_lookups'], 0)
+
+@override_settings(SUPERVISOR_LEASE_TTL=3, SUPERVISOR_SHUTDOWN_TIMEOUT=1)
+class TaskSupervisorTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.delete(LEADER_KEY)
+        self.runs = []
+    
+    def tearDown(self):
+        cache.delete(LEADER_KEY)
+    
+    def job(self):
+        self.runs.append(time.monotonic())
+        return len(self.runs)
+    
+    def test_jobs_run_with_run_time_and_lag_metrics(self):
+        supervisor = TaskSupervisor()
+        supervisor.register('counting', self.job, interval=0.05, jitter=0.01)
+        supervisor.register('failing', 'app.test.test_realtime.failing_job', interval=0.05)
+        
+        async def run():
+            await supervisor.start()
+            await asyncio.sleep(0.3)
+            await supervisor.stop()
+        asyncio.run(run())
+        
+        metrics = supervisor.metrics()
+        self.assertFalse(metrics['started'])
+        self.assertFalse(metrics['leader'])
+        counting = metrics['jobs']['counting']
+        self.assertGreaterEqual(counting['runs'], 3)
+        self.assertEqual(counting['runs'], len(self.runs))
+        self.assertEqual(counting['last_result'], len(self.runs))
+        self.assertGreaterEqual(counting['last_lag'], 0)
+        self.assertIsNotNone(counting['avg_duration'])
+        failing = metrics['jobs']['failing']
+        self.assertEqual(failing['failures'], failing['runs'])
+        self.assertEqual(failing['last_error'], 'job failed')
+        self.assertIsNone(cache.get(LEADER_KEY))
+    
+    def test_only_the_leader_runs_jobs(self):
+        leader, follower = TaskSupervisor(), TaskSupervisor()
+        leader.register('counting', self.job, interval=0.05)
+        follower.register('counting', self.job, interval=0.05)
+        
+        async def run():
+            await leader.start()
+            await follower.start()
+            await asyncio.sleep(0.2)
+            self.assertTrue(leader.is_leader)
+            self.assertFalse(follower.is_leader)
+            # The follower takes over on its next renewal once the leader stops
+            await leader.stop()
+            await asyncio.sleep(1.1)
+            self.assertTrue(follower.is_leader)
+            await asyncio.sleep(0.2)
+            await follower.stop()
+        asyncio.run(run())
+        
+        self.assertGreater(leader.jobs['counting'].runs, 0)
+        self.assertGreater(follower.jobs['counting'].runs, 0)
+        self.assertEqual(leader.jobs['counting'].runs + follower.jobs['counting'].runs, len(self.runs))
+    
+    def test_leader_checks_the_lease_before_each_run(self):
+        supervisor = TaskSupervisor()
+        supervisor.register('counting', self.job, interval=0.05)
+        
+        async def run():
+            await supervisor.start()
+            await asyncio.sleep(0.2)
+            self.assertTrue(supervisor.is_leader)
+            # Another replica took the lease between two renewals
+            cache.set(LEADER_KEY, 'other-replica', 3)
+            # Well before the next renewal the first due run stands down
+            await asyncio.sleep(0.1)
+            self.assertFalse(supervisor.is_leader)
+            runs = len(self.runs)
+            await asyncio.sleep(0.2)
+            self.assertEqual(len(self.runs), runs)
+            await supervisor.stop()
+        asyncio.run(run())
+        
+        self.assertEqual(cache.get(LEADER_KEY), 'other-replica')
+    
+    @unittest.skipUnless(shutil.which('redis-server'), 'redis-server is not installed')
+    def test_lease_is_held_in_redis(self):
+        with local_broker() as url, override_settings(REDIS_URL=url):
+            leader, follower = TaskSupervisor(), TaskSupervisor()
+            self.assertTrue(leader._acquire_lease(3))
+            self.assertFalse(follower._acquire_lease(3))
+            # Renewal and release only act on a lease still held
+            self.assertTrue(leader._acquire_lease(3))
+            follower._release_lease()
+            self.assertFalse(follower._acquire_lease(3))
+            leader._release_lease()
+            self.assertTrue(follower._acquire_lease(3))
+            self.assertFalse(leader._acquire_lease(3))
+    
+    def test_stop_abandons_jobs_past_the_timeout(self):
+        supervisor = TaskSupervisor()
+        supervisor.register('slow', lambda: time.sleep(0.5), interval=0.01)
+        
+        async def run():
+            await supervisor.start()
+            await asyncio.sleep(0.05)
+            self.assertTrue(supervisor.jobs['slow'].running)
+            started = time.monotonic()
+            await supervisor.stop(timeout=0.1)
+            return time.monotonic() - started
+        self.assertLess(asyncio.run(run()), 0.4)
+        self.assertFalse(supervisor.started)
+
+def failing_job():
+    raise RuntimeError('job failed')
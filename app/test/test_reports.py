@@ -0,0 +1,821 @@
+import asyncio
+import csv
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time as time_module
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from decimal import Decimal
+from unittest import mock
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from app.api.accounts.models import User
+from app.api.parking_lots.models import ParkingLot, ParkingSpace
+from app.api.reservations.models import Reservation
+from app.api.reservations.tasks import expire_reservations
+from app.api.reports.models import (
+    DailyReport, MonthlyReport, ParkingLotReport, WeeklyReport, YearlyReport, ReportJob,
+    covering_periods, reservation_sketches
+)
+from app.api.reports.jobs import claim_next_job, run_job
+from app.api.reports.management.commands.backfill_reports import backfill_day
+from app.api.reports import hyperloglog
+from app.api.reports.sketches import SKETCH_GAMMA, build_sketch, merge_sketches, quantiles
+from app.api.reports.services import ReportService
+from app.api.reports.tasks import refresh_reports, roll_up_reports
+from app.utils import cache as cache_utils
+from app.utils.cache import stale_while_revalidate
+from app.utils.seeding import DatasetGenerator
+
+class ReservationFixtureMixin:
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='user@example.com',
+            username='user',
+            password='userpass123',
+            role=User.Role.USER
+        )
+        self.parking_lot = ParkingLot.objects.create(
+            name='Test Parking Lot',
+            address='123 Test St',
+            latitude=10.123,
+            longitude=123.456,
+            total_spaces=10,
+            available_spaces=10,
+            hourly_rate=Decimal('50.00')
+        )
+        self.spaces = [
+            ParkingSpace.objects.create(parking_lot=self.parking_lot, space_number=f'A{i:03d}')
+            for i in range(5)
+        ]
+        self.date = timezone.localdate() - timedelta(days=1)
+        self.admin = User.objects.create_user(
+            email='admin@example.com',
+            username='admin',
+            password='adminpass123',
+            role=User.Role.ADMIN,
+            is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def reserve(self, hour, hours, status='completed', space=0):
+        start_time = timezone.make_aware(datetime.combine(self.date, time(hour)))
+        return Reservation.objects.create(
+            parking_lot=self.parking_lot,
+            parking_space=self.spaces[space],
+            user=self.user,
+            vehicle_plate='ABC123',
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=hours),
+            status=status
+        )
+
+class ReportGenerationTestCase(ReservationFixtureMixin, TestCase):
+    def test_daily_report_aggregates(self):
+        """Daily report totals come from the reportable reservations of the day"""
+        self.reserve(9, 2, space=0)
+        self.reserve(9, 1, space=1)
+        self.reserve(14, 3, space=2)
+        self.reserve(10, 4, status='cancelled', space=3)
+        
+        report = DailyReport.generate_report(self.date)
+        self.assertEqual(report.total_reservations, 3)
+        self.assertEqual(report.total_revenue, Decimal('300.00'))
+        self.assertAlmostEqual(report.average_duration, 2.0)
+        self.assertEqual(report.peak_hour, time(9))
+
+    def test_generation_query_count_is_constant(self):
+        """The number of queries does not depend on the number of reservations"""
+        self.reserve(9, 1, space=0)
+        DailyReport.generate_report(self.date)
+        with CaptureQueriesContext(connection) as few:
+            DailyReport.generate_report(self.date)
+        
+        for space in range(1, 5):
+            self.reserve(10 + space, 1, space=space)
+        with CaptureQueriesContext(connection) as many:
+            DailyReport.generate_report(self.date)
+        self.assertEqual(len(few), len(many))
+
+    def test_monthly_and_parking_lot_reports(self):
+        """Monthly and lot reports aggregate the same reservations"""
+        self.reserve(8, 2, space=0)
+        self.reserve(8, 4, space=1)
+        
+        lot_report = ParkingLotReport.generate_report(self.parking_lot, self.date)
+        self.assertEqual(lot_report.total_reservations, 2)
+        self.assertEqual(lot_report.total_revenue, Decimal('300.00'))
+        self.assertEqual(lot_report.peak_hour, time(8))
+        
+        monthly = MonthlyReport.generate_report(self.date.year, self.date.month)
+        self.assertEqual(monthly.total_reservations, 2)
+        self.assertAlmostEqual(monthly.average_duration, 3.0)
+        self.assertEqual(monthly.peak_day, self.date)
+
+    def test_rollups_read_only_daily_rows(self):
+        """Weekly, monthly and yearly reports follow their days without touching reservations"""
+        self.reserve(8, 2, space=0)
+        self.reserve(9, 1, space=1)
+        
+        with CaptureQueriesContext(connection) as queries:
+            monthly = MonthlyReport.generate_report(self.date.year, self.date.month)
+        self.assertFalse([q for q in queries if 'reservations_reservation' in q['sql']])
+        self.assertEqual(monthly.total_reservations, 2)
+        self.assertEqual(monthly.total_revenue, Decimal('150.00'))
+        self.assertAlmostEqual(monthly.average_duration, 1.5)
+        
+        # Bookings only mark their day; the periodic job rolls the periods up
+        with CaptureQueriesContext(connection) as queries:
+            self.reserve(10, 4, space=2)
+        self.assertFalse([
+            q for q in queries
+            if any(table in q['sql'] for table in ('weeklyreport', 'monthlyreport', 'yearlyreport'))
+        ])
+        self.assertTrue(DailyReport.objects.get(date=self.date).rollups_stale)
+        self.assertEqual(roll_up_reports(), 3)
+        self.assertFalse(DailyReport.objects.get(date=self.date).rollups_stale)
+        self.assertEqual(roll_up_reports(), 0)
+        weekly = WeeklyReport.objects.get(week_start=self.date - timedelta(days=self.date.weekday()))
+        yearly = YearlyReport.objects.get(year=self.date.year)
+        monthly.refresh_from_db()
+        for report in (weekly, monthly, yearly):
+            self.assertEqual(report.total_reservations, 3)
+            self.assertEqual(report.total_revenue, Decimal('350.00'))
+            self.assertEqual(report.peak_day, self.date)
+
+    def test_occupancy_is_time_weighted(self):
+        """Occupancy integrates reserved time per hour, including overnight stays"""
+        self.reserve(8, 2, space=0)
+        self.reserve(9, 1, space=1)
+        overnight = self.reserve(0, 2, space=2)
+        Reservation.objects.filter(pk=overnight.pk).update(
+            start_time=overnight.start_time - timedelta(hours=1),
+            end_time=overnight.start_time + timedelta(hours=1)
+        )
+        
+        lot_report = ParkingLotReport.generate_report(self.parking_lot, self.date)
+        self.assertEqual(lot_report.hourly_occupancy[0], 10.0)
+        self.assertEqual(lot_report.hourly_occupancy[8], 10.0)
+        self.assertEqual(lot_report.hourly_occupancy[9], 20.0)
+        self.assertEqual(sum(lot_report.hourly_occupancy), 40.0)
+        self.assertAlmostEqual(lot_report.occupancy_rate, 4 / 240 * 100)
+        
+        report = DailyReport.generate_report(self.date)
+        self.assertEqual(report.hourly_occupancy, lot_report.hourly_occupancy)
+        self.assertAlmostEqual(report.occupancy_rate, lot_report.occupancy_rate)
+
+    def test_batch_lot_reports_match_single_lot_generation(self):
+        """All lots are generated with a fixed number of queries and match the per-lot path"""
+        self.reserve(8, 2, space=0)
+        self.reserve(9, 1, space=1)
+        self.reserve(9, 3, status='cancelled', space=2)
+        
+        with CaptureQueriesContext(connection) as few:
+            ParkingLotReport.generate_reports(self.date)
+        for number in range(3):
+            ParkingLot.objects.create(
+                name=f'Extra Lot {number}',
+                address='456 Test St',
+                latitude=10.123,
+                longitude=123.456,
+                total_spaces=5,
+                available_spaces=5,
+                hourly_rate=Decimal('20.00')
+            )
+        with CaptureQueriesContext(connection) as many:
+            reports = ParkingLotReport.generate_reports(self.date)
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(len(reports), 4)
+        self.assertEqual(ParkingLotReport.objects.filter(date=self.date).count(), 4)
+        
+        fields = (
+            'total_reservations', 'total_revenue', 'total_duration', 'average_duration',
+            'hourly_counts', 'peak_hour', 'occupancy_rate', 'hourly_occupancy',
+            'duration_sketch', 'revenue_sketch'
+        )
+        batch = ParkingLotReport.objects.get(parking_lot=self.parking_lot, date=self.date)
+        single = ParkingLotReport.generate_report(self.parking_lot, self.date)
+        self.assertEqual(
+            [getattr(batch, field) for field in fields],
+            [getattr(single, field) for field in fields]
+        )
+
+    def test_hour_of_week_heatmap(self):
+        """Heatmap rows are lots, columns the 168 hours of the week"""
+        self.reserve(9, 2, space=0)
+        self.reserve(9, 1, space=1)
+        column = self.date.weekday() * 24 + 9
+        
+        with self.assertNumQueries(2):
+            counts = ReportService.heatmap(self.date, self.date)
+        self.assertEqual(counts['lots'], [{'id': self.parking_lot.id, 'name': 'Test Parking Lot'}])
+        self.assertEqual(len(counts['data'][0]), 168)
+        self.assertEqual(counts['data'][0][column], 2)
+        self.assertEqual(sum(counts['data'][0]), 2)
+        
+        occupancy = ReportService.heatmap(self.date - timedelta(days=6), self.date, 'occupancy')
+        self.assertEqual(occupancy['data'][0][column], 20.0)
+        self.assertEqual(occupancy['data'][0][column + 1], 10.0)
+        self.assertEqual(sum(occupancy['data'][0]), 30.0)
+
+    def test_percentiles_merge_daily_sketches(self):
+        """Percentiles over a range come from the stored sketches, within the bucket error"""
+        for space, hours in enumerate([1, 2, 3, 4, 5]):
+            self.reserve(8, hours, space=space)
+        DailyReport.generate_report(self.date)
+        MonthlyReport.generate_report(self.date.year, self.date.month)
+        
+        with CaptureQueriesContext(connection) as queries:
+            data = ReportService.percentiles(self.date - timedelta(days=6), self.date, (50, 100))
+        self.assertFalse([q for q in queries if 'reservations_reservation' in q['sql']])
+        self.assertEqual(data['count'], 5)
+        self.assertAlmostEqual(data['duration']['p50'], 3, delta=3 * SKETCH_GAMMA - 3)
+        self.assertAlmostEqual(data['duration']['p100'], 5, delta=5 * SKETCH_GAMMA - 5)
+        self.assertAlmostEqual(data['revenue']['p50'], 150, delta=150 * SKETCH_GAMMA - 150)
+        
+        monthly = MonthlyReport.objects.get(year=self.date.year, month=self.date.month)
+        self.assertEqual(monthly.duration_sketch, DailyReport.objects.get(date=self.date).duration_sketch)
+        
+        lot_data = ReportService.percentiles(self.date, self.date, (90,), self.parking_lot.id)
+        self.assertEqual(lot_data['duration']['p90'], data['duration']['p100'])
+
+    def test_sketches_merge_exactly(self):
+        """Merging sketches equals sketching the combined values"""
+        values = [0, 0.5, 1.25, 7, 40, 40, 250.75, 1200]
+        merged = merge_sketches([build_sketch(values[:3]), build_sketch(values[3:])])
+        self.assertEqual(merged, build_sketch(values))
+        for value, estimate in zip(values, quantiles(merged, [(i + 1) / len(values) for i in range(len(values))])):
+            self.assertLessEqual(abs(estimate - value), max(value * (SKETCH_GAMMA - 1), 0.01))
+
+    def test_sketches_are_bucketed_in_the_database(self):
+        """The SQL bucketing matches sketching the values in Python"""
+        for space, hours in enumerate([0.25, 1, 1, 2.5, 30]):
+            self.reserve(8, hours, space=space)
+        reservations = Reservation.objects.all()
+        self.assertEqual(reservation_sketches(reservations), {
+            'duration_sketch': build_sketch([float(r.duration) for r in reservations]),
+            'revenue_sketch': build_sketch([float(r.total_cost) for r in reservations])
+        })
+
+    def test_ranges_split_into_whole_periods(self):
+        """Whole years, months and weeks are taken largest first, edges stay days"""
+        periods, days = covering_periods(date(2023, 12, 25), date(2025, 1, 5))
+        self.assertEqual(periods, [(WeeklyReport, date(2023, 12, 25)), (YearlyReport, date(2024, 1, 1))])
+        self.assertEqual(days, [date(2025, 1, day) for day in range(1, 6)])
+        
+        # The week of Jan 29 would cut into February, which is whole
+        periods, days = covering_periods(date(2024, 1, 29), date(2024, 3, 31))
+        self.assertEqual(periods, [
+            (MonthlyReport, date(2024, 2, 1)),
+            (MonthlyReport, date(2024, 3, 1))
+        ])
+        self.assertEqual(days, [date(2024, 1, 29), date(2024, 1, 30), date(2024, 1, 31)])
+
+    def test_percentiles_read_rollups_for_whole_periods(self):
+        """A whole month comes from its rollup unless it has days waiting to roll up"""
+        self.reserve(8, 2, space=0)
+        roll_up_reports()
+        first = self.date.replace(day=1)
+        last = MonthlyReport.period_bounds(first)[1] - timedelta(days=1)
+        # Tell the rollup's sketch apart from the daily one
+        MonthlyReport.objects.filter(year=first.year, month=first.month).update(
+            duration_sketch={'1': 7},
+            revenue_sketch={'1': 7}
+        )
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(ReportService.percentiles(first, last)['count'], 7)
+        self.assertFalse([q for q in queries if 'reports_dailyreport' in q['sql'] and 'duration_sketch' in q['sql']])
+        
+        DailyReport.objects.filter(date=self.date).update(rollups_stale=True)
+        self.assertEqual(ReportService.percentiles(first, last)['count'], 1)
+        
+        MonthlyReport.objects.all().delete()
+        DailyReport.objects.update(rollups_stale=False)
+        self.assertEqual(ReportService.percentiles(first, last)['count'], 1)
+
+    def test_summary_compares_with_yesterday(self):
+        """The summary reports yesterday's reservations as the change baseline"""
+        self.reserve(9, 2, space=0)
+        self.reserve(10, 1, space=1)
+        
+        summary = ReportService.summary()
+        self.assertEqual(summary['reservation_change'], -2)
+        self.assertEqual(summary['revenue_change'], Decimal('-150.00'))
+
+    def test_date_range_uses_grouped_queries(self):
+        """Date range totals and daily series come from two queries"""
+        self.reserve(9, 2, space=0)
+        self.reserve(10, 1, space=1)
+        
+        with self.assertNumQueries(2):
+            data = ReportService.date_range(self.date - timedelta(days=364), self.date)
+        self.assertEqual(data['total_reservations'], 2)
+        self.assertEqual(data['total_revenue'], Decimal('150.00'))
+        self.assertAlmostEqual(data['average_duration'], 1.5)
+        self.assertEqual(data['daily_data'], [{'date': self.date, 'reservations': 2}])
+        self.assertEqual(data['revenue_data'][0]['revenue'], Decimal('150.00'))
+
+class ReportMaterializationTestCase(ReservationFixtureMixin, TestCase):
+    def assertMatchesRecompute(self):
+        """Incremental rows equal a full recompute from the reservation table"""
+        daily = DailyReport.objects.get(date=self.date)
+        lot_report = ParkingLotReport.objects.get(parking_lot=self.parking_lot, date=self.date)
+        incremental = [
+            (
+                report.total_reservations, report.total_revenue, report.hourly_counts,
+                report.peak_hour, report.duration_sketch, report.revenue_sketch
+            )
+            for report in (daily, lot_report)
+        ]
+        
+        recomputed = [
+            DailyReport.generate_report(self.date),
+            ParkingLotReport.generate_report(self.parking_lot, self.date)
+        ]
+        self.assertEqual(incremental, [
+            (
+                report.total_reservations, report.total_revenue, report.hourly_counts,
+                report.peak_hour, report.duration_sketch, report.revenue_sketch
+            )
+            for report in recomputed
+        ])
+
+    def test_reports_follow_reservation_events(self):
+        """Creating, editing, cancelling and deleting reservations updates the rows"""
+        first = self.reserve(9, 2, status='active', space=0)
+        second = self.reserve(11, 1, status='active', space=1)
+        daily = DailyReport.objects.get(date=self.date)
+        self.assertEqual(daily.total_reservations, 2)
+        self.assertEqual(daily.total_revenue, Decimal('150.00'))
+        self.assertEqual(daily.peak_hour, time(9))
+        
+        second.start_time = second.start_time + timedelta(hours=3)
+        second.end_time = second.end_time + timedelta(hours=4)
+        second.save()
+        self.assertMatchesRecompute()
+        
+        first.status = Reservation.Status.CANCELLED
+        first.save()
+        daily.refresh_from_db()
+        self.assertEqual(daily.total_reservations, 1)
+        self.assertEqual(daily.peak_hour, time(14))
+        self.assertMatchesRecompute()
+        
+        second.delete()
+        daily.refresh_from_db()
+        self.assertEqual(daily.total_reservations, 0)
+        self.assertEqual(daily.total_revenue, Decimal('0'))
+        
+        roll_up_reports()
+        monthly = MonthlyReport.objects.get(year=self.date.year, month=self.date.month)
+        self.assertEqual(monthly.total_reservations, 0)
+
+    def test_missing_row_is_generated_in_full(self):
+        """A change to a day without a row counts the day's earlier reservations too"""
+        self.reserve(9, 2, space=0)
+        self.reserve(10, 1, space=1)
+        DailyReport.objects.all().delete()
+        ParkingLotReport.objects.all().delete()
+        
+        self.reserve(14, 3, space=2)
+        daily = DailyReport.objects.get(date=self.date)
+        lot_report = ParkingLotReport.objects.get(parking_lot=self.parking_lot, date=self.date)
+        for report in (daily, lot_report):
+            self.assertEqual(report.total_reservations, 3)
+            self.assertEqual(report.total_revenue, Decimal('300.00'))
+            self.assertGreater(report.occupancy_rate, 0)
+        self.assertMatchesRecompute()
+
+    def test_expiry_keeps_reservations_in_reports(self):
+        """Reservations the expiry job ends still count towards their day"""
+        self.reserve(9, 2, status='active', space=0)
+        self.reserve(11, 1, status='active', space=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(expire_reservations(), 2)
+        roll_up_reports()
+        
+        daily = DailyReport.objects.get(date=self.date)
+        self.assertEqual(daily.total_reservations, 2)
+        self.assertEqual(daily.total_revenue, Decimal('150.00'))
+        self.assertMatchesRecompute()
+        refresh_reports()
+        monthly = MonthlyReport.objects.get(year=self.date.year, month=self.date.month)
+        self.assertEqual(monthly.total_revenue, Decimal('150.00'))
+        self.assertEqual(DailyReport.objects.get(date=self.date).total_revenue, Decimal('150.00'))
+
+    def test_unique_visitors_and_plates(self):
+        """Distinct users and normalized plates are sketched per lot-day at write time"""
+        other = User.objects.create_user(
+            email='other@example.com',
+            username='other',
+            password='userpass123',
+            role=User.Role.USER
+        )
+        self.reserve(8, 1, space=0)
+        second = self.reserve(10, 1, space=1)
+        second.vehicle_plate = 'abc-123'
+        second.save()
+        third = self.reserve(12, 1, space=2)
+        third.user = other
+        third.vehicle_plate = 'XYZ 789'
+        third.save()
+        
+        counts = ReportService.unique_counts(self.date - timedelta(days=30), self.date)
+        self.assertEqual((counts['unique_visitors'], counts['unique_plates']), (2, 2))
+        
+        ParkingLotReport.generate_reports(self.date)
+        counts = ReportService.unique_counts(self.date, self.date, self.parking_lot.id)
+        self.assertEqual((counts['unique_visitors'], counts['unique_plates']), (2, 2))
+        
+        # Streaming the distinct values one at a time builds the same registers
+        batch = ParkingLotReport.objects.get(parking_lot=self.parking_lot, date=self.date)
+        with mock.patch.object(hyperloglog, 'HLL_CHUNK_SIZE', 1):
+            single = ParkingLotReport.generate_report(self.parking_lot, self.date)
+        for field in ('visitor_sketch', 'plate_sketch'):
+            self.assertEqual(
+                hyperloglog.load(getattr(single, field)).tolist(),
+                hyperloglog.load(getattr(batch, field)).tolist()
+            )
+        
+        registers = hyperloglog.add(hyperloglog.empty(), (f'plate-{n}' for n in range(20000)))
+        self.assertAlmostEqual(hyperloglog.estimate(registers), 20000, delta=400)
+        self.assertLess(len(hyperloglog.dump(registers)), 16 * 1024)
+
+    def test_daily_endpoint_reads_stored_row(self):
+        """The daily endpoint is a lookup once the row exists"""
+        self.reserve(9, 2, space=0)
+        url = f'/api/admin/reports/daily/?date={self.date.isoformat()}'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_reservations'], 1)
+        report_queries = [q for q in queries if 'reports_dailyreport' in q['sql']]
+        self.assertEqual(len(report_queries), 1)
+
+    def test_parking_lots_endpoint_joins_lot_names(self):
+        """Listing every lot's report for a day is one query"""
+        self.reserve(9, 2, space=0)
+        ParkingLotReport.generate_reports(self.date)
+        
+        url = f'/api/admin/reports/parking-lots/?date={self.date.isoformat()}'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        report_queries = [q for q in queries if 'reports_parkinglotreport' in q['sql']]
+        self.assertEqual(len(report_queries), 1)
+        self.assertEqual(response.json()[0]['parking_lot_name'], 'Test Parking Lot')
+        self.assertEqual(response.json()[0]['total_reservations'], 1)
+
+    def test_get_is_pure_read_and_post_regenerates(self):
+        """GETs never write; POST recomputes and stamps freshness metadata"""
+        empty_day = self.date - timedelta(days=3)
+        response = self.client.get(f'/api/admin/reports/daily/?date={empty_day.isoformat()}')
+        self.assertEqual(response.json()['total_reservations'], 0)
+        self.assertIsNone(response.json()['computed_at'])
+        self.assertFalse(DailyReport.objects.filter(date=empty_day).exists())
+        
+        response = self.client.get(f'/api/admin/reports/parking-lot/{self.parking_lot.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()['computed_at'])
+        self.assertFalse(ParkingLotReport.objects.exists())
+        
+        reservation = self.reserve(9, 2, space=0)
+        url = f'/api/admin/reports/daily/?date={self.date.isoformat()}'
+        # The day's first reservation generates its missing row in full
+        generated_at = self.client.get(url).json()['computed_at']
+        self.assertIsNotNone(generated_at)
+        response = self.client.post(url)
+        self.assertGreater(response.json()['computed_at'], generated_at)
+        self.assertEqual(response.json()['total_reservations'], 1)
+        self.assertIsNotNone(response.json()['computed_at'])
+        report = DailyReport.objects.get(date=self.date)
+        self.assertEqual(report.source_watermark, reservation.updated_at)
+
+    def test_yearly_rejects_years_out_of_range(self):
+        """Years that cannot bound a calendar year are a bad request, not a server error"""
+        for year in ('0', '-5', '9999', '10000', 'abc'):
+            for method in (self.client.get, self.client.post):
+                response = method(f'/api/admin/reports/yearly/?year={year}')
+                self.assertEqual(response.status_code, 400, year)
+        self.assertEqual(self.client.get('/api/admin/reports/yearly/?year=2024').status_code, 200)
+
+class BackfillReportsTestCase(ReservationFixtureMixin, TestCase):
+    def test_backfill_resumes_from_checkpoint(self):
+        """An interrupted run resumes from its checkpoint; a completed run removes it"""
+        self.reserve(9, 2, space=0)
+        DailyReport.objects.all().delete()
+        ParkingLotReport.objects.all().delete()
+        
+        def interrupted(date_iso):
+            if date_iso == self.date.isoformat():
+                raise KeyboardInterrupt
+            return backfill_day(date_iso)
+        
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, 'checkpoint.json')
+            options = {
+                'start_date': (self.date - timedelta(days=1)).isoformat(),
+                'end_date': self.date.isoformat(),
+                'workers': 1,
+                'checkpoint': checkpoint
+            }
+            with mock.patch(
+                'app.api.reports.management.commands.backfill_reports.backfill_day', interrupted
+            ), self.assertRaises(KeyboardInterrupt):
+                call_command('backfill_reports', stdout=StringIO(), **options)
+            with open(checkpoint) as f:
+                self.assertEqual(json.load(f)['completed'], [options['start_date']])
+            self.assertFalse(DailyReport.objects.filter(date=self.date).exists())
+            
+            out = StringIO()
+            call_command('backfill_reports', stdout=out, **options)
+            self.assertIn('Backfilling 1 of 2 days', out.getvalue())
+            self.assertEqual(DailyReport.objects.get(date=self.date).total_reservations, 1)
+            self.assertTrue(ParkingLotReport.objects.filter(date=self.date).exists())
+            self.assertFalse(os.path.exists(checkpoint))
+            
+            out = StringIO()
+            call_command('backfill_reports', stdout=out, **options)
+            self.assertIn('Backfilling 2 of 2 days', out.getvalue())
+            
+            # A checkpoint of another range is not reused
+            with open(checkpoint, 'w') as f:
+                json.dump({'range': [options['start_date']] * 2, 'completed': [options['start_date']]}, f)
+            out = StringIO()
+            call_command('backfill_reports', stdout=out, **options)
+            self.assertIn('Ignoring checkpoint', out.getvalue())
+            self.assertIn('Backfilling 2 of 2 days', out.getvalue())
+
+class CopyAsPostgres:
+    """The test database posing as PostgreSQL; COPY ... FORMAT csv is replayed as inserts"""
+    vendor = 'postgresql'
+    
+    def __init__(self):
+        self.ops = connection.ops
+        self.statements = []
+    
+    def cursor(self):
+        return self
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def copy_expert(self, sql, file):
+        self.statements.append(sql)
+        table, columns = re.match(r'COPY (\w+) \(([^)]*)\)', sql).groups()
+        columns = [column.strip() for column in columns.split(',')]
+        forced = re.search(r'FORCE_NOT_NULL \(([^)]*)\)', sql)
+        forced = {column.strip() for column in forced.group(1).split(',')} if forced else set()
+        # PostgreSQL reads an unquoted empty field as NULL unless the column is forced
+        rows = [
+            [None if value == '' and column not in forced else value for column, value in zip(columns, row)]
+            for row in csv.reader(file)
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join(["%s"] * len(columns))})',
+                rows
+            )
+
+class DatasetGeneratorTestCase(TestCase):
+    def snapshot(self):
+        return list(Reservation.objects.order_by('id').values_list(
+            'parking_lot__name', 'parking_space__space_number', 'user__username',
+            'vehicle_plate', 'start_time', 'end_time', 'status', 'total_cost'
+        ))
+    
+    def test_same_seed_produces_same_data(self):
+        """A seed, size and end date always generate identical rows, in chunks"""
+        options = {
+            'users': 20, 'lots': 7, 'days': 3, 'reservations': 250,
+            'seed': 7, 'end_date': date(2024, 3, 15), 'batch_size': 100
+        }
+        summary = DatasetGenerator(**options).generate()
+        self.assertEqual(summary['reservations'], 250)
+        self.assertEqual(ParkingLot.objects.count(), 7)
+        self.assertEqual(ParkingSpace.objects.count(), summary['spaces'])
+        first = self.snapshot()
+        self.assertEqual(len(first), 250)
+        self.assertTrue(all(
+            date(2024, 3, 13) <= timezone.localtime(row[4]).date() <= date(2024, 3, 15)
+            for row in first
+        ))
+        
+        Reservation.objects.all().delete()
+        ParkingLot.objects.all().delete()
+        User.objects.all().delete()
+        DatasetGenerator(**options).generate()
+        self.assertEqual(self.snapshot(), first)
+        
+        Reservation.objects.all().delete()
+        DatasetGenerator(**{**options, 'seed': 8, 'prefix': 'other'}).generate()
+        self.assertNotEqual(self.snapshot(), first)
+    
+    def test_copy_keeps_empty_text_columns(self):
+        """On PostgreSQL reservations are written with COPY, whose empty CSV fields would be NULL"""
+        postgres = CopyAsPostgres()
+        with mock.patch('app.utils.seeding.connection', postgres):
+            summary = DatasetGenerator(users=5, lots=2, days=2, reservations=30, batch_size=20).generate()
+        self.assertEqual(summary['reservations'], 30)
+        self.assertEqual(len(postgres.statements), 2)
+        self.assertEqual(Reservation.objects.filter(notes='').count(), 30)
+
+class ReportExportTestCase(ReservationFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.params = f'start_date={self.date.isoformat()}&end_date={self.date.isoformat()}'
+
+    def test_parking_lot_csv_export_streams_without_lazy_loads(self):
+        """Lot names are joined in the export query"""
+        self.reserve(9, 2, space=0)
+        other_lot = ParkingLot.objects.create(
+            name='Other Lot',
+            address='456 Test St',
+            latitude=10.123,
+            longitude=123.456,
+            total_spaces=5,
+            available_spaces=5,
+            hourly_rate=Decimal('20.00')
+        )
+        ParkingLotReport.objects.create(parking_lot=other_lot, date=self.date)
+        
+        response = self.client.get(f'/api/admin/reports/export/?type=parking_lot&{self.params}')
+        self.assertTrue(response.streaming)
+        with CaptureQueriesContext(connection) as queries:
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(lines[0].split(',')[0], 'Parking Lot')
+        self.assertEqual(len(lines), 3)
+
+    def test_reservation_ndjson_export(self):
+        """Raw reservations export as one JSON object per line"""
+        reservation = self.reserve(9, 2, space=0)
+        
+        response = self.client.get(
+            f'/api/admin/reports/export/?type=reservations&file_format=ndjson&{self.params}'
+        )
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['id'], reservation.id)
+        self.assertEqual(rows[0]['parking_lot_name'], 'Test Parking Lot')
+        self.assertEqual(rows[0]['total_cost'], '100.00')
+
+class ReportJobTestCase(ReservationFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        
+        self.channel_layer = get_channel_layer()
+        self.channel = async_to_sync(self.channel_layer.new_channel)()
+        async_to_sync(self.channel_layer.group_add)(
+            f'user_{self.admin.id}_notifications', self.channel
+        )
+
+    def drain_events(self):
+        events = []
+        while True:
+            try:
+                message = async_to_sync(asyncio.wait_for)(
+                    self.channel_layer.receive(self.channel), timeout=0.05
+                )
+            except asyncio.TimeoutError:
+                return events
+            events.append(message['content'])
+
+    def submit(self, **data):
+        response = self.client.post('/api/admin/reports/jobs/', {
+            'start_date': self.date.isoformat(),
+            'end_date': self.date.isoformat(),
+            **data
+        })
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], 'pending')
+        return response.json()['id']
+
+    def test_export_job_writes_file_and_notifies(self):
+        """Exports run outside the request and report progress to the admin's group"""
+        for space in range(3):
+            self.reserve(9 + space, 1, space=space)
+        
+        # Notifications are pushed once their rows are committed
+        with self.captureOnCommitCallbacks(execute=True):
+            job_id = self.submit(job_type='export', report_type='reservations', file_format='ndjson')
+        
+        with self.settings(MEDIA_ROOT=self.media_root), self.captureOnCommitCallbacks(execute=True):
+            job = run_job(claim_next_job())
+            self.assertIsNone(claim_next_job())
+            self.assertEqual(job.status, ReportJob.Status.COMPLETED)
+            
+            response = self.client.get(f'/api/admin/reports/jobs/{job_id}/download/')
+            lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 3)
+        
+        events = self.drain_events()
+        self.assertEqual(events[0]['status'], 'pending')
+        self.assertEqual(events[-1]['status'], 'completed')
+        self.assertEqual(events[-1]['type'], 'report_job')
+        self.assertEqual(events[-1]['job_id'], job_id)
+        self.assertEqual(events[-1]['progress'], 100)
+
+    def test_date_range_job_stores_result(self):
+        """Date range jobs keep the serialized report on the job row"""
+        self.reserve(9, 2, space=0)
+        job_id = self.submit(job_type='date_range')
+        run_job(claim_next_job())
+        
+        response = self.client.get(f'/api/admin/reports/jobs/{job_id}/')
+        self.assertEqual(response.json()['status'], 'completed')
+        self.assertEqual(response.json()['result']['total_reservations'], 1)
+        self.assertEqual(response.json()['result']['total_revenue'], '100.00')
+
+    def test_jobs_of_lost_workers_are_claimed_again(self):
+        """A running job whose lease expired is reclaimed, up to the attempt limit"""
+        job_id = self.submit(job_type='date_range')
+        first = claim_next_job()
+        self.assertEqual(first.attempts, 1)
+        self.assertIsNone(claim_next_job())
+        
+        # The first worker stops renewing its lease
+        expired = timezone.now() - timedelta(seconds=settings.REPORT_JOB_LEASE_TIMEOUT + 1)
+        ReportJob.objects.filter(pk=job_id).update(heartbeat_at=expired)
+        second = claim_next_job()
+        self.assertEqual((second.pk, second.attempts), (job_id, 2))
+        
+        # The lost worker's late outcome does not overwrite the new attempt
+        run_job(first)
+        self.assertEqual(ReportJob.objects.get(pk=job_id).status, ReportJob.Status.RUNNING)
+        run_job(second)
+        self.assertEqual(ReportJob.objects.get(pk=job_id).status, ReportJob.Status.COMPLETED)
+        
+        with self.settings(REPORT_JOB_MAX_ATTEMPTS=1):
+            job_id = self.submit(job_type='date_range')
+            claim_next_job()
+            ReportJob.objects.filter(pk=job_id).update(heartbeat_at=expired)
+            self.assertIsNone(claim_next_job())
+        job = ReportJob.objects.get(pk=job_id)
+        self.assertEqual(job.status, ReportJob.Status.FAILED)
+        self.assertIn('Worker lost', job.error)
+
+class SummaryCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def slow_compute(self):
+        self.calls += 1
+        time_module.sleep(0.1)
+        return self.calls
+
+    def test_concurrent_misses_compute_once(self):
+        """Concurrent cold misses trigger a single recomputation"""
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                stale_while_revalidate('test:swr', self.slow_compute, ttl=10, stale_ttl=60)
+            ))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [1] * 8)
+
+    def test_local_locks_do_not_grow_with_keys(self):
+        """Misses on many distinct keys share the fixed lock stripes"""
+        for window in range(200):
+            stale_while_revalidate(f'test:swr:{window}', lambda: window, ttl=10, stale_ttl=60)
+        self.assertEqual(len(cache_utils._local_locks), cache_utils.LOCAL_LOCK_STRIPES)
+
+    def test_stale_value_served_while_refreshing(self):
+        """A stale value is returned immediately and refreshed in the background"""
+        cache.set('test:swr', {'value': 'stale', 'computed_at': time_module.time() - 60}, 300)
+        
+        value = stale_while_revalidate('test:swr', self.slow_compute, ttl=10, stale_ttl=300)
+        self.assertEqual(value, 'stale')
+        
+        deadline = time_module.monotonic() + 5
+        while cache.get('test:swr')['value'] == 'stale' and time_module.monotonic() < deadline:
+            time_module.sleep(0.05)
+        self.assertEqual(cache.get('test:swr')['value'], 1)
+        self.assertEqual(self.calls, 1)
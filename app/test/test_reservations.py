@@ -0,0 +1,106 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from app.api.accounts.models import User
+from app.api.notification.models import Notification
+from app.api.parking_lots.models import ParkingLot, ParkingSpace
+from app.api.reservations.models import Reservation
+from app.api.reservations.services import ReservationService
+from app.api.reservations.tasks import expire_reservations
+
+class ReservationTotalsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='user@example.com',
+            username='user',
+            password='userpass123',
+            role=User.Role.USER
+        )
+        self.parking_lot = ParkingLot.objects.create(
+            name='Test Parking Lot',
+            address='123 Test St',
+            latitude=10.123,
+            longitude=123.456,
+            total_spaces=10,
+            available_spaces=10,
+            hourly_rate=Decimal('50.00')
+        )
+        self.space = ParkingSpace.objects.create(
+            parking_lot=self.parking_lot,
+            space_number='A001'
+        )
+        self.start_time = timezone.now() + timedelta(hours=1)
+
+    def create_reservation(self, hours):
+        return Reservation.objects.create(
+            parking_lot=self.parking_lot,
+            parking_space=self.space,
+            user=self.user,
+            vehicle_plate='ABC123',
+            start_time=self.start_time,
+            end_time=self.start_time + timedelta(hours=hours)
+        )
+
+    def test_totals_persisted_on_create(self):
+        """Duration and cost are stored with a snapshot of the hourly rate"""
+        reservation = self.create_reservation(hours=2.5)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.hourly_rate, Decimal('50.00'))
+        self.assertEqual(reservation.duration, Decimal('2.5'))
+        self.assertEqual(reservation.total_cost, Decimal('125.00'))
+
+    def test_totals_follow_edits_with_snapshot_rate(self):
+        """Edits recompute the cost using the rate at booking time"""
+        reservation = self.create_reservation(hours=2)
+        self.parking_lot.hourly_rate = Decimal('80.00')
+        self.parking_lot.save()
+        
+        reservation.end_time = self.start_time + timedelta(hours=3)
+        reservation.save(update_fields=['end_time'])
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.duration, Decimal('3'))
+        self.assertEqual(reservation.total_cost, Decimal('150.00'))
+
+    def test_backfill_command(self):
+        """The backfill command fills reservations missing a rate snapshot"""
+        reservation = self.create_reservation(hours=4)
+        Reservation.objects.filter(pk=reservation.pk).update(
+            hourly_rate=None,
+            duration=0,
+            total_cost=0
+        )
+        
+        out = StringIO()
+        call_command('backfill_reservation_totals', batch_size=1, stdout=out)
+        self.assertIn('Successfully backfilled 1 reservations', out.getvalue())
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.hourly_rate, Decimal('50.00'))
+        self.assertEqual(reservation.total_cost, Decimal('200.00'))
+
+    def test_upcoming_reservations_are_reminded_once(self):
+        """The periodic reminder check skips reservations it already reminded"""
+        self.start_time = timezone.now() + timedelta(minutes=20)
+        reservation = self.create_reservation(hours=1)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(ReservationService.check_upcoming_reservations(), 1)
+            self.assertEqual(ReservationService.check_upcoming_reservations(), 0)
+        reminders = Notification.objects.filter(
+            user=self.user,
+            type=Notification.NotificationType.UPCOMING_RESERVATION
+        )
+        self.assertEqual(reminders.count(), 1)
+        self.assertEqual(reminders.get().data['reservation_id'], reservation.id)
+
+    def test_expire_job(self):
+        """The expiry job expires active reservations that have ended"""
+        self.start_time = timezone.now() - timedelta(hours=3)
+        reservation = self.create_reservation(hours=1)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(expire_reservations(), 1)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, 'expired')
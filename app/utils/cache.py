@@ -0,0 +1,74 @@
+import logging
+import threading
+import time
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# A fixed set of lock stripes rather than a lock per key, so keys carrying a
+# requested window do not grow the set; keys sharing a stripe wait in turn
+LOCAL_LOCK_STRIPES = 64
+_local_locks = [threading.Lock() for _ in range(LOCAL_LOCK_STRIPES)]
+
+def _local_lock(key):
+    """Process-wide lock of the stripe a cache key falls in."""
+    return _local_locks[hash(key) % LOCAL_LOCK_STRIPES]
+
+def _recompute(key, compute, stale_ttl):
+    value = compute()
+    cache.set(key, {'value': value, 'computed_at': time.time()}, stale_ttl)
+    return value
+
+def _refresh_in_background(key, compute, stale_ttl, lock_timeout):
+    """Start one background refresh of key unless one is already running."""
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, True, lock_timeout):
+        return
+    
+    def refresh():
+        try:
+            _recompute(key, compute, stale_ttl)
+        except Exception:
+            logger.exception(f"Background refresh of {key} failed")
+        finally:
+            cache.delete(lock_key)
+            connections.close_all()
+    
+    threading.Thread(target=refresh, daemon=True).start()
+
+def stale_while_revalidate(key, compute, ttl, stale_ttl, lock_timeout=30):
+    """
+    Return the cached value of key, computing it with compute() when missing.
+    
+    Values younger than ttl seconds are served as is. Older values are still
+    served immediately while a single background thread recomputes them; they
+    expire from the cache after stale_ttl seconds. Concurrent misses are
+    single-flighted: one caller computes while the others wait for its result.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        if time.time() - entry['computed_at'] > ttl:
+            _refresh_in_background(key, compute, stale_ttl, lock_timeout)
+        return entry['value']
+    
+    lock_key = f'{key}:lock'
+    with _local_lock(key):
+        entry = cache.get(key)
+        if entry is not None:
+            return entry['value']
+        
+        if cache.add(lock_key, True, lock_timeout):
+            try:
+                return _recompute(key, compute, stale_ttl)
+            finally:
+                cache.delete(lock_key)
+        
+        # Another process is computing the value; wait for it before giving up
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry['value']
+        return _recompute(key, compute, stale_ttl)
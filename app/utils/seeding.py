@@ -0,0 +1,261 @@
+import csv
+import io
+import random
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+from app.api.parking_lots.models import ParkingLot, ParkingSpace
+from app.api.reservations.models import Reservation
+
+User = get_user_model()
+
+FIRST_NAMES = [
+    'John', 'Jane', 'Michael', 'Sarah', 'David', 'Maria', 'Jose', 'Ana',
+    'Mark', 'Grace', 'Paolo', 'Andrea', 'Carlo', 'Bea', 'Miguel', 'Liza'
+]
+LAST_NAMES = [
+    'Doe', 'Smith', 'Johnson', 'Williams', 'Brown', 'Santos', 'Reyes', 'Cruz',
+    'Bautista', 'Garcia', 'Mendoza', 'Torres', 'Flores', 'Ramos', 'Castillo', 'Aquino'
+]
+LOCATIONS = [
+    ('SM City Davao', 'Quimpo Blvd, Davao City', 7.0731, 125.6128, 500, '50.00'),
+    ('Abreeza Mall', 'J.P. Laurel Ave, Davao City', 7.0682, 125.6087, 300, '40.00'),
+    ('Gaisano Mall', 'J.P. Laurel Ave, Davao City', 7.0725, 125.6135, 400, '35.00'),
+    ('NCCC Mall', 'J.P. Laurel Ave, Davao City', 7.0715, 125.6145, 350, '30.00'),
+    ('Victoria Plaza', 'J.P. Laurel Ave, Davao City', 7.0705, 125.6155, 250, '25.00'),
+]
+
+# Relative number of arrivals per local hour: morning and evening peaks
+ARRIVAL_WEIGHTS = [
+    1, 1, 1, 1, 1, 2, 6, 12, 18, 16, 12, 11,
+    13, 12, 10, 10, 12, 15, 14, 10, 7, 5, 3, 2
+]
+# Stay lengths in minutes and how common they are
+DURATION_MINUTES = [30, 60, 90, 120, 180, 240, 360, 480, 720]
+DURATION_WEIGHTS = [8, 22, 16, 16, 12, 10, 8, 5, 3]
+
+RESERVATION_COLUMNS = [
+    'parking_lot_id', 'parking_space_id', 'user_id', 'vehicle_plate', 'notes',
+    'start_time', 'end_time', 'status', 'hourly_rate', 'duration', 'total_cost',
+    'created_at', 'updated_at'
+]
+# COPY reads an empty unquoted CSV field as NULL; these NOT NULL text columns
+# read it as an empty string instead
+COPY_NOT_NULL_COLUMNS = ['vehicle_plate', 'notes', 'status']
+
+class DatasetGenerator:
+    """
+    Deterministic generator of production-sized sample data.
+    
+    The same seed, sizes and end date always produce the same rows. Users,
+    lots and spaces are bulk inserted; reservations are generated and written
+    in chunks of batch_size, with COPY on PostgreSQL and executemany elsewhere,
+    so memory stays flat however many rows are requested.
+    """
+    
+    def __init__(self, users=5, lots=5, days=30, reservations=None, seed=42,
+                 end_date=None, batch_size=10000, prefix='user', log=None):
+        self.user_count = users
+        self.lot_count = lots
+        self.days = days
+        self.reservation_count = reservations if reservations is not None else 2 * users * days
+        self.seed = seed
+        self.end_date = end_date or timezone.localdate()
+        self.first_day = self.end_date - timedelta(days=days - 1)
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.log = log or (lambda message: None)
+        self.rng = random.Random(seed)
+    
+    def generate(self):
+        """Create every row and return a summary of what was created."""
+        user_ids = self.create_users()
+        lots = self.create_lots()
+        spaces = self.create_spaces(lots)
+        reservations = self.create_reservations(user_ids, lots, spaces)
+        return {
+            'users': len(user_ids),
+            'lots': lots,
+            'spaces': sum(len(ids) for ids in spaces.values()),
+            'reservations': reservations,
+            'first_day': self.first_day,
+            'last_day': self.end_date
+        }
+    
+    def create_users(self):
+        """Bulk insert users sharing one password hash; returns their ids in order."""
+        password = make_password(f'{self.prefix}123')
+        for offset in range(0, self.user_count, self.batch_size):
+            User.objects.bulk_create([
+                User(
+                    email=f'{self.prefix}{i}@example.com',
+                    username=f'{self.prefix}{i}',
+                    password=password,
+                    first_name=FIRST_NAMES[i % len(FIRST_NAMES)],
+                    last_name=LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)],
+                    role=User.Role.USER
+                )
+                for i in range(offset, min(offset + self.batch_size, self.user_count))
+            ])
+        self.log(f'Created {self.user_count} users')
+        return sorted(User.objects.filter(
+            username__startswith=self.prefix,
+            email__endswith='@example.com'
+        ).order_by('-id').values_list('id', flat=True)[:self.user_count])
+    
+    def create_lots(self):
+        """Bulk insert lots, reusing the Davao locations before numbered ones."""
+        lots = []
+        for i in range(self.lot_count):
+            if i < len(LOCATIONS):
+                name, address, latitude, longitude, total_spaces, rate = LOCATIONS[i]
+            else:
+                name = f'Davao Lot {i + 1}'
+                address = f'{i + 1} Generated St, Davao City'
+                latitude = 7.0 + self.rng.random() * 0.15
+                longitude = 125.55 + self.rng.random() * 0.15
+                total_spaces = self.rng.randrange(100, 501, 50)
+                rate = self.rng.choice(['25.00', '30.00', '35.00', '40.00', '50.00'])
+            lots.append(ParkingLot(
+                name=name,
+                address=address,
+                latitude=Decimal(f'{latitude:.6f}'),
+                longitude=Decimal(f'{longitude:.6f}'),
+                total_spaces=total_spaces,
+                available_spaces=self.rng.randint(int(total_spaces * 0.2), int(total_spaces * 0.8)),
+                status=ParkingLot.Status.ACTIVE,
+                hourly_rate=Decimal(rate)
+            ))
+        lots = ParkingLot.objects.bulk_create(lots, batch_size=self.batch_size)
+        self.log(f'Created {len(lots)} parking lots')
+        return lots
+    
+    def create_spaces(self, lots):
+        """Bulk insert every lot's spaces; returns {lot_id: [space ids]}."""
+        spaces = [
+            ParkingSpace(
+                parking_lot=lot,
+                space_number=f'{lot.name[:3].upper()}{number + 1:03d}',
+                status=(
+                    ParkingSpace.Status.AVAILABLE if number < lot.available_spaces
+                    else ParkingSpace.Status.OCCUPIED
+                )
+            )
+            for lot in lots
+            for number in range(lot.total_spaces)
+        ]
+        ParkingSpace.objects.bulk_create(spaces, batch_size=self.batch_size)
+        
+        space_ids = {lot.id: [] for lot in lots}
+        for lot_id, space_id in ParkingSpace.objects.filter(
+            parking_lot__in=lots
+        ).order_by('id').values_list('parking_lot_id', 'id'):
+            space_ids[lot_id].append(space_id)
+        self.log(f'Created {len(spaces)} parking spaces')
+        return space_ids
+    
+    def reservation_chunks(self, user_ids, lots, spaces):
+        """Yield lists of unsaved reservations, batch_size at a time."""
+        # Users keep one or two plates; bigger lots attract more traffic
+        plates = [
+            [f'{self.rng.choice("ABCDEFGHJKLMNPRSTUVWXYZ")}{self.rng.choice("ABCDEFGHJKLMNPRSTUVWXYZ")}'
+             f'{self.rng.choice("ABCDEFGHJKLMNPRSTUVWXYZ")}{self.rng.randrange(1000, 10000)}'
+             for _ in range(self.rng.choice([1, 1, 1, 2]))]
+            for _ in user_ids
+        ]
+        lot_weights = [lot.total_spaces for lot in lots]
+        now = timezone.now()
+        day_starts = [
+            timezone.make_aware(datetime.combine(self.first_day + timedelta(days=day), time.min))
+            for day in range(self.days)
+        ]
+        
+        remaining = self.reservation_count
+        while remaining > 0:
+            size = min(self.batch_size, remaining)
+            chunk = []
+            for lot, hour, minutes, user_index, day_start in zip(
+                self.rng.choices(lots, weights=lot_weights, k=size),
+                self.rng.choices(range(24), weights=ARRIVAL_WEIGHTS, k=size),
+                self.rng.choices(DURATION_MINUTES, weights=DURATION_WEIGHTS, k=size),
+                (self.rng.randrange(len(user_ids)) for _ in range(size)),
+                (self.rng.choice(day_starts) for _ in range(size))
+            ):
+                start_time = day_start + timedelta(hours=hour, minutes=self.rng.randrange(0, 60, 15))
+                end_time = start_time + timedelta(minutes=minutes)
+                if end_time > now and start_time <= now:
+                    status = Reservation.Status.ACTIVE
+                elif self.rng.random() < 0.08:
+                    status = Reservation.Status.CANCELLED
+                else:
+                    status = Reservation.Status.COMPLETED
+                reservation = Reservation(
+                    parking_lot_id=lot.id,
+                    parking_space_id=self.rng.choice(spaces[lot.id]),
+                    user_id=user_ids[user_index],
+                    vehicle_plate=self.rng.choice(plates[user_index]),
+                    start_time=start_time,
+                    end_time=end_time,
+                    status=status,
+                    hourly_rate=lot.hourly_rate
+                )
+                reservation.calculate_totals()
+                chunk.append(reservation)
+            remaining -= size
+            yield chunk
+    
+    def create_reservations(self, user_ids, lots, spaces):
+        """Write reservations chunk by chunk; returns how many were created."""
+        created = 0
+        for chunk in self.reservation_chunks(user_ids, lots, spaces):
+            rows = self.reservation_rows(chunk)
+            with transaction.atomic():
+                if connection.vendor == 'postgresql':
+                    self.copy_rows(rows)
+                else:
+                    self.insert_rows(rows)
+            created += len(rows)
+            self.log(f'Created {created} of {self.reservation_count} reservations')
+        return created
+    
+    def reservation_rows(self, chunk):
+        """
+        Database values of RESERVATION_COLUMNS for each reservation. Rows skip
+        the ORM's per-field compilation and are stamped as bulk_create would.
+        """
+        now = timezone.now()
+        adapt_datetime = connection.ops.adapt_datetimefield_value
+        adapt_decimal = connection.ops.adapt_decimalfield_value
+        rows = []
+        for reservation in chunk:
+            reservation.created_at = reservation.updated_at = now
+            rows.append([
+                adapt_datetime(value) if isinstance(value, datetime)
+                else adapt_decimal(value) if isinstance(value, Decimal)
+                else value
+                for value in (getattr(reservation, column) for column in RESERVATION_COLUMNS)
+            ])
+        return rows
+    
+    def insert_rows(self, rows):
+        """Insert one chunk with a single executemany."""
+        table = connection.ops.quote_name(Reservation._meta.db_table)
+        columns = ', '.join(connection.ops.quote_name(column) for column in RESERVATION_COLUMNS)
+        placeholders = ', '.join(['%s'] * len(RESERVATION_COLUMNS))
+        with connection.cursor() as cursor:
+            cursor.executemany(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', rows)
+    
+    def copy_rows(self, rows):
+        """Stream one chunk into the reservation table with COPY (PostgreSQL only)."""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {Reservation._meta.db_table} ({", ".join(RESERVATION_COLUMNS)}) '
+                f'FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL ({", ".join(COPY_NOT_NULL_COLUMNS)}))',
+                buffer
+            )